@@ -0,0 +1,45 @@
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.db.database import DATABASE_URL, REPLICA_DATABASE_URL
+from app.db.pool import engine_options, instrument, async_pool_metrics, async_replica_pool_metrics
+from app.db import routing
+
+# ⚡ גישה אסינכרונית ל-DB עבור ה-routes החמים (פידים, מתכון, תגובות, מועדפים):
+# בקשה שמחכה ל-Postgres משחררת את ה-event loop במקום להחזיק thread מה-threadpool.
+# אותה כתובת DATABASE_URL, עם דרייבר async: asyncpg ל-Postgres, aiosqlite ל-SQLite
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(async_url(DATABASE_URL), **engine_options(DATABASE_URL, asyncio=True))
+instrument(async_engine.sync_engine, async_pool_metrics)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+if REPLICA_DATABASE_URL:
+    async_replica_engine = create_async_engine(
+        async_url(REPLICA_DATABASE_URL),
+        **engine_options(REPLICA_DATABASE_URL, asyncio=True, metrics=async_replica_pool_metrics),
+    )
+    instrument(async_replica_engine.sync_engine, async_replica_pool_metrics)
+else:
+    async_replica_engine = async_engine
+AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# 📖 כמו get_read_db: replica, או primary למשתמש שכתב בשניות האחרונות
+async def get_async_read_db(request: Request):
+    sticky = routing.route_to_primary(request, REPLICA_DATABASE_URL is not None)
+    async with (AsyncSessionLocal() if sticky else AsyncReplicaSessionLocal()) as db:
+        db.info[routing.READ_YOUR_WRITES_KEY] = sticky
+        yield db
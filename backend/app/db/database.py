@@ -1,17 +1,32 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from app.db.pool import engine_options, instrument, replica_pool_metrics
+from app.db import routing
 
 import os
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+# 🔀 replica לקריאה (אופציונלי). בלי REPLICA_DATABASE_URL כל הקריאות הולכות ל-primary כמו קודם
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL") or None
 
-engine = create_engine(DATABASE_URL)
+# 🏊 הגדרות הבריכה לפי DB_POOL_PROFILE (development / production / test) – ראו app/db/pool.py
+engine = instrument(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if REPLICA_DATABASE_URL:
+    replica_engine = instrument(
+        create_engine(REPLICA_DATABASE_URL, **engine_options(REPLICA_DATABASE_URL, metrics=replica_pool_metrics)),
+        replica_pool_metrics,
+    )
+else:
+    replica_engine = engine
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 # ✅ זו הפונקציה שחסרה לך
 def get_db():
     db = SessionLocal()
@@ -19,3 +34,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 📖 תלות לקריאה בלבד: replica, חוץ ממשתמש שכתב בשניות האחרונות (ראו app/db/routing.py)
+def get_read_db(request: Request):
+    sticky = routing.route_to_primary(request, REPLICA_DATABASE_URL is not None)
+    db = SessionLocal() if sticky else ReplicaSessionLocal()
+    db.info[routing.READ_YOUR_WRITES_KEY] = sticky
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,72 @@
+import os
+import time
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import OperationalError
+
+# 🗂️ גרסת הסכמה: המיגרציות עצמן ב-backend/migrations (alembic upgrade head).
+# בעליית השרת רק בודקים שה-DB כבר בגרסה האחרונה – שאילתה אחת על alembic_version במקום create_all
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config(url: str = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    if url:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+def head_revisions() -> set:
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(connection) -> set:
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def ensure_schema_at_head(engine):
+    with engine.connect() as connection:
+        current = current_revisions(connection)
+    head = head_revisions()
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(head)}. "
+            "Run `alembic upgrade head` from backend/"
+        )
+
+
+# מסד שנבנה ב-create_all לפני שהיו מיגרציות: יש טבלאות אבל אין alembic_version – הסכמה שלו היא 0001
+BASELINE_REVISION = "0001"
+
+
+# 🚀 עדכון הסכמה בעליית הקונטיינר (python -m app.manage migrate): מחכה שה-DB יקבל חיבורים,
+# מסמן מסד ישן כ-0001, ואז upgrade head. מחזיר את הגרסאות שהמסד היה בהן לפני העדכון
+def upgrade_to_head(url: str, attempts: int = 30, delay: float = 1.0) -> set:
+    engine = create_engine(url)
+    try:
+        for attempt in range(attempts):
+            try:
+                with engine.connect() as connection:
+                    current = current_revisions(connection)
+                    legacy = not current and "users" in inspect(connection).get_table_names()
+                break
+            except OperationalError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(delay)
+    finally:
+        engine.dispose()
+
+    config = alembic_config(url)
+    if legacy:
+        command.stamp(config, BASELINE_REVISION)
+        current = {BASELINE_REVISION}
+    command.upgrade(config, "head")
+    return current
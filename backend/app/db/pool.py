@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# 🏊 פרופילים לבריכת החיבורים. ב-production: pool_size + max_overflow = 40 – כמו ה-threadpool של
+# FastAPI/anyio שמריץ את ה-routes הסינכרוניים, כך שכל thread יכול לקבל חיבור בלי לחכות בתור
+POOL_PROFILES = {
+    "development": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True},
+    "production": {"pool_size": 20, "max_overflow": 20, "pool_timeout": 5, "pool_recycle": 1800, "pool_pre_ping": True},
+    "test": {"pool_size": 2, "max_overflow": 0, "pool_timeout": 2, "pool_recycle": -1, "pool_pre_ping": False},
+}
+DEFAULT_PROFILE = "development"
+
+# כל ערך בפרופיל אפשר לדרוס במשתנה סביבה, למשל DB_POOL_SIZE=30
+_OVERRIDES = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda value: value.lower() in ("1", "true", "yes")),
+}
+
+LATENCY_SAMPLES = 2048
+
+
+def pool_settings(profile: str = None) -> dict:
+    profile = profile or os.getenv("DB_POOL_PROFILE", DEFAULT_PROFILE)
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE: {profile} (expected one of {', '.join(POOL_PROFILES)})")
+    settings = dict(POOL_PROFILES[profile])
+    for key, (env_name, parse) in _OVERRIDES.items():
+        value = os.getenv(env_name)
+        if value is not None:
+            settings[key] = parse(value)
+    return settings
+
+
+# הארגומנטים ל-create_engine / create_async_engine. SQLite (פיתוח מקומי / בדיקות) נשאר עם הבריכה של SQLAlchemy.
+# metrics – מדדים נפרדים לבריכה (למשל ה-replica); המחלקה נוצרת עם המדדים כדי שגם בריכה שנבנית מחדש תשמור אותם
+def engine_options(url: str, profile: str = None, asyncio: bool = False, metrics: "PoolMetrics" = None) -> dict:
+    if not url or make_url(url).get_backend_name() == "sqlite":
+        return {}
+    poolclass = InstrumentedAsyncAdaptedQueuePool if asyncio else InstrumentedQueuePool
+    if metrics is not None and metrics is not poolclass.metrics:
+        poolclass = type(poolclass.__name__, (poolclass,), {"metrics": metrics})
+    return {"poolclass": poolclass, **pool_settings(profile)}
+
+
+# 📊 מדדי הבריכה: זמן המתנה לחיבור (checkout), כמה חיבורים בשימוש / ממתינים בתור, timeouts
+class PoolMetrics:
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=samples)  # שניות, החדשות ביותר
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.waiting = 0
+            self.peak_waiting = 0
+            self.waits = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def wait_started(self):
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def wait_finished(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waiting -= 1
+            self._waits.append(seconds)
+            self.waits += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def checked_out(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def connected(self):
+        with self._lock:
+            self.connects += 1
+
+    def invalidated(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            waited = len(waits)
+
+            def percentile(p):
+                return round(waits[min(int(p * waited), waited - 1)] * 1000, 3) if waited else None
+
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "waiting": self.waiting,
+                "peak_waiting": self.peak_waiting,
+                "wait_ms": {
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99),
+                    "max": round(self.max_wait * 1000, 3),
+                    "avg": round(self.total_wait / self.waits * 1000, 3) if self.waits else None,
+                },
+            }
+
+
+# מדדים נפרדים למנוע הסינכרוני ולמנוע ה-async (כל אחד עם בריכה משלו), ולבריכות ה-replica
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
+async_replica_pool_metrics = PoolMetrics()
+
+
+# ⏱️ QueuePool שמודד את ההמתנה בתור: _do_get הוא המקום היחיד שבו request מחכה לחיבור פנוי
+class InstrumentedQueuePool(QueuePool):
+    metrics = pool_metrics
+
+    def _do_get(self):
+        self.metrics.wait_started()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.wait_finished(time.perf_counter() - started, timed_out=True)
+            raise
+        except BaseException:
+            self.metrics.wait_finished(time.perf_counter() - started)
+            raise
+        self.metrics.wait_finished(time.perf_counter() - started)
+        return connection
+
+
+# אותה מדידה לבריכה של create_async_engine (asyncpg)
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def instrument(engine, metrics: PoolMetrics = pool_metrics):
+    event.listen(engine, "checkout", lambda *args: metrics.checked_out())
+    event.listen(engine, "checkin", lambda *args: metrics.checked_in())
+    event.listen(engine, "connect", lambda *args: metrics.connected())
+    event.listen(engine, "invalidate", lambda *args: metrics.invalidated())
+    return engine
+
+
+# 🔗 SQLite (פיתוח / בדיקות) לא אוכף מפתחות זרים בלי PRAGMA – בלעדיו ה-ON DELETE CASCADE של הסכמה לא קורה,
+# ומחיקת משתמש / מתכון משאירה שורות יתומות. נקבע לכל חיבור חדש, בכל מנוע (sqlite / aiosqlite)
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    if "sqlite" in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+# מצב הבריכה כרגע (QueuePool) + המדדים המצטברים
+def pool_status(engine, metrics: PoolMetrics = pool_metrics) -> dict:
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow", "timeout"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return {**status, **metrics.stats()}
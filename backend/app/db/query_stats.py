@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 🔢 כמה שאילתות SQL וכמה זמן DB לכל בקשה. נמדד ב-before/after_cursor_execute על כל המנועים
+# (sync, async, replica), ומצטבר לבקשה הנוכחית דרך ContextVar – גם מתוך ה-threadpool וגם מתוך run_sync
+DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "").lower() in ("1", "true", "yes")
+# אותה שאילתה שחוזרת לפחות כך וכך פעמים בבקשה אחת = חשד ל-N+1 (טעינה עצלה בלולאה)
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+COUNT_HEADER = "X-DB-Query-Count"
+TIME_HEADER = "X-DB-Time-Ms"
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    def __init__(self, request=None):
+        self.request = request
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    @property
+    def milliseconds(self) -> float:
+        return round(self.seconds * 1000, 3)
+
+    def repeated(self, threshold: int = None) -> list:
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+_current = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(request=None):
+    stats = QueryStats(request)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+# 📊 מצטבר לכל route: בקשות, שאילתות (סה"כ / מקסימום בבקשה), זמן DB, ובקשות עם חשד ל-N+1
+class QueryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: str, stats: QueryStats):
+        suspects = stats.repeated()
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                "requests": 0, "queries": 0, "max_queries": 0, "db_seconds": 0.0, "n_plus_one": 0,
+            })
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            entry["db_seconds"] += stats.seconds
+            if suspects:
+                entry["n_plus_one"] += 1
+        for statement, times in suspects:
+            logger.warning("possible N+1 in %s: %d× %s", route, times, " ".join(statement.split())[:200])
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                route: {
+                    "requests": entry["requests"],
+                    "avg_queries": round(entry["queries"] / entry["requests"], 2),
+                    "max_queries": entry["max_queries"],
+                    "avg_db_ms": round(entry["db_seconds"] / entry["requests"] * 1000, 3),
+                    "n_plus_one": entry["n_plus_one"],
+                }
+                for route, entry in self._routes.items()
+            }
+        return dict(sorted(routes.items(), key=lambda item: -item[1]["avg_queries"]))
+
+
+query_metrics = QueryMetrics()
+
+
+# בקשה שלא התאימה לאף route (404, סורקים) נספרת תחת מפתח קבוע – אחרת כל URL אקראי היה מוסיף שורה למדדים
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_name(request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {route.path}" if route is not None else UNMATCHED_ROUTE
+
+
+# ה-route של הבקשה שבתוכה רצה השאילתה כרגע (None מחוץ לבקשה – סקריפטים, startup)
+def current_route():
+    stats = _current.get()
+    if stats is None or stats.request is None:
+        return None
+    return route_name(stats.request)
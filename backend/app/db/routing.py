@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from typing import Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+# 🔀 ניתוב קריאות: תלויות הקריאה (get_read_db / get_async_read_db) הולכות ל-replica, כתיבות ל-primary.
+# משתמש שכתב (commit) מקבל חלון קצר שבו גם הקריאות שלו הולכות ל-primary – כך הוא רואה את השינוי שלו
+# גם אם ה-replica עוד לא השלים אותו
+STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS", "5"))
+
+# המפתחות ב-session.info: מי המשתמש של הבקשה (נקבע באימות), והאם הקריאה נותבה ל-primary בגלל החלון
+USER_KEY = "user_id"
+READ_YOUR_WRITES_KEY = "read_your_writes"
+
+# אותו JWT כמו ב-users_services – כאן רק מזהים את המשתמש לניתוב, האימות עצמו נשאר שם
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = "HS256"
+
+
+class StickyWindow:
+    def __init__(self, seconds: float = STICKY_SECONDS, clock=time.monotonic):
+        self.seconds = seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._until = {}  # user_id -> עד מתי לקרוא מה-primary
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def mark(self, user_id: int):
+        if self.seconds <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._until[user_id] = now + self.seconds
+            # ניקוי חלונות שפגו, כדי שהמילון לא יגדל עם כל משתמש שכתב אי פעם
+            if len(self._until) > 1024:
+                self._until = {user: until for user, until in self._until.items() if until > now}
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            until = self._until.get(user_id)
+            if until is None:
+                return False
+            if until <= self._clock():
+                del self._until[user_id]
+                return False
+            return True
+
+    def routed(self, primary: bool):
+        with self._lock:
+            if primary:
+                self.primary_reads += 1
+            else:
+                self.replica_reads += 1
+
+    def reset(self):
+        with self._lock:
+            self._until.clear()
+            self.primary_reads = 0
+            self.replica_reads = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            return {
+                "sticky_seconds": self.seconds,
+                "sticky_users": sum(1 for until in self._until.values() if until > now),
+                "primary_reads": self.primary_reads,
+                "replica_reads": self.replica_reads,
+            }
+
+
+sticky_writes = StickyWindow()
+
+
+# קריאה שנותבה ל-primary בגלל החלון לא נוגעת במטמון התשובות: הוא משותף לכולם, ומי שקרא מה-replica
+# אחרי הכתיבה יכול היה למלא אותו בתוכן שעוד לא כולל אותה
+def read_your_writes(db) -> bool:
+    return bool(db.info.get(READ_YOUR_WRITES_KEY))
+
+
+# מזהה המשתמש מה-Authorization של הבקשה, בלי גישה ל-DB. טוקן חסר / לא תקין = קורא אנונימי
+def request_user_id(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return int(jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+# True = המשתמש כתב לאחרונה והקריאה שלו הולכת ל-primary. בלי replica מוגדר הכל ממילא ב-primary
+def route_to_primary(request: Request, has_replica: bool) -> bool:
+    if not has_replica:
+        return False
+    primary = sticky_writes.is_sticky(request_user_id(request))
+    sticky_writes.routed(primary)
+    return primary
+
+
+# כל commit של session שמשויך למשתמש (get_current_user / הרשמה) פותח לו את החלון
+@event.listens_for(Session, "after_commit")
+def _mark_writer(session):
+    user_id = session.info.get(USER_KEY)
+    if user_id is not None:
+        sticky_writes.mark(user_id)
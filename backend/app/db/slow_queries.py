@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.db.query_stats import current_route
+
+# 🐢 יומן שאילתות איטיות: כל פקודה שלקחה יותר מ-DB_SLOW_QUERY_MS נשמרת (טקסט, צורת הפרמטרים, route) ב-buffer
+# מעגלי בזיכרון. לכל "טביעת אצבע" (השאילתה המנורמלת) נשמרת תוכנית EXPLAIN אחת – בלי ANALYZE, כלומר בלי להריץ שוב
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))  # שלילי = כבוי
+BUFFER_SIZE = int(os.getenv("DB_SLOW_QUERY_BUFFER", "100"))
+MAX_PLANS = 256
+
+# EXPLAIN לפי דיאלקט. ב-SQLite (פיתוח ובדיקות) – EXPLAIN QUERY PLAN
+EXPLAIN_PREFIX = {
+    "postgresql": "EXPLAIN (ANALYZE off) ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+EXPLAINABLE = ("select", "with")
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+)\s*\)")
+_NAMED_PLACEHOLDERS = re.compile(r"%\(\w+\)s|\$\d+")
+
+
+# השאילתה בלי ערכים: רווחים מקופלים, ליטרלים ל-?, ורשימות IN באורך משתנה לסוגריים אחד – כך IN של 3 ושל 30 מזהים
+# הם אותה טביעת אצבע
+def normalize(statement: str) -> str:
+    normalized = " ".join(statement.split())
+    normalized = _LITERALS.sub("?", normalized)
+    normalized = _NAMED_PLACEHOLDERS.sub("?", normalized)
+    return _PLACEHOLDER_LISTS.sub("(?)", normalized)
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:16]
+
+
+# הסוגים של הפרמטרים, לא הערכים (אין סיסמאות / אימיילים ביומן)
+def parameter_shape(parameters, executemany: bool = False):
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _explain(conn, statement, parameters):
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    # cursor גולמי – לא עובר ב-events (לא נספר כשאילתה ולא נרשם שוב). ב-Postgres שגיאה מבטלת את הטרנזקציה,
+    # לכן ה-EXPLAIN רץ בתוך savepoint
+    cursor = conn.connection.cursor()
+    savepoint = conn.dialect.name == "postgresql"
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            return f"EXPLAIN failed: {e}"
+        finally:
+            if savepoint:
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+    # Postgres: שורה לכל שורת תוכנית. SQLite: (id, parent, notused, detail)
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, size: int = BUFFER_SIZE):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=size)
+        self._plans = OrderedDict()  # fingerprint -> plan, הישנות נזרקות אחרי MAX_PLANS
+
+    def record(self, conn, statement, parameters, executemany, elapsed_ms):
+        key = fingerprint(statement)
+        with self._lock:
+            known = key in self._plans
+        # EXPLAIN מחוץ לנעילה – זו פנייה ל-DB
+        plan = None if known or executemany else _explain(conn, statement, parameters)
+        with self._lock:
+            if not known:
+                self._plans[key] = plan
+                while len(self._plans) > MAX_PLANS:
+                    self._plans.popitem(last=False)
+            self._entries.append({
+                "fingerprint": key,
+                "sql": " ".join(statement.split()),
+                "parameters": parameter_shape(parameters, executemany),
+                "route": current_route(),
+                "duration_ms": round(elapsed_ms, 3),
+                "at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+    # האחרונות ראשונות; התוכניות פעם אחת לכל טביעת אצבע
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries = list(reversed(self._entries))
+            plans = {entry["fingerprint"]: self._plans.get(entry["fingerprint"]) for entry in entries}
+        return {"threshold_ms": self.threshold_ms, "queries": entries, "plans": plans}
+
+
+slow_queries = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _slow_query_started(conn, cursor, statement, parameters, context, executemany):
+    if slow_queries.threshold_ms >= 0:
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _slow_query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("slow_query_started")
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    if elapsed_ms >= slow_queries.threshold_ms >= 0:
+        slow_queries.record(conn, statement, parameters, executemany, elapsed_ms)
+
+
+# פקודה שנכשלה לא מגיעה ל-after_cursor_execute – מוציאים את זמן ההתחלה שלה מהמחסנית
+@event.listens_for(Engine, "handle_error")
+def _slow_query_failed(context):
+    started = context.connection.info.get("slow_query_started") if context.connection is not None else None
+    if started:
+        started.pop()
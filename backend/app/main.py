@@ -1,25 +1,65 @@
-from fastapi import FastAPI
-from app.db.database import engine
-from app.models import Base
-from app.routes import users, favorites, recipes, comments, ai
+import asyncio
+import logging
+import os
+from fastapi import FastAPI, Request
+from app.db import query_stats
+from app.db.database import engine, SessionLocal
+from app.db.migrations import ensure_schema_at_head
+from app.routes import users, favorites, recipes, comments, ai, metrics
 from contextlib import asynccontextmanager
 from fastapi.openapi.utils import get_openapi  # ✅ חדש
 from fastapi.middleware.cors import CORSMiddleware
 
+# 🔧 כל כמה שניות מוני לוח הבקרה (site_counters) מחושבים מחדש מהטבלאות ומתקנים סטייה. 0 = כבוי
+# (אפשר גם מ-cron: python -m app.manage reconcile-counters)
+COUNTER_RECONCILE_SECONDS = float(os.getenv("COUNTER_RECONCILE_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+
+def _reconcile_counters():
+    from app.services import site_counters, leaderboard_service
+    with SessionLocal() as db:
+        drift = site_counters.reconcile(db, leaderboard_service.BOARDS)
+        db.commit()
+    for name, (stored, actual) in drift.items():
+        logger.warning("site counter %s drifted: %s -> %s", name, stored, actual)
+
+
+async def _reconcile_counters_periodically():
+    while True:
+        await asyncio.sleep(COUNTER_RECONCILE_SECONDS)
+        try:
+            await asyncio.to_thread(_reconcile_counters)
+        except Exception:
+            logger.exception("site counter reconcile failed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     import time
     from sqlalchemy.exc import OperationalError
 
-    # ננסה עד 10 פעמים להתחבר (כל פעם נחכה חצי שנייה)
-    for _ in range(10):
+    # ננסה עד 10 פעמים להתחבר (כל פעם נחכה חצי שנייה). הסכמה עצמה נבנית במיגרציות (alembic upgrade head) –
+    # כאן רק בודקים שהיא בגרסה האחרונה, ואם לא – השרת לא עולה
+    for attempt in range(10):
         try:
-            Base.metadata.create_all(bind=engine)
+            ensure_schema_at_head(engine)
             break
         except OperationalError:
+            if attempt == 9:
+                raise
             time.sleep(0.5)
 
+    # 🔤 עץ ההשלמה האוטומטית נבנה מראש – הבקשה הראשונה לא משלמת על הבנייה
+    from app.services.autocomplete import autocomplete
+    with SessionLocal() as db:
+        autocomplete.ensure_built(db)
+
+    reconciler = asyncio.create_task(_reconcile_counters_periodically()) if COUNTER_RECONCILE_SECONDS > 0 else None
     yield
+    if reconciler is not None:
+        reconciler.cancel()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -31,6 +71,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🔢 מונה שאילתות וזמן DB לכל בקשה (ומזהה N+1). ב-DB_DEBUG_HEADERS הם חוזרים גם ככותרות בתשובה
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    with query_stats.track_queries(request) as stats:
+        response = await call_next(request)
+    query_stats.query_metrics.record(query_stats.route_name(request), stats)
+    if query_stats.DEBUG_HEADERS:
+        response.headers[query_stats.COUNT_HEADER] = str(stats.count)
+        response.headers[query_stats.TIME_HEADER] = str(stats.milliseconds)
+    return response
+
 
 
 
@@ -40,6 +91,7 @@ app.include_router(recipes.router)
 app.include_router(favorites.router) 
 app.include_router(comments.router)
 app.include_router(ai.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
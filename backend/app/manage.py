@@ -0,0 +1,198 @@
+# פקודות ניהול לבאקנד – מריצים מתוך backend:
+#   python -m app.manage migrate
+#   python -m app.manage backfill-ratings
+#   python -m app.manage import-data users users.ndjson
+#   python -m app.manage export-data recipes recipes.csv
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+
+from app.db.database import SessionLocal, DATABASE_URL
+from app.db.migrations import upgrade_to_head, head_revisions
+from app.services import recipe_services, favorites_services, leaderboard_service, site_counters, search_service, ingredient_service
+from app.services import data_transfer, users_services
+from app.models import User
+
+
+# ✅ חישוב מחדש של rating_count / rating_sum / average_rating לכל המתכונים
+def backfill_ratings(args):
+    db = SessionLocal()
+    try:
+        updated = recipe_services.refresh_rating_aggregates(db)
+        site_counters.bump_feed_revision_after_commit(db)
+        db.commit()
+        print(f"✅ עודכנו סיכומי דירוג ל-{updated} מתכונים")
+    finally:
+        db.close()
+
+
+# ✅ חישוב מחדש של favorite_count לכל המתכונים
+def backfill_favorites(args):
+    db = SessionLocal()
+    try:
+        updated = favorites_services.refresh_favorite_counts(db)
+        site_counters.bump_feed_revision_after_commit(db)
+        db.commit()
+        print(f"✅ עודכן מספר המועדפים ל-{updated} מתכונים")
+    finally:
+        db.close()
+
+
+# ✅ בנייה מחדש של טבלאות הדירוג (top_rated / most_favorited)
+def rebuild_leaderboards(args):
+    db = SessionLocal()
+    try:
+        leaderboard_service.rebuild(db)
+        site_counters.bump_feed_revision_after_commit(db)
+        db.commit()
+        print("✅ טבלאות הדירוג נבנו מחדש")
+    finally:
+        db.close()
+
+
+# ✅ מילוי עמודות החיפוש המנורמלות (ובעקבותיהן אינדקס החיפוש) למתכונים קיימים
+def backfill_search(args):
+    db = SessionLocal()
+    try:
+        updated = search_service.refresh_search_columns(db)
+        db.commit()
+        print(f"✅ עודכן אינדקס החיפוש ל-{updated} מתכונים")
+    finally:
+        db.close()
+
+
+# ✅ פירוק ingredients של מתכונים קיימים לטבלת recipe_ingredients (ולמילון המצרכים)
+def backfill_ingredients(args):
+    db = SessionLocal()
+    try:
+        updated = ingredient_service.rebuild_recipe_ingredients(db)
+        db.commit()
+        print(f"✅ עודכנו מצרכים ל-{updated} מתכונים")
+    finally:
+        db.close()
+
+
+# "-" = stdin / stdout, עטופים ב-nullcontext כדי שה-with לא יסגור את הזרמים של התהליך
+def _open(path: str, mode: str):
+    if path == "-":
+        return nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+# ✅ ייבוא בכמויות מקובץ NDJSON / CSV (או - לקלט הסטנדרטי), בטרנזקציה אחת
+def import_data(args):
+    fmt = args.format or data_transfer.format_of(args.path)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with _open(args.path, "r") as stream:
+            imported = data_transfer.import_rows(
+                db, args.entity, data_transfer.read_rows(stream, fmt), args.batch_size, args.rebuild_leaderboards
+            )
+        db.commit()
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ יובאו {imported} {args.entity} ב-{elapsed:.1f} שניות ({imported / max(elapsed, 1e-9):,.0f} שורות לשנייה)")
+
+
+# ✅ ייצוא בזרימה לקובץ NDJSON / CSV (או - לפלט הסטנדרטי; הסיכום ל-stderr)
+def export_data(args):
+    fmt = args.format or data_transfer.format_of(args.path)
+    _, columns = data_transfer.ENTITIES[args.entity]
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with _open(args.path, "w") as stream:
+            exported = data_transfer.write_rows(stream, fmt, columns, data_transfer.export_rows(db, args.entity, args.batch_size))
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ יוצאו {exported} {args.entity} ב-{elapsed:.1f} שניות", file=sys.stderr)
+
+
+# ✅ תיקון סטייה במוני לוח הבקרה (מספר משתמשים / מתכונים, המקום הראשון בטבלאות הדירוג)
+def reconcile_counters(args):
+    db = SessionLocal()
+    try:
+        drift = site_counters.reconcile(db, leaderboard_service.BOARDS)
+        db.commit()
+        for name, (stored, actual) in drift.items():
+            print(f"🔧 {name}: {stored} → {actual}")
+        print(f"✅ {len(drift)} מונים תוקנו")
+    finally:
+        db.close()
+
+
+# ✅ השלמת מחיקות רקע שנקטעו (השרת נפל / הופעל מחדש באמצע purge_user)
+def purge_deleted_users(args):
+    db = SessionLocal()
+    try:
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.deleted_at.isnot(None))]
+        for user_id in user_ids:
+            started = time.perf_counter()
+            users_services.purge_user(user_id, db, args.batch_size)
+            print(f"🗑️ משתמש {user_id} נמחק ({time.perf_counter() - started:.1f}s)")
+        print(f"✅ {len(user_ids)} משתמשים נמחקו")
+    finally:
+        db.close()
+
+
+# ✅ עדכון הסכמה לגרסה האחרונה – מחכה ל-DB ומסמן מסד שנבנה לפני המיגרציות (ראו app/db/migrations.py)
+def migrate(args):
+    before = upgrade_to_head(DATABASE_URL, args.attempts)
+    print(f"✅ הסכמה עודכנה: {', '.join(sorted(before)) or 'ריק'} → {', '.join(sorted(head_revisions()))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="פקודות ניהול - טעם של שמחה")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="alembic upgrade head, אחרי שה-DB מקבל חיבורים")
+    migrate_parser.add_argument("--attempts", type=int, default=30, help="כמה ניסיונות חיבור (שנייה בין ניסיון לניסיון)")
+    migrate_parser.set_defaults(func=migrate)
+
+    backfill = subparsers.add_parser("backfill-ratings", help="חישוב מחדש של סיכומי הדירוג מטבלת ratings")
+    backfill.set_defaults(func=backfill_ratings)
+
+    backfill = subparsers.add_parser("backfill-favorites", help="חישוב מחדש של מספר המועדפים מטבלת favorites")
+    backfill.set_defaults(func=backfill_favorites)
+
+    backfill = subparsers.add_parser("backfill-search", help="מילוי עמודות החיפוש המנורמלות")
+    backfill.set_defaults(func=backfill_search)
+
+    backfill = subparsers.add_parser("backfill-ingredients", help="בניית טבלת המצרכים המנורמלת מהטקסט החופשי")
+    backfill.set_defaults(func=backfill_ingredients)
+
+    rebuild = subparsers.add_parser("rebuild-leaderboards", help="בנייה מחדש של טבלאות הדירוג")
+    rebuild.set_defaults(func=rebuild_leaderboards)
+
+    reconcile = subparsers.add_parser("reconcile-counters", help="חישוב מחדש של מוני לוח הבקרה ותיקון סטייה")
+    reconcile.set_defaults(func=reconcile_counters)
+
+    purge = subparsers.add_parser("purge-deleted-users", help="השלמת המחיקה של משתמשים שסומנו deleted_at")
+    purge.add_argument("--batch-size", type=int, default=users_services.PURGE_BATCH_SIZE)
+    purge.set_defaults(func=purge_deleted_users)
+
+    for name, func, help_text in (
+        ("import-data", import_data, "ייבוא בכמויות מ-NDJSON / CSV (סדר: users, recipes, ואז ratings / favorites / comments)"),
+        ("export-data", export_data, "ייצוא בזרימה ל-NDJSON / CSV"),
+    ):
+        transfer = subparsers.add_parser(name, help=help_text)
+        transfer.add_argument("entity", choices=list(data_transfer.ENTITIES))
+        transfer.add_argument("path", help="נתיב הקובץ, או - ל-stdin / stdout")
+        transfer.add_argument("--format", choices=data_transfer.FORMATS, help="ברירת מחדל: לפי הסיומת (.csv, אחרת ndjson)")
+        transfer.add_argument("--batch-size", type=int, default=data_transfer.BATCH_SIZE)
+        if func is import_data:
+            transfer.add_argument("--rebuild-leaderboards", action=argparse.BooleanOptionalAction, default=None,
+                                  help="בנייה מלאה של טבלאות הדירוג בסוף (או --no-...: רק המתכונים שנגעו בהם). "
+                                       "ברירת מחדל: בנייה מלאה כשהייבוא נוגע בחלק גדול מהמתכונים")
+        transfer.set_defaults(func=func)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Index, DDL, event, inspect
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.db.database import Base
+from app.utils.hebrew import index_terms
+from app.utils.ingredients import ingredient_items, parse_ingredients
 from uuid import uuid4
+import random
 
 
 class User(Base):
@@ -17,10 +23,20 @@ class User(Base):
     profile_image_url = Column(String, nullable=True)
     wants_emails = Column(Boolean, default=True)
 
-    recipes = relationship("Recipe", back_populates="creator", cascade="all, delete")
-    favorites = relationship("Favorite", back_populates="user", cascade="all, delete-orphan")
-    ratings = relationship("Rating", back_populates="user", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
+    # רשימת המשתמשים של האדמין ממוינת (created_at, id); לפי שם – האינדקס הייחודי של username
+    __table_args__ = (
+        Index("ix_users_created", "created_at", "id"),
+    )
+
+    # 🆕 מחיקה רכה של חשבון גדול: מוסתר מיד (התחברות, פידים, חיפוש), ונמחק במנות ברקע (ראו users_services.purge_user)
+    deleted_at = Column(DateTime, nullable=True)
+
+    # passive_deletes: המחיקה עצמה היא DELETE אחד – ה-ON DELETE CASCADE של המפתחות הזרים מוחק את הילדים ב-DB,
+    # בלי לטעון כל מתכון / מועדף / דירוג / תגובה לזיכרון ולמחוק אותם אחד-אחד
+    recipes = relationship("Recipe", back_populates="creator", cascade="all, delete", passive_deletes=True)
+    favorites = relationship("Favorite", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    ratings = relationship("Rating", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Recipe(Base):
@@ -28,9 +44,10 @@ class Recipe(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    description = Column(Text)
-    ingredients = Column(Text)  # JSON (כטקסט) – לדוגמה: [{"name": "בצל", "amount": "1"}]
-    instructions = Column(Text)
+    # הטקסטים הארוכים נטענים רק כשניגשים אליהם (deferred, קבוצת "body") – טעינת Recipe לעדכון/דירוג לא מושכת אותם
+    description = deferred(Column(Text), group="body")
+    ingredients = deferred(Column(Text), group="body")  # JSON (כטקסט) – לדוגמה: [{"name": "בצל", "amount": "1"}]
+    instructions = deferred(Column(Text), group="body")
     image_url = Column(String)
     video_url = Column(String)
     is_public = Column(Boolean, default=True)
@@ -39,12 +56,38 @@ class Recipe(Base):
     prep_time = Column(String, nullable=False)       # 🆕 זמן הכנה
     difficulty = Column(String, nullable=True)       # 🆕 רמת קושי
 
+    # 🆕 סיכומי דירוג מתוחזקים ב-rate_recipe – כדי שהפידים לא יריצו AVG לכל מתכון
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    average_rating = Column(Float, nullable=True)
+    # 🆕 מספר מועדפים מתוחזק ב-add_favorite / remove_favorite – מפתח מיון לפיד "הכי אהובים"
+    favorite_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # 🆕 מפתח מיון אקראי קבוע ב-[0, 1) – בסיס לפיד האקראי היציב (seed + pivot)
+    random_key = Column(Float, nullable=False, default=random.random)
+    # 🆕 גרסה + זמן עדכון אחרון – בסיס ל-ETag / Last-Modified. מקודמים בעדכון מתכון, בדירוג ובשינוי שם היוצר
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    # 🆕 טקסט מנורמל לחיפוש (בלי ניקוד, עם גרסאות בלי אותיות שימוש) – ממולא אוטומטית מ-title / ingredients.
+    # באינדקס: tsvector + GIN ב-Postgres, FTS5 ב-SQLite (ראו POSTGRES_SEARCH_DDL / SQLITE_SEARCH_DDL למטה)
+    search_title = deferred(Column(Text, nullable=True), group="search")
+    search_ingredients = deferred(Column(Text, nullable=True), group="search")
+
+    # אינדקס: ix_recipes_user_created למטה (מכסה גם את ה-CASCADE ואת "המתכונים שלי")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     creator = relationship("User", back_populates="recipes")
 
-    favorited_by = relationship("Favorite", back_populates="recipe", cascade="all, delete-orphan")
-    ratings = relationship("Rating", back_populates="recipe", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="recipe", cascade="all, delete-orphan")
+    favorited_by = relationship("Favorite", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
+    ratings = relationship("Rating", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
+
+    # אינדקסים לפגינציית keyset בפידים: WHERE is_public AND (sort_key, id) < (...)
+    __table_args__ = (
+        Index("ix_recipes_public_created", "is_public", "created_at", "id"),
+        Index("ix_recipes_public_random", "is_public", "random_key", "id"),
+        # רשימת המתכונים של האדמין: לפי יוצר, או כל המתכונים – ממוינים (created_at, id)
+        Index("ix_recipes_user_created", "user_id", "created_at", "id"),
+        Index("ix_recipes_created", "created_at", "id"),
+    )
 
 
 class Favorite(Base):
@@ -52,9 +95,15 @@ class Favorite(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False)
+    # ספירת מועדפים למתכון ומחיקה מדורגת; "המועדפים שלי" מכוסה ע"י האילוץ הייחודי (user_id, recipe_id)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # מועדף אחד למשתמש ולמתכון – add_favorite נשען עליו ב-ON CONFLICT DO NOTHING
+    __table_args__ = (
+        UniqueConstraint("user_id", "recipe_id", name="unique_user_recipe_favorite"),
+    )
+
     user = relationship("User", back_populates="favorites")
     recipe = relationship("Recipe", back_populates="favorited_by")
 
@@ -64,7 +113,8 @@ class Rating(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False)
+    # user_id מכוסה ע"י האילוץ הייחודי (user_id, recipe_id); לממוצע / ספירה לפי מתכון צריך אינדקס משלו
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True)
     rating = Column(Integer, nullable=False)  # מ-1 עד 5
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -88,3 +138,166 @@ class Comment(Base):
 
     user = relationship("User", back_populates="comments")
     recipe = relationship("Recipe", back_populates="comments")
+
+    # תגובות של מתכון, מהחדשה לישנה – ישר מהאינדקס בלי מיון
+    __table_args__ = (
+        Index("ix_comments_recipe_created", "recipe_id", "created_at"),
+    )
+
+
+class LeaderboardEntry(Base):
+    # 🏆 טבלאות דירוג מחושבות מראש (top_rated / most_favorited) עם מיקום לכל מתכון.
+    # מתעדכנות בכל דירוג/מועדף, ומוגשות לפי position באינדקס – בלי GROUP BY על כל הטבלה
+    __tablename__ = "leaderboard_entries"
+
+    board = Column(String, primary_key=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    position = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_leaderboard_board_position", "board", "position"),
+        Index("ix_leaderboard_board_score", "board", "score", "recipe_id"),
+    )
+
+
+class SiteCounter(Base):
+    # 🔢 מונים ברמת האתר, שורה לכל מונה – למשל feed_revision, שמתקדם בכל כתיבה שמשנה פיד
+    __tablename__ = "site_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+
+
+class Ingredient(Base):
+    # 🥕 מילון מצרכים קנוני: "2 כוסות קמח" ו"קמח" הם אותו מצרך (canonical מנורמל, name לתצוגה)
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    canonical = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+
+
+class RecipeIngredient(Base):
+    # 🔗 אינדקס הפוך מצרך → מתכונים. נגזר מ-Recipe.ingredients בכל כתיבה (ראו sync_recipe_ingredients)
+    __tablename__ = "recipe_ingredients"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_recipe_ingredients_ingredient", "ingredient_id", "recipe_id"),
+    )
+
+
+# 🔎 אינדקס החיפוש. Postgres: עמודת tsvector מחושבת (title במשקל A, מצרכים במשקל B) עם GIN.
+# SQLite (בדיקות): טבלת FTS5 חיצונית שמסונכרנת בטריגרים – רק כשעמודות החיפוש משתנות, לא בכל דירוג.
+# חיפוש fuzzy: pg_trgm ב-Postgres, אינדקס טריגרמות בזיכרון ב-SQLite (app/services/trigram_index.py)
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(search_title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(search_ingredients, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+    # חיפוש סלחני לשגיאות הקלדה: GIN על טריגרמות (pg_trgm) – תומך באופרטור <% של word_similarity
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_title_trgm ON recipes USING GIN (search_title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_ingredients_trgm ON recipes USING GIN (search_ingredients gin_trgm_ops)",
+]
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts
+        USING fts5(search_title, search_ingredients, content='recipes', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, search_title, search_ingredients)
+        VALUES (new.id, new.search_title, new.search_ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, search_title, search_ingredients)
+        VALUES ('delete', old.id, old.search_title, old.search_ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_update AFTER UPDATE OF search_title, search_ingredients ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, search_title, search_ingredients)
+        VALUES ('delete', old.id, old.search_title, old.search_ingredients);
+        INSERT INTO recipes_fts(rowid, search_title, search_ingredients)
+        VALUES (new.id, new.search_title, new.search_ingredients);
+    END""",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Recipe.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Recipe.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Recipe.__table__, "before_drop", DDL("DROP TABLE IF EXISTS recipes_fts").execute_if(dialect="sqlite"))
+
+
+# ingredients נשמר לפעמים כ-JSON ([{"name": "בצל", "amount": "1"}]) – לאינדקס נכנסים רק שמות המצרכים
+def ingredients_search_text(ingredients) -> str:
+    return " ".join(ingredient_items(ingredients))
+
+
+def recipe_search_columns(title, ingredients) -> dict:
+    return {
+        "search_title": index_terms(title or ""),
+        "search_ingredients": index_terms(ingredients_search_text(ingredients)),
+    }
+
+
+@event.listens_for(Recipe, "before_insert")
+def _fill_search_columns_on_insert(mapper, connection, recipe):
+    for key, value in recipe_search_columns(recipe.title, recipe.ingredients).items():
+        setattr(recipe, key, value)
+
+
+@event.listens_for(Recipe, "before_update")
+def _fill_search_columns_on_update(mapper, connection, recipe):
+    attrs = inspect(recipe).attrs
+    if attrs.title.history.has_changes():
+        recipe.search_title = index_terms(recipe.title or "")
+    if attrs.ingredients.history.has_changes():
+        recipe.search_ingredients = index_terms(ingredients_search_text(recipe.ingredients))
+
+
+# INSERT ... ON CONFLICT לפי הדיאלקט של החיבור: Postgres ב-production, SQLite בבדיקות
+def dialect_insert(bind):
+    return postgresql_insert if bind.dialect.name == "postgresql" else sqlite_insert
+
+
+# 🥕 כתיבה מחדש של שורות recipe_ingredients למתכון, ב-Core על החיבור הנתון (גם מתוך flush)
+def sync_recipe_ingredients(connection, recipe_id: int, ingredients):
+    connection.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == recipe_id))
+    insert_recipe_ingredients(connection, {recipe_id: ingredients})
+
+
+# שורות recipe_ingredients לכמה מתכונים בבת אחת (recipe_id -> ingredients) – שלוש פקודות לכל המנה, לא לכל מתכון.
+# מצרכים חדשים נכנסים למילון עם ON CONFLICT DO NOTHING – שתי כתיבות במקביל לא נכשלות על אותו מצרך
+def insert_recipe_ingredients(connection, ingredients_by_recipe: dict):
+    parsed = {recipe_id: parse_ingredients(ingredients) for recipe_id, ingredients in ingredients_by_recipe.items()}
+    names = {canonical: name for items in parsed.values() for canonical, name in items}
+    if not names:
+        return
+
+    insert = dialect_insert(connection)
+    connection.execute(
+        insert(Ingredient).on_conflict_do_nothing(index_elements=["canonical"]),
+        [{"canonical": canonical, "name": name} for canonical, name in names.items()],
+    )
+    ids = dict(connection.execute(select(Ingredient.canonical, Ingredient.id).where(Ingredient.canonical.in_(list(names)))).all())
+    connection.execute(insert(RecipeIngredient), [
+        {"recipe_id": recipe_id, "ingredient_id": ids[canonical]}
+        for recipe_id, items in parsed.items()
+        for canonical, _ in items
+    ])
+
+
+@event.listens_for(Recipe, "after_insert")
+def _sync_ingredients_on_insert(mapper, connection, recipe):
+    sync_recipe_ingredients(connection, recipe.id, recipe.ingredients)
+
+
+@event.listens_for(Recipe, "after_update")
+def _sync_ingredients_on_update(mapper, connection, recipe):
+    if inspect(recipe).attrs.ingredients.history.has_changes():
+        sync_recipe_ingredients(connection, recipe.id, recipe.ingredients)
+
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
+from app.db.async_database import get_async_read_db
 from app.models import User
 from app.schemas.comment_schema import CommentCreate, CommentResponse
 from app.services import users_services, comments_service
@@ -12,8 +14,8 @@ def add_comment(recipe_id: int, comment: CommentCreate, db: Session = Depends(ge
     return comments_service.add_comment(recipe_id, comment, db, current_user)
 
 @router.get("/{recipe_id}", response_model=list[CommentResponse])
-def get_comments(recipe_id: int, db: Session = Depends(get_db)):
-    return comments_service.get_comments(recipe_id, db)
+async def get_comments(recipe_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(lambda session: comments_service.get_comments(recipe_id, session))
 
 
 @router.delete("/{comment_id}")
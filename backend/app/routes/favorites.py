@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
+from app.db.async_database import get_async_read_db
 from app.models import Favorite, Recipe, User
 from app.services import users_services, favorites_services
-from app.schemas.recipe_schema import RecipeResponse
+from typing import Union
+from app.schemas.recipe_schema import RecipeResponse, RecipeCard, RecipeView
 
 router = APIRouter(prefix="/favorites", tags=["favorites"])
 
@@ -12,9 +15,10 @@ def add_favorite(recipe_id: int,db: Session = Depends(get_db),current_user: User
     return favorites_services.add_favorite(recipe_id, db, current_user)
 
 
-@router.get("/", response_model=list[RecipeResponse])
-def get_favorites(db: Session = Depends(get_db),current_user: User = Depends(users_services.get_current_user)):
-    return favorites_services.get_favorites(db, current_user)
+@router.get("/", response_model=list[Union[RecipeCard, RecipeResponse]])
+async def get_favorites(db: AsyncSession = Depends(get_async_read_db),current_user: User = Depends(users_services.get_current_user_async),
+    view: RecipeView = RecipeView.card):
+    return await db.run_sync(lambda session: favorites_services.get_favorites(session, current_user, view))
 
 
 @router.delete("/{recipe_id}")
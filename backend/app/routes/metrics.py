@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from app.models import User
+from app.services.users_services import admin_required
+from app.services.cache import response_cache, principal_cache
+from app.db.database import engine, replica_engine, REPLICA_DATABASE_URL
+from app.db.async_database import async_engine, async_replica_engine
+from app.db.pool import pool_status, async_pool_metrics, replica_pool_metrics, async_replica_pool_metrics
+from app.db.routing import sticky_writes
+from app.db.query_stats import query_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+# 📊 מוני המטמון (hits / misses / evictions) – לכיוון max_entries ו-TTL. מטמון המשתמשים המחוברים תחת "principals"
+@router.get("/cache")
+def get_cache_metrics(current_user: User = Depends(admin_required)):
+    return {**response_cache.stats(), "principals": principal_cache.stats()}
+
+
+# 🏊 בריכת החיבורים: בשימוש / overflow / ממתינים בתור, זמני המתנה ל-checkout ו-timeouts.
+# הבריכה של ה-routes האסינכרוניים תחת "async"; עם replica מוגדר – גם בריכות ה-replica וחלוקת הקריאות
+@router.get("/pool")
+def get_pool_metrics(current_user: User = Depends(admin_required)):
+    status = {**pool_status(engine), "async": pool_status(async_engine.sync_engine, async_pool_metrics)}
+    if REPLICA_DATABASE_URL:
+        status["replica"] = {
+            **pool_status(replica_engine, replica_pool_metrics),
+            "async": pool_status(async_replica_engine.sync_engine, async_replica_pool_metrics),
+            "routing": sticky_writes.stats(),
+        }
+    return status
+
+
+# 🔢 שאילתות SQL לכל route: ממוצע / מקסימום לבקשה, זמן DB ממוצע, וכמה בקשות חשודות ב-N+1. הכבדים ראשונים
+@router.get("/queries")
+def get_query_metrics(current_user: User = Depends(admin_required)):
+    return query_metrics.stats()
@@ -1,33 +1,117 @@
-from fastapi import APIRouter, Depends, Query, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, Query, Form, BackgroundTasks, Response, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db, get_read_db
+from app.db.async_database import get_async_read_db
+from app.db.routing import read_your_writes
+from app.db.slow_queries import slow_queries
 from app.models import User
-from app.services.users_services import get_current_user, admin_required 
-from app.schemas.recipe_schema import RecipeAdminUpdate, ratingRequest, RecipeUpdate, RecipeResponse, ShareRequest, DifficultyLevel
+from app.services.users_services import get_current_user, get_current_user_async, admin_required 
+from app.schemas.recipe_schema import RecipeAdminUpdate, ratingRequest, RecipeUpdate, RecipeResponse, ShareRequest, DifficultyLevel, RecipeCard, RecipeView, CookableRecipe, Suggestion, SuggestionKind, AdminRecipeFilters, AdminRecipePage
 from fastapi import UploadFile, File
-from typing import Optional
-from app.services import recipe_services
+from typing import Optional, Union
+from app.services import recipe_services, site_counters, http_cache, search_service, ingredient_service, data_transfer
+from app.services.pagination import ADMIN_PAGE_SIZE, MAX_ADMIN_PAGE_SIZE
+from app.services.cache import response_cache, FEEDS, recipe_tag
+from app.services.autocomplete import autocomplete, MAX_SUGGESTIONS
 
 
 PAGE_SIZE = 8
+MAX_PAGE_SIZE = 50
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
 
+# recipe: שורת גרסה מה-DB, RecipeResponse, או ה-dict של share
+def _recipe_validators(recipe):
+    field = recipe.get if isinstance(recipe, dict) else lambda name: getattr(recipe, name)
+    etag = http_cache.make_etag(f"r{field('id')}", f"v{field('version')}")
+    return etag, field("updated_at") or field("created_at")
+
+
+def _feed_validators(revision):
+    if revision is None:
+        return http_cache.make_etag("feed", 0), None
+    return http_cache.make_etag("feed", revision.value), revision.updated_at
+
+
+# 🏷️ פיד עם ETag: בבקשה מותנית בודקים רק את feed_revision (שורה אחת לפי מפתח ראשי).
+# הגרסה נשמרת במטמון יחד עם התוכן ונקראת לפני השאילתה – ה-ETag אף פעם לא חדש מהתוכן שהוא מתאר
+def _feed_response(request: Request, response: Response, db: Session, key: tuple, compute):
+    if http_cache.is_conditional(request):
+        validators = _feed_validators(site_counters.read(db, site_counters.FEED_REVISION))
+        if http_cache.is_not_modified(request, *validators):
+            return http_cache.not_modified(*validators)
+
+    def compute_with_validators():
+        validators = _feed_validators(site_counters.read(db, site_counters.FEED_REVISION))
+        return validators, compute()
+
+    # מי שכתב עכשיו קורא מה-primary ישירות, לא מהמטמון המשותף (ראו app/db/routing.py)
+    if read_your_writes(db):
+        validators, body = compute_with_validators()
+    else:
+        validators, body = response_cache.get_or_set(key, [FEEDS], compute_with_validators)
+    http_cache.set_validators(response, *validators)
+    return body
+
+
+# 🏷️ מתכון בודד: אותו עיקרון לפי version של השורה. allowed מחליט אם מותר לענות 304 למבקש
+def _recipe_response(request: Request, response: Response, lookup, allowed, compute, key=None, tags=None):
+    if http_cache.is_conditional(request):
+        row = lookup()
+        if row is not None and allowed(row):
+            validators = _recipe_validators(row)
+            if http_cache.is_not_modified(request, *validators):
+                return http_cache.not_modified(*validators)
+
+    recipe = compute() if key is None else response_cache.get_or_set(key, tags, compute)
+    http_cache.set_validators(response, *_recipe_validators(recipe))
+    return recipe
+
+
+# ⚡ הגרסאות האסינכרוניות: אותם שירותי קריאה (select על שכבת ה-projection) רצים דרך AsyncSession.run_sync –
+# הקוד נשאר אחד, ובזמן ההמתנה ל-DB ה-event loop ממשיך לשרת בקשות אחרות. compute / lookup מקבלים את ה-session
+async def _async_feed_response(request: Request, response: Response, db: AsyncSession, key: tuple, compute):
+    return await db.run_sync(lambda session: _feed_response(request, response, session, key, lambda: compute(session)))
+
+
+async def _async_recipe_response(request: Request, response: Response, db: AsyncSession, lookup, allowed, compute,
+                                 key=None, tags=None):
+    if read_your_writes(db):
+        key = None
+    return await db.run_sync(lambda session: _recipe_response(
+        request, response, lambda: lookup(session), allowed, lambda: compute(session), key, tags))
+
+
 
 @router.get("/", response_model=dict)
-def get_all_recipes(
-    db: Session = Depends(get_db),
+async def get_all_recipes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
     page: int = Query(1, ge=1),
-    page_size: int = PAGE_SIZE
+    page_size: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: RecipeView = RecipeView.card
 ):
-    return recipe_services.get_all_recipes(db, page, page_size)
+    return await _async_feed_response(request, response, db, ("all", page, page_size, cursor, view),
+        lambda session: recipe_services.get_all_recipes(session, page, page_size, cursor, view))
 
 
 
 @router.get("/public-random", response_model=list[RecipeResponse])
-def get_random_public_recipes(db: Session = Depends(get_db)):
-    return recipe_services.get_random_public_recipes(db)
+async def get_random_public_recipes(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db),
+    seed: Optional[int] = Query(None, ge=0, lt=recipe_services.FEED_SEED_RANGE)):
+    # ה-seed חוזר בכותרת כדי לא לשבור את צורת התשובה (רשימה)
+    if seed is None:
+        seed = recipe_services.new_feed_seed()
+        response.headers["X-Feed-Seed"] = str(seed)
+        return await db.run_sync(lambda session: recipe_services.get_random_public_recipes(session, seed=seed))
+    response.headers["X-Feed-Seed"] = str(seed)
+    return await _async_feed_response(request, response, db, ("public-random", seed),
+        lambda session: recipe_services.get_random_public_recipes(session, seed=seed))
 
 
 
@@ -62,13 +146,21 @@ def add_recipe(
 
 
 @router.get("/public/{recipe_id}", response_model=RecipeResponse)
-def get_public_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    return recipe_services.get_public_recipe(recipe_id, db)
+async def get_public_recipe(recipe_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    return await _async_recipe_response(
+        request, response, db,
+        lookup=lambda session: recipe_services.get_recipe_validators(session, recipe_id),
+        allowed=lambda row: row.is_public,
+        compute=lambda session: recipe_services.get_public_recipe(recipe_id, session),
+        key=("public", recipe_id),
+        tags=[recipe_tag(recipe_id)],
+    )
     
 
-@router.get("/me", response_model=list[RecipeResponse])
-def get_my_recipes(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return recipe_services.get_my_recipes(db, current_user)
+@router.get("/me", response_model=list[Union[RecipeCard, RecipeResponse]])
+def get_my_recipes(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user),
+    view: RecipeView = RecipeView.card):
+    return recipe_services.get_my_recipes(db, current_user, view)
     
 
 
@@ -84,24 +176,80 @@ def update_recipe(recipe_id: int,updated_data: RecipeUpdate,db: Session = Depend
 
 
 
-@router.get("/search", response_model=list[RecipeResponse])
-def search_recipes(title: Optional[str] = Query(default=None),ingredient: Optional[str] = Query(default=None),
-    creator_name: Optional[str] = Query(default=None),db: Session = Depends(get_db)):
-    return recipe_services.search_recipes(title, ingredient, creator_name, db)
+# 🔎 חיפוש מדורג: q בכותרת ובמצרכים, title / ingredient לשדה מסוים. העמוד הבא – לפי X-Next-Cursor.
+# fuzzy=true – חיפוש סלחני לשגיאות הקלדה לפי דמיון טריגרמות (threshold בין 0 ל-1, ברירת מחדל בשרת)
+@router.get("/search", response_model=list[Union[RecipeCard, RecipeResponse]])
+def search_recipes(response: Response, title: Optional[str] = Query(default=None),ingredient: Optional[str] = Query(default=None),
+    creator_name: Optional[str] = Query(default=None),db: Session = Depends(get_read_db), view: RecipeView = RecipeView.card,
+    q: Optional[str] = Query(default=None), cursor: Optional[str] = None,
+    limit: int = Query(search_service.SEARCH_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fuzzy: bool = False, threshold: Optional[float] = Query(default=None, gt=0, le=1)):
+    recipes, next_cursor = search_service.search_page(db, q, title, ingredient, creator_name, cursor, limit, view,
+                                                      fuzzy, threshold)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return recipes
     
 
 
+# 🔤 השלמה אוטומטית מהזיכרון (עץ תחיליות) – בלי שאילתה ל-DB בכל הקשה
+@router.get("/autocomplete", response_model=list[Suggestion])
+def autocomplete_recipes(q: str = Query(..., min_length=1, max_length=100), kind: list[SuggestionKind] = Query(default=list(SuggestionKind)),
+    limit: int = Query(MAX_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS), db: Session = Depends(get_read_db)):
+    autocomplete.ensure_built(db)
+    return autocomplete.suggest(q, [k.value for k in kind], limit)
+
+
+# 🧺 מה אפשר לבשל: have=ביצים&have=עגבניות (או "ביצים, עגבניות") – מתכונים לפי אחוז המצרכים שכבר יש
+@router.get("/cook", response_model=list[CookableRecipe])
+def cook_with(response: Response, have: list[str] = Query(...), db: Session = Depends(get_read_db),
+    min_coverage: float = Query(0.0, ge=0, le=1), view: RecipeView = RecipeView.card, cursor: Optional[str] = None,
+    limit: int = Query(ingredient_service.COOK_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    results, next_cursor = ingredient_service.cook_page(db, have, min_coverage, cursor, limit, view)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
+
+
 @router.get("/{recipe_id}", response_model=RecipeResponse)
-def get_recipe_by_id(recipe_id: int,db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
-    return recipe_services.get_recipe_by_id(recipe_id, db, current_user)
+async def get_recipe_by_id(recipe_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)):
+    return await _async_recipe_response(
+        request, response, db,
+        lookup=lambda session: recipe_services.get_recipe_validators(session, recipe_id),
+        allowed=lambda row: row.is_public or row.user_id == current_user.id or current_user.is_admin,
+        compute=lambda session: recipe_services.get_recipe_by_id(recipe_id, session, current_user),
+    )
     
 
 
 
 
-@router.get("/admin/recipes", response_model=list[RecipeResponse])
+# ⚠️ כל המתכונים בתשובה אחת – נשאר לתאימות. ברשימות גדולות: /admin/recipes/page ו-/admin/recipes/export
+@router.get("/admin/recipes", response_model=list[RecipeResponse], deprecated=True)
 def get_all_recipes_admin(current_user: User = Depends(admin_required),db: Session = Depends(get_db)):
     return recipe_services.get_all_recipes_admin(current_user, db)
+
+
+# 📄 מתכונים בעמודי keyset, עם סינון (ציבורי / פרטי, יוצר, טווח תאריכים, רמת קושי) ומיון בצד ה-DB
+@router.get("/admin/recipes/page", response_model=AdminRecipePage)
+def get_admin_recipes_page(filters: AdminRecipeFilters = Depends(), cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_ADMIN_PAGE_SIZE),
+    current_user: User = Depends(admin_required), db: Session = Depends(get_read_db)):
+    return recipe_services.get_admin_recipes_page(db, filters, cursor, limit)
+
+
+# 📤 ייצוא CSV / NDJSON בזרימה, באותו סינון ומיון
+@router.get("/admin/recipes/export")
+def export_admin_recipes(filters: AdminRecipeFilters = Depends(),
+    fmt: str = Query(data_transfer.CSV, alias="format", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(admin_required), db: Session = Depends(get_read_db)):
+    columns, rows = recipe_services.admin_recipe_export_rows(db, filters)
+    return StreamingResponse(
+        data_transfer.iter_chunks(fmt, columns, rows),
+        media_type=data_transfer.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="recipes.{fmt}"'},
+    )
     
 
 @router.delete("/admin/recipes/{recipe_id}")
@@ -119,13 +267,13 @@ def rate_recipe(recipe_id: int,rating_data: ratingRequest,db: Session = Depends(
     
 
 @router.get("/{recipe_id}/average-rating")
-def get_average_rating(recipe_id: int, db: Session = Depends(get_db)):
+def get_average_rating(recipe_id: int, db: Session = Depends(get_read_db)):
     return recipe_services.get_average_rating(recipe_id, db)
 
 
 
 @router.get("/top-rated", response_model=list[RecipeResponse])
-def get_top_rated_recipes(db: Session = Depends(get_db)):
+def get_top_rated_recipes(db: Session = Depends(get_read_db)):
     return recipe_services.get_top_rated_recipes(db)
 
 
@@ -135,8 +283,15 @@ def upload_recipe_image(file: UploadFile = File(...)):
 
 
 @router.get("/share/{token}")
-def get_shared_recipe(token: str, db: Session = Depends(get_db)):
-   return recipe_services.get_shared_recipe(token, db)
+async def get_shared_recipe(token: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    return await _async_recipe_response(
+        request, response, db,
+        lookup=lambda session: recipe_services.get_shared_recipe_validators(session, token),
+        allowed=lambda row: row.is_public,
+        compute=lambda session: recipe_services.get_shared_recipe(token, session),
+        key=("share", token),
+        tags=lambda recipe: [recipe_tag(recipe["id"])],
+    )
 
 
 @router.post("/share/send")
@@ -144,28 +299,47 @@ def send_recipe_via_email(data: ShareRequest,background_tasks: BackgroundTasks,d
     return recipe_services.send_recipe_via_email(data, background_tasks, db)
 
 
+# 📄 הפידים הממוינים: page לתאימות לאחור, או cursor (next_cursor מהתשובה הקודמת) לעמוד keyset
 @router.get("/sorted/top-rated")
-def get_top_rated_recipes(db: Session = Depends(get_db),page: int = 1):
-    return recipe_services.get_top_rated_recipes( db, page)
+async def get_top_rated_recipes(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), page: int = Query(1, ge=1), cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), view: RecipeView = RecipeView.card):
+    return await _async_feed_response(request, response, db, ("top-rated", page, cursor, limit, view),
+        lambda session: recipe_services.get_top_rated_recipes(session, page, cursor, limit, view))
 
 
 @router.get("/sorted/random")
-def get_random_recipes(db: Session = Depends(get_db), page: int = 1,):
-    return recipe_services.get_random_recipes(db, page)
+async def get_random_recipes(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), page: int = Query(1, ge=1),
+    seed: Optional[int] = Query(None, ge=0, lt=recipe_services.FEED_SEED_RANGE), cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), view: RecipeView = RecipeView.card):
+    # בלי seed נוצר סיבוב חדש בכל בקשה – אין מה לשמור
+    if seed is None:
+        return await db.run_sync(lambda session: recipe_services.get_random_recipes(session, page, seed, cursor, limit, view))
+    return await _async_feed_response(request, response, db, ("random", page, seed, cursor, limit, view),
+        lambda session: recipe_services.get_random_recipes(session, page, seed, cursor, limit, view))
 
 
 @router.get("/sorted/recent")
-def get_recent_recipes(db: Session = Depends(get_db), page: int = 1):
-    return recipe_services.get_recent_recipes(db, page)
+async def get_recent_recipes(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), page: int = Query(1, ge=1), cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), view: RecipeView = RecipeView.card):
+    return await _async_feed_response(request, response, db, ("recent", page, cursor, limit, view),
+        lambda session: recipe_services.get_recent_recipes(session, page, cursor, limit, view))
 
 
 
 @router.get("/sorted/favorited")
-def get_most_favorited_recipes(db: Session = Depends(get_db), page: int = 1):
-    return recipe_services.get_most_favorited_recipes(db, page)
+async def get_most_favorited_recipes(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), page: int = Query(1, ge=1), cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), view: RecipeView = RecipeView.card):
+    return await _async_feed_response(request, response, db, ("favorited", page, cursor, limit, view),
+        lambda session: recipe_services.get_most_favorited_recipes(session, page, cursor, limit, view))
 
 
 @router.get("/admin/stats")
 def get_admin_stats(db: Session = Depends(get_db),current_user: User = Depends(admin_required)):
     return recipe_services.get_admin_stats(db, current_user)
 
+
+# 🐢 השאילתות האיטיות האחרונות (מעל DB_SLOW_QUERY_MS) עם ה-route שהריץ אותן, ותוכנית EXPLAIN לכל טביעת אצבע
+@router.get("/admin/slow-queries")
+def get_slow_queries(current_user: User = Depends(admin_required)):
+    return slow_queries.snapshot()
+
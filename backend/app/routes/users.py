@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from typing import Optional
+from app.db.database import get_db, get_read_db
 from app.schemas import user_schema 
 from app.models import User
 import os
 from dotenv import load_dotenv
-from app.services import users_services
+from app.services import users_services, data_transfer
+from app.services.pagination import ADMIN_PAGE_SIZE, MAX_ADMIN_PAGE_SIZE
 load_dotenv()
 
 
@@ -42,13 +45,34 @@ def reset_password(request: user_schema.ResetPasswordRequest,db: Session = Depen
     return users_services.reset_password(request, db)
 
 
-@router.get("/admin/users", response_model=list[user_schema.UserResponse])  # או תיצור סכמת תגובה נפרדת אם צריך
+# ⚠️ כל המשתמשים בתשובה אחת – נשאר לתאימות. ברשימות גדולות: /admin/users/page ו-/admin/users/export
+@router.get("/admin/users", response_model=list[user_schema.UserResponse], deprecated=True)  # או תיצור סכמת תגובה נפרדת אם צריך
 def get_all_users(current_user: User = Depends(users_services.admin_required),db: Session = Depends(get_db)):
     return users_services.get_all_users(current_user, db)
 
+# 📄 משתמשים בעמודי keyset, עם סינון (אדמין / תאריך הרשמה) ומיון בצד ה-DB. next_cursor -> ?cursor= לעמוד הבא
+@router.get("/admin/users/page", response_model=user_schema.AdminUserPage)
+def get_admin_users_page(filters: user_schema.AdminUserFilters = Depends(), cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_ADMIN_PAGE_SIZE),
+    current_user: User = Depends(users_services.admin_required), db: Session = Depends(get_read_db)):
+    return users_services.get_admin_users_page(db, filters, cursor, limit)
+
+
+# 📤 ייצוא CSV / NDJSON בזרימה, באותו סינון ומיון – בלי לטעון את כל הטבלה לזיכרון
+@router.get("/admin/users/export")
+def export_admin_users(filters: user_schema.AdminUserFilters = Depends(),
+    fmt: str = Query(data_transfer.CSV, alias="format", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(users_services.admin_required), db: Session = Depends(get_read_db)):
+    columns, rows = users_services.admin_user_export_rows(db, filters)
+    return StreamingResponse(
+        data_transfer.iter_chunks(fmt, columns, rows),
+        media_type=data_transfer.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="users.{fmt}"'},
+    )
+
 @router.delete("/admin/users/{user_id}")
-def delete_user(user_id: int,current_user: User = Depends(users_services.admin_required),db: Session = Depends(get_db)):
-    return users_services.delete_user(user_id, current_user, db)
+def delete_user(user_id: int, background_tasks: BackgroundTasks, current_user: User = Depends(users_services.admin_required),db: Session = Depends(get_db)):
+    return users_services.delete_user(user_id, current_user, db, background_tasks)
 
 
 @router.put("/update-profile-image")
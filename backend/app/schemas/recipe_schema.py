@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Union
 from uuid import UUID
 from enum import Enum
+from datetime import datetime
 
 
 class DifficultyLevel(str, Enum):
@@ -10,6 +11,28 @@ class DifficultyLevel(str, Enum):
     קשה = "קשה"
 
 
+# תצוגת רשימה (card, ברירת מחדל) או מתכון מלא עם הטקסטים הארוכים (full)
+class RecipeView(str, Enum):
+    card = "card"
+    full = "full"
+
+
+# מיון ברשימות האדמין – תמיד (created_at, id), כך שה-keyset נשען על אינדקס
+class AdminSort(str, Enum):
+    newest = "newest"
+    oldest = "oldest"
+
+
+# 🔎 סינון רשימת המתכונים של האדמין (query params, דרך Depends()) – משותף לעמודים ולייצוא
+class AdminRecipeFilters(BaseModel):
+    is_public: Optional[bool] = None
+    creator_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    difficulty: Optional[DifficultyLevel] = None
+    sort: AdminSort = AdminSort.newest
+
+
 class RecipeCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -40,6 +63,8 @@ class RecipeResponse(BaseModel):
     user_id: int
     difficulty: DifficultyLevel  
     prep_time: str
+    version: int = 1
+    updated_at: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -47,6 +72,51 @@ class RecipeResponse(BaseModel):
 
 
 
+class AdminRecipePage(BaseModel):
+    recipes: list[RecipeResponse]
+    next_cursor: Optional[str] = None
+
+# 🃏 כרטיס מתכון לרשימות ולפידים – בלי description / ingredients / instructions
+class RecipeCard(BaseModel):
+    id: int
+    title: str
+    image_url: Optional[str] = None
+    created_at: Optional[str] = None
+    creator_name: str
+    share_token: UUID
+    is_public: bool
+    average_rating: Optional[float] = None
+    user_id: int
+    difficulty: DifficultyLevel
+    prep_time: str
+    version: int = 1
+
+    class Config:
+        from_attributes = True
+
+
+# 🧺 תוצאה של "מה אפשר לבשל": המתכון + כמה ממצרכיו יש (matched / total) ומה חסר
+class CookableRecipe(BaseModel):
+    recipe: Union[RecipeCard, RecipeResponse]
+    matched: int
+    total: int
+    coverage: float
+    missing: list[str] = []
+
+
+class SuggestionKind(str, Enum):
+    title = "title"
+    ingredient = "ingredient"
+    creator = "creator"
+
+
+# 🔤 הצעת השלמה לתיבת החיפוש; score = פופולריות (מועדפים / מספר מתכונים)
+class Suggestion(BaseModel):
+    text: str
+    kind: SuggestionKind
+    score: int
+
+
 class RecipeUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import datetime
+from enum import Enum
 
 class UserCreate(BaseModel):
     username: str
@@ -52,3 +53,20 @@ class UserResponse(BaseModel):
         from_attributes = True  
 
 
+# מיון רשימת המשתמשים של האדמין: (created_at, id) או (username, id) – שניהם על אינדקס
+class AdminUserSort(str, Enum):
+    newest = "newest"
+    oldest = "oldest"
+    username = "username"
+
+
+class AdminUserFilters(BaseModel):
+    is_admin: Optional[bool] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    sort: AdminUserSort = AdminUserSort.newest
+
+
+class AdminUserPage(BaseModel):
+    users: list[UserResponse]
+    next_cursor: Optional[str] = None
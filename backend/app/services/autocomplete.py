@@ -0,0 +1,256 @@
+import heapq
+import os
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Recipe, User, Ingredient, RecipeIngredient
+from app.utils.hebrew import tokens
+
+TITLE = "title"
+INGREDIENT = "ingredient"
+CREATOR = "creator"
+KINDS = (TITLE, INGREDIENT, CREATOR)
+
+MAX_SUGGESTIONS = 10
+# גבול זיכרון: מספר מונחים לכל סוג, ואורך מפתח מקסימלי (= עומק העץ)
+MAX_TERMS = int(os.getenv("AUTOCOMPLETE_MAX_TERMS", "50000"))
+MAX_KEY_LENGTH = 40
+
+
+def term_key(text) -> str:
+    return " ".join(tokens(text or ""))
+
+
+class _Node:
+    __slots__ = ("children", "keys", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()  # מונחים שאחד המסלולים שלהם מסתיים כאן
+        self.top = None    # מטמון top-k של תת-העץ (רשימת מפתחות ממוינת), None = לחשב מחדש
+
+
+# 🌳 עץ תחיליות עם top-k מוכן בכל צומת: חיפוש = הליכה לאורך התחילית + קריאת הרשימה המוכנה.
+# כל מונח נכנס גם מכל תחילת מילה בו – "שוקו" מוצא את "עוגת שוקולד"
+class PrefixTrie:
+    def __init__(self, max_terms: int = MAX_TERMS, k: int = MAX_SUGGESTIONS):
+        self.max_terms = max_terms
+        self.k = k
+        self.root = _Node()
+        self.terms = {}  # key -> [display, weight]
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.terms)
+
+    @staticmethod
+    def _paths(key: str) -> set:
+        starts = [0] + [i + 1 for i, ch in enumerate(key) if ch == " "]
+        return {key[start:start + MAX_KEY_LENGTH] for start in starts}
+
+    def _rank(self, key):
+        return (-self.terms[key][1], key)
+
+    def add(self, key: str, display: str, delta: int):
+        if not key or not delta:
+            return
+        entry = self.terms.get(key)
+        if entry is None:
+            if delta < 0:
+                return
+            if len(self.terms) >= self.max_terms:
+                self.dropped += 1
+                return
+            entry = self.terms[key] = [display, 0]
+        entry[1] += delta
+        removed = entry[1] <= 0
+
+        for path in self._paths(key):
+            node = self.root
+            trail = [node]
+            for ch in path:
+                child = node.children.get(ch)
+                if child is None:
+                    child = node.children[ch] = _Node()
+                node = child
+                trail.append(node)
+            if removed:
+                node.keys.discard(key)
+            else:
+                node.keys.add(key)
+            for node in trail:
+                self._update_top(node, key, delta, removed)
+            if removed:
+                self._prune(path, trail)
+        if removed:
+            del self.terms[key]
+
+    # עדכון המטמון בלי לחשב מחדש: עלייה במשקל נכנסת במקום; ירידה של מונח מה-top מוחקת את המטמון
+    def _update_top(self, node: _Node, key: str, delta: int, removed: bool):
+        top = node.top
+        if top is None:
+            return
+        complete = len(top) < self.k  # המטמון מכיל את כל תת-העץ
+        if key in top:
+            if removed:
+                top.remove(key)
+                if not complete:
+                    node.top = None
+                return
+            if delta < 0 and not complete:
+                node.top = None
+                return
+        elif removed or (delta < 0 and not complete):
+            return
+        else:
+            top.append(key)
+        top.sort(key=self._rank)
+        del top[self.k:]
+
+    def _prune(self, path: str, trail: list):
+        for depth in range(len(path), 0, -1):
+            node = trail[depth]
+            if node.children or node.keys:
+                return
+            del trail[depth - 1].children[path[depth - 1]]
+
+    def _compute_top(self, node: _Node) -> list:
+        keys = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            keys.update(current.keys)
+            stack.extend(current.children.values())
+        return heapq.nsmallest(self.k, keys, key=self._rank)
+
+    def top(self, prefix: str, limit: int) -> list:
+        node = self.root
+        for ch in prefix[:MAX_KEY_LENGTH]:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        if node.top is None:
+            node.top = self._compute_top(node)
+        return [(key, *self.terms[key]) for key in node.top[:limit]]
+
+
+# 🔤 השלמה אוטומטית לתיבת החיפוש: כותרות, מצרכים קנוניים ושמות יוצרים – רק ממתכונים ציבוריים.
+# פופולריות: כותרת = 1 + מספר מועדפים, מצרך / יוצר = מספר המתכונים הציבוריים.
+# כל מתכון זוכר את התרומה שלו, כך שעדכון / מחיקה מחסירים בדיוק מה שנוסף
+class Autocomplete:
+    def __init__(self, max_terms: int = MAX_TERMS):
+        self._lock = threading.Lock()
+        self._max_terms = max_terms
+        self._built = False
+        self._reset()
+
+    def _reset(self):
+        self.tries = {kind: PrefixTrie(self._max_terms) for kind in KINDS}
+        self._contributions = {}  # recipe_id -> (user_id, [(kind, key, display, weight)])
+        self._recipes_by_user = {}
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._reset()
+
+    def ensure_built(self, db: Session):
+        if self._built:
+            return
+        contributions = _load_contributions(db)
+        with self._lock:
+            if self._built:
+                return
+            for recipe_id, (user_id, contribution) in contributions.items():
+                self._set_recipe(recipe_id, user_id, contribution)
+            self._built = True
+
+    def _set_recipe(self, recipe_id: int, user_id, contribution: list):
+        previous_user, previous = self._contributions.pop(recipe_id, (None, ()))
+        for kind, key, display, weight in previous:
+            self.tries[kind].add(key, display, -weight)
+        self._recipes_by_user.get(previous_user, set()).discard(recipe_id)
+        if contribution:
+            for kind, key, display, weight in contribution:
+                self.tries[kind].add(key, display, weight)
+            self._contributions[recipe_id] = (user_id, contribution)
+            self._recipes_by_user.setdefault(user_id, set()).add(recipe_id)
+
+    # נקראים משכבת השירותים אחרי commit; לפני שהאינדקס נבנה אין מה לעדכן
+    def refresh_recipes(self, db: Session, recipe_ids: list):
+        if not self._built or not recipe_ids:
+            return
+        contributions = _load_contributions(db, Recipe.id.in_(recipe_ids))
+        with self._lock:
+            for recipe_id in recipe_ids:
+                user_id, contribution = contributions.get(recipe_id, (None, []))
+                self._set_recipe(recipe_id, user_id, contribution)
+
+    def refresh_recipe(self, db: Session, recipe_id: int):
+        self.refresh_recipes(db, [recipe_id])
+
+    # שינוי שם משתמש / מחיקת משתמש: כל המתכונים שלו (כולל אלה שכבר נמחקו מה-DB)
+    def refresh_user(self, db: Session, user_id: int):
+        if not self._built:
+            return
+        with self._lock:
+            known = set(self._recipes_by_user.get(user_id, ()))
+        current = db.scalars(select(Recipe.id).where(Recipe.user_id == user_id)).all()
+        self.refresh_recipes(db, sorted(known | set(current)))
+
+    def suggest(self, prefix: str, kinds=KINDS, limit: int = MAX_SUGGESTIONS) -> list:
+        key = term_key(prefix)
+        if not key:
+            return []
+        with self._lock:
+            candidates = [
+                (weight, kind, match, display)
+                for kind in kinds
+                for match, display, weight in self.tries[kind].top(key, limit)
+            ]
+        candidates.sort(key=lambda c: (-c[0], c[2]))
+        return [{"text": display, "kind": kind, "score": weight} for weight, kind, _, display in candidates[:limit]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "built": self._built,
+                **{f"{kind}_terms": len(trie) for kind, trie in self.tries.items()},
+                "dropped": sum(trie.dropped for trie in self.tries.values()),
+            }
+
+
+# שתי שאילתות: שורות המתכונים עם שם היוצר, ומצרכי אותם מתכונים מהמילון. הפופולריים קודם – הם נכנסים לפני הגבול
+def _load_contributions(db: Session, *criteria) -> dict:
+    public = [Recipe.is_public == True, *criteria]
+    rows = db.execute(
+        select(Recipe.id, Recipe.user_id, Recipe.title, Recipe.favorite_count, User.username)
+        .outerjoin(User, User.id == Recipe.user_id)
+        .where(*public, User.deleted_at.is_(None))
+        .order_by(Recipe.favorite_count.desc(), Recipe.id)
+    ).all()
+    contributions = {}
+    for row in rows:
+        contribution = [(TITLE, term_key(row.title), row.title, 1 + (row.favorite_count or 0))]
+        if row.username:
+            contribution.append((CREATOR, term_key(row.username), row.username, 1))
+        contributions[row.id] = (row.user_id, contribution)
+
+    if contributions:
+        ingredient_rows = db.execute(
+            select(RecipeIngredient.recipe_id, Ingredient.canonical, Ingredient.name)
+            .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+            .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+            .where(*public)
+        ).all()
+        for recipe_id, canonical, name in ingredient_rows:
+            if recipe_id in contributions:
+                contributions[recipe_id][1].append((INGREDIENT, canonical, name, 1))
+    return contributions
+
+
+autocomplete = Autocomplete()
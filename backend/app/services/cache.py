@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+# 🪪 המשתמש המחובר (id, username, is_admin, wants_emails) – נחסך SELECT על users בכל בקשה מאומתת.
+# הפסילה מקומית לתהליך; בין workers ה-TTL חוסם את זמן ההתיישנות
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# תגיות לפסילה: כל הפידים יחד, או מתכון בודד (public/{id}, share/{token})
+FEEDS = "feeds"
+
+_MISSING = object()
+
+
+def recipe_tag(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# 🧊 מטמון בזיכרון התהליך: TTL לכל רשומה + פינוי LRU כשמגיעים ל-max_entries.
+# כל פסילה מקדמת generation – תוצאה שחושבה לפני הכתיבה לא תישמר אחריה
+class TTLCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._keys_by_tag = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            if entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # ttl_seconds – TTL לרשומה הזו בלבד (למשל עד שהטוקן שטען אותה פג), לא יותר מה-TTL של המטמון
+    def set(self, key, value, tags=(), generation=None, ttl_seconds=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+            self._entries[key] = (self._clock() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    # tags יכול להיות רשימה, או פונקציה שמקבלת את התוצאה (כשהמזהה ידוע רק אחרי השאילתה)
+    def get_or_set(self, key, tags, compute, ttl_seconds=None):
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = compute()
+        self.set(key, value, tags(value) if callable(tags) else tags, generation, ttl_seconds)
+        return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    # ניקוי מלא כולל המונים (למשל בין בדיקות)
+    def reset(self):
+        self.clear()
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = TTLCache()
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+# נקראים משכבת השירותים אחרי commit
+def invalidate_recipe(recipe_id: int):
+    response_cache.invalidate(FEEDS, recipe_tag(recipe_id))
+
+
+def invalidate_all():
+    response_cache.clear()
+
+
+# אחרי commit שמשנה את המשתמש (פרופיל, סיסמה, מחיקה) – הבקשה הבאה שלו טוענת אותו מחדש
+def invalidate_user(user_id: int):
+    principal_cache.invalidate(user_tag(user_id))
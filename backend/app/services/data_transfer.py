@@ -0,0 +1,238 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO
+from uuid import uuid4
+from sqlalchemy import select, text, String, Boolean, Integer, Float, DateTime
+from sqlalchemy.orm import Session
+from app.models import User, Recipe, Rating, Favorite, Comment, recipe_search_columns, insert_recipe_ingredients
+from app.services import recipe_services, favorites_services, leaderboard_service, site_counters
+from app.services.trigram_index import reset_after_commit
+
+# 📦 ייבוא / ייצוא בכמויות (NDJSON או CSV) של משתמשים, מתכונים, דירוגים, מועדפים ותגובות.
+# ייבוא: במנות, executemany אחד לכל מנה (COPY ב-Postgres). ייצוא: זרימה מה-DB בלי לטעון טבלה שלמה לזיכרון
+BATCH_SIZE = 5000
+NDJSON = "ndjson"
+CSV = "csv"
+FORMATS = (NDJSON, CSV)
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv; charset=utf-8"}
+CHUNK_CHARS = 64 * 1024
+
+# העמודות שעוברות לכל ישות. כל השאר נגזר מחדש בייבוא: עמודות החיפוש, המצרכים, סיכומי הדירוג / המועדפים,
+# ה-leaderboards וגרסת הפיד. למשתמשים ולמתכונים id חובה – הדירוגים והמועדפים מצביעים עליו
+ENTITIES = {
+    "users": (User.__table__, ["id", "username", "email", "password", "created_at", "is_admin",
+        "profile_image_url", "wants_emails"]),
+    "recipes": (Recipe.__table__, ["id", "title", "description", "ingredients", "instructions", "image_url",
+        "video_url", "is_public", "created_at", "share_token", "prep_time", "difficulty", "user_id"]),
+    "ratings": (Rating.__table__, ["user_id", "recipe_id", "rating", "created_at"]),
+    "favorites": (Favorite.__table__, ["user_id", "recipe_id", "created_at"]),
+    "comments": (Comment.__table__, ["user_id", "recipe_id", "content", "created_at"]),
+}
+EXPLICIT_IDS = {"users", "recipes"}
+COUNTED = {"users": site_counters.USER_COUNT, "recipes": site_counters.RECIPE_COUNT}
+
+# COPY ... (FORMAT csv): תא לא מצוטט \N הוא NULL, "" הוא מחרוזת ריקה
+COPY_NULL = "\\N"
+
+# מעבר לסף הזה (מתוך מספר המתכונים, ולא פחות מ-MIN) בנייה מלאה אחת זולה מעדכון של כל מתכון בנפרד
+LEADERBOARD_REBUILD_FRACTION = 0.2
+LEADERBOARD_REBUILD_MIN = 1000
+
+
+def format_of(path: str) -> str:
+    return CSV if path.lower().endswith(".csv") else NDJSON
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[dict]:
+    if fmt == CSV:
+        # ב-CSV אין הבדל בין NULL למחרוזת ריקה – תא ריק = NULL
+        for row in csv.DictReader(stream):
+            yield {name: (value if value != "" else None) for name, value in row.items()}
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+# השורות כטקסט, במנות של ~CHUNK_CHARS תווים – לכתיבה לקובץ או לתשובת HTTP בזרימה (StreamingResponse)
+def iter_chunks(fmt: str, columns: list, rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns) if fmt == CSV else None
+    if writer is not None:
+        writer.writeheader()
+    for row in rows:
+        if writer is not None:
+            writer.writerow({name: _to_text(value) for name, value in row.items()})
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False, default=_to_text) + "\n")
+        if buffer.tell() >= CHUNK_CHARS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_rows(stream: TextIO, fmt: str, columns: list, rows: Iterable[dict]) -> int:
+    written = 0
+
+    def counted():
+        nonlocal written
+        for row in rows:
+            written += 1
+            yield row
+
+    for chunk in iter_chunks(fmt, columns, counted()):
+        stream.write(chunk)
+    return written
+
+
+# ערך מהקובץ לסוג של העמודה (ב-CSV הכל מחרוזות; ב-NDJSON רק התאריכים)
+def _parse(column, value):
+    if not isinstance(value, str) or isinstance(column.type, String):
+        return value
+    if isinstance(column.type, Boolean):
+        return value.strip().lower() in ("1", "true", "t", "yes")
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+# ברירות המחדל של המודל בצד Python (created_at, is_public, random_key...) – COPY לא מפעיל אותן,
+# לכן כל שורה יוצאת מלאה כבר כאן, ו-executemany ו-COPY מכניסים בדיוק את אותו דבר
+def _python_defaults(table) -> dict:
+    return {
+        column.name: column.default
+        for column in table.columns
+        if column.default is not None and not column.primary_key and (column.default.is_scalar or column.default.is_callable)
+    }
+
+
+def _prepare(entity: str, table, columns: list, defaults: dict, raw: dict, line: int) -> dict:
+    row = {name: _parse(table.c[name], raw.get(name)) for name in columns}
+    if entity in EXPLICIT_IDS and row["id"] is None:
+        raise ValueError(f"{entity} line {line}: missing id")
+    for name, default in defaults.items():
+        if row.get(name) is None:
+            row[name] = default.arg if default.is_scalar else default.arg(None)
+    if entity == "recipes":
+        row["share_token"] = row["share_token"] or str(uuid4())  # כמו ב-create_recipe: לכל מתכון קישור שיתוף
+        row.update(recipe_search_columns(row["title"], row["ingredients"]))
+    return row
+
+
+def _copy_rows(connection, table, rows: list):
+    columns = list(rows[0])
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    cursor = connection.connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([COPY_NULL if row[name] is None else _to_text(row[name]) for name in columns])
+            buffer.seek(0)
+            cursor.copy_expert(f"{sql} WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row([row[name] for name in columns])
+    finally:
+        cursor.close()
+
+
+def _insert_batch(connection, table, rows: list):
+    if connection.dialect.name == "postgresql":
+        _copy_rows(connection, table, rows)
+    else:
+        connection.execute(table.insert(), rows)
+
+
+# אחרי ייבוא עם id מפורש – הרצף של Postgres ממשיך מהמקסימום, אחרת ה-INSERT הבא מתנגש
+def _reset_sequence(connection, table):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"coalesce((SELECT max(id) FROM {table.name}), 0) + 1, false)"
+        ))
+
+
+# מספר המתכונים נקרא מ-site_counters (קריאה לפי מפתח ראשי) ולא ב-COUNT על הטבלה
+def _should_rebuild_leaderboards(db: Session, touched: int) -> bool:
+    if touched <= LEADERBOARD_REBUILD_MIN:
+        return False
+    counter = site_counters.read(db, site_counters.RECIPE_COUNT)
+    recipe_count = counter.value if counter else 0
+    return touched > LEADERBOARD_REBUILD_FRACTION * recipe_count
+
+
+# ✅ ייבוא שורות לישות אחת בטרנזקציה אחת (הכל או כלום). לא מבצע commit – הקורא אחראי על הטרנזקציה.
+# הסדר בין ישויות: users ← recipes ← ratings / favorites / comments.
+# טבלאות הדירוג מתעדכנות רק למתכונים שהדירוגים / המועדפים שיובאו נוגעים בהם, וכשהם רבים מדי (ראו
+# _should_rebuild_leaderboards) – בנייה מלאה אחת במקום. rebuild_leaderboards=True / False עוקף את הבחירה
+def import_rows(db: Session, entity: str, rows: Iterable[dict], batch_size: int = BATCH_SIZE,
+                rebuild_leaderboards: Optional[bool] = None) -> int:
+    table, columns = ENTITIES[entity]
+    defaults = _python_defaults(table)
+    connection = db.connection()
+    imported = 0
+    touched_recipe_ids = set()
+    raw_rows = iter(rows)
+    while True:
+        batch = [
+            _prepare(entity, table, columns, defaults, raw, imported + offset + 1)
+            for offset, raw in enumerate(islice(raw_rows, batch_size))
+        ]
+        if not batch:
+            break
+        _insert_batch(connection, table, batch)
+
+        if entity == "recipes":
+            insert_recipe_ingredients(connection, {row["id"]: row["ingredients"] for row in batch})
+        recipe_ids = list({row["recipe_id"] for row in batch}) if entity in ("ratings", "favorites") else None
+        if entity == "ratings":
+            recipe_services.refresh_rating_aggregates(db, recipe_ids)
+        elif entity == "favorites":
+            favorites_services.refresh_favorite_counts(db, recipe_ids)
+        if recipe_ids is not None and rebuild_leaderboards is not True:
+            touched_recipe_ids.update(recipe_ids)
+        imported += len(batch)
+
+    if entity in EXPLICIT_IDS:
+        _reset_sequence(connection, table)
+    if entity in COUNTED and imported:
+        site_counters.increment(db, COUNTED[entity], imported)
+    if rebuild_leaderboards is None:
+        rebuild_leaderboards = _should_rebuild_leaderboards(db, len(touched_recipe_ids))
+    if rebuild_leaderboards and imported:
+        leaderboard_service.rebuild(db)
+    elif touched_recipe_ids:
+        leaderboard_service.refresh_recipes(db, sorted(touched_recipe_ids))
+    if entity in ("recipes", "ratings", "favorites") and imported:
+        site_counters.bump_feed_revision_after_commit(db)
+    if entity == "recipes" and imported:
+        reset_after_commit(db)
+    return imported
+
+
+# ✅ ייצוא בזרימה, לפי מפתח ראשי – yield_per (server-side cursor ב-Postgres) מחזיק בזיכרון מנה אחת בכל פעם
+def export_rows(db: Session, entity: str, batch_size: int = BATCH_SIZE) -> Iterator[dict]:
+    table, columns = ENTITIES[entity]
+    stmt = select(*[table.c[name] for name in columns]).order_by(*table.primary_key.columns)
+    for row in db.execute(stmt, execution_options={"yield_per": batch_size}):
+        yield row._asdict()
@@ -1,69 +1,97 @@
 from fastapi import   HTTPException
+from sqlalchemy import update, select, delete, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import Favorite, Recipe, User
-from app.schemas.recipe_schema import RecipeResponse
+from typing import Optional
+from app.models import Favorite, Recipe, User, dialect_insert
+from app.schemas.recipe_schema import RecipeView
+from app.services.recipe_projection import recipe_rows, to_recipe_responses
+from app.services import leaderboard_service, site_counters
+from app.services.cache import invalidate_recipe
+from app.services.autocomplete import autocomplete
 
 
+# ⭐ הוספה במשפט אחד: INSERT ... ON CONFLICT DO NOTHING על (user_id, recipe_id).
+# אין שורה חוזרת = כבר במועדפים (גם בלחיצה כפולה במקביל); מתכון שלא קיים = הפרת מפתח זר / עדכון מונה שלא נגע בשורה
 def add_favorite(recipe_id: int,db: Session ,current_user: User):
-    # נבדוק אם המתכון קיים
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
+    insert = dialect_insert(db.get_bind())
+    try:
+        favorite_id = db.execute(
+            insert(Favorite)
+            .values(user_id=current_user.id, recipe_id=recipe_id)
+            .on_conflict_do_nothing(index_elements=["user_id", "recipe_id"])
+            .returning(Favorite.id)
+        ).scalar()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    # נבדוק אם הוא כבר נמצא במועדפים
-    existing = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.recipe_id == recipe_id
-    ).first()
-
-    if existing:
+    if favorite_id is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Recipe already in favorites")
 
-    # נוסיף למועדפים
-    favorite = Favorite(user_id=current_user.id, recipe_id=recipe_id)
-    db.add(favorite)
+    if not _apply_favorite_change(db, recipe_id, 1):
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    leaderboard_service.refresh_recipe(db, recipe_id)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)  # פופולריות הכותרת = מספר המועדפים
 
     return {"message": "Recipe added to favorites"}
 
-def get_favorites(db: Session ,current_user: User):
-    favorites = db.query(Favorite).filter(Favorite.user_id == current_user.id).all()
-
-    response = []
-
-    for f in favorites:
-        if f.recipe is not None:
-            response.append(RecipeResponse(
-                    id=f.recipe.id,
-                    title=f.recipe.title,
-                    description=f.recipe.description,
-                    ingredients=f.recipe.ingredients,
-                    instructions=f.recipe.instructions,
-                    image_url=f.recipe.image_url,
-                    video_url=f.recipe.video_url,
-                    user_id=f.recipe.user_id,
-                    creator_name=f.recipe.creator.username if f.recipe.creator else "Unknown",
-                    created_at=f.recipe.created_at.isoformat() if f.recipe.created_at else None,
-                    share_token=f.recipe.share_token,
-                    is_public=f.recipe.is_public,
-                    prep_time=f.recipe.prep_time,
-                    difficulty=f.recipe.difficulty
-                ))
+def get_favorites(db: Session ,current_user: User, view: RecipeView = RecipeView.card):
+    rows = db.execute(
+        recipe_rows(view)
+        .join(Favorite, Favorite.recipe_id == Recipe.id)
+        .where(Favorite.user_id == current_user.id)
+        .order_by(Favorite.id)
+    ).all()
 
-
-    return response
+    return to_recipe_responses(rows, view)
 
 
 def remove_favorite(recipe_id: int, db: Session, current_user: User):
-    fav_to_delete = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.recipe_id == recipe_id
-    ).first()
+    deleted = db.execute(
+        delete(Favorite)
+        .where(Favorite.user_id == current_user.id, Favorite.recipe_id == recipe_id)
+        .returning(Favorite.id)
+    ).scalar()
 
-    if not fav_to_delete:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Favorite not found")
 
-    db.delete(fav_to_delete)
+    _apply_favorite_change(db, recipe_id, -1)
+    leaderboard_service.refresh_recipe(db, recipe_id)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)  # פופולריות הכותרת = מספר המועדפים
 
     return {"message": "Recipe removed from favorites"}
+
+
+# מחזיר כמה מתכונים עודכנו (0 = המתכון לא קיים)
+def _apply_favorite_change(db: Session, recipe_id: int, delta: int) -> int:
+    return db.execute(
+        update(Recipe)
+        .where(Recipe.id == recipe_id)
+        .values(favorite_count=Recipe.favorite_count + delta)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+# חישוב מחדש של favorite_count מטבלת favorites (backfill / תיקון סטיות).
+# בלי recipe_ids – לכל המתכונים. לא מבצע commit – הקורא אחראי על הטרנזקציה.
+def refresh_favorite_counts(db: Session, recipe_ids: Optional[list[int]] = None) -> int:
+    stmt = update(Recipe).values(
+        favorite_count=select(func.count(Favorite.id)).where(Favorite.recipe_id == Recipe.id).scalar_subquery()
+    )
+    if recipe_ids is not None:
+        if not recipe_ids:
+            return 0
+        stmt = stmt.where(Recipe.id.in_(recipe_ids))
+
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
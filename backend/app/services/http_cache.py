@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Union
+from fastapi import Request, Response
+
+
+# 🏷️ ETag חזק מחלקים פשוטים (מזהה + גרסה / גרסת פיד)
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _as_utc(value: Union[datetime, str, None]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # זמני ה-DB נשמרים ב-UTC בלי אזור זמן; HTTP עובד ברזולוציה של שניות
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+# If-None-Match קודם ל-If-Modified-Since (RFC 9110); ההשוואה ב-If-None-Match היא חלשה (מתעלמים מ-W/)
+def is_not_modified(request: Request, etag: str, last_modified=None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    modified = _as_utc(last_modified)
+    if if_modified_since is None or modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return modified <= since
+
+
+# no-cache: הדפדפן שומר את התשובה אבל חייב לאמת אותה (If-None-Match) לפני כל שימוש
+def set_validators(response: Response, etag: str, last_modified=None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    modified = _as_utc(last_modified)
+    if modified is not None:
+        response.headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+
+def not_modified(etag: str, last_modified=None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,92 @@
+from typing import Optional
+from sqlalchemy import select, func, case, cast, Float
+from sqlalchemy.orm import Session
+from app.models import Recipe, Ingredient, RecipeIngredient, sync_recipe_ingredients
+from app.schemas.recipe_schema import RecipeView
+from app.services.pagination import keyset_page
+from app.services.recipe_projection import public_recipe_rows, to_recipe_responses
+from app.utils.ingredients import parse_ingredients
+
+COOK_PAGE_SIZE = 20
+MAX_PANTRY_ITEMS = 50
+
+
+# 🧺 "מה אפשר לבשל": מתכונים שמכילים לפחות אחד מהמצרכים שיש, מדורגים לפי כיסוי (כמה מהמצרכים שלהם יש).
+# הכל ב-SQL: מזהי המצרכים מהמילון, והספירה ב-GROUP BY על recipe_ingredients דרך האינדקס על ingredient_id
+def cook_page(db: Session, have: list[str], min_coverage: float = 0.0, cursor: Optional[str] = None,
+              limit: int = COOK_PAGE_SIZE, view: RecipeView = RecipeView.card):
+    canonicals = [canonical for canonical, _ in parse_ingredients("\n".join(have))][:MAX_PANTRY_ITEMS]
+    if not canonicals:
+        return [], None
+    have_ids = select(Ingredient.id).where(Ingredient.canonical.in_(canonicals)).scalar_subquery()
+
+    candidates = select(RecipeIngredient.recipe_id).where(RecipeIngredient.ingredient_id.in_(have_ids))
+    matched = func.sum(case((RecipeIngredient.ingredient_id.in_(have_ids), 1), else_=0))
+    total = func.count()
+    coverage = (
+        select(
+            RecipeIngredient.recipe_id,
+            matched.label("matched"),
+            total.label("total"),
+            (cast(matched, Float) / total).label("coverage"),
+        )
+        .where(RecipeIngredient.recipe_id.in_(candidates))
+        .group_by(RecipeIngredient.recipe_id)
+        .subquery()
+    )
+
+    stmt = (
+        public_recipe_rows(view)
+        .join(coverage, coverage.c.recipe_id == Recipe.id)
+        .add_columns(coverage.c.matched, coverage.c.total, coverage.c.coverage)
+    )
+    if min_coverage > 0:
+        stmt = stmt.where(coverage.c.coverage >= min_coverage)
+    rows, next_cursor = keyset_page(db, stmt, [coverage.c.coverage, Recipe.id], cursor, limit)
+
+    # מה חסר בכל מתכון בעמוד – הפרש קבוצות (מצרכי המתכון פחות מה שיש), שאילתה אחת לכל העמוד
+    missing = {}
+    if rows:
+        missing_rows = db.execute(
+            select(RecipeIngredient.recipe_id, Ingredient.name)
+            .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+            .where(RecipeIngredient.recipe_id.in_([row.id for row in rows]))
+            .where(RecipeIngredient.ingredient_id.not_in(have_ids))
+            .order_by(Ingredient.name)
+        ).all()
+        for recipe_id, name in missing_rows:
+            missing.setdefault(recipe_id, []).append(name)
+
+    recipes = to_recipe_responses(rows, view)
+    results = [
+        {
+            "recipe": recipe,
+            "matched": row.matched,
+            "total": row.total,
+            "coverage": round(row.coverage, 4),
+            "missing": missing.get(row.id, []),
+        }
+        for row, recipe in zip(rows, recipes)
+    ]
+    return results, next_cursor
+
+
+# ✅ בנייה מחדש של recipe_ingredients למתכונים קיימים (במנות לפי מפתח ראשי)
+def rebuild_recipe_ingredients(db: Session, batch_size: int = 500) -> int:
+    connection = db.connection()
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Recipe.id, Recipe.ingredients)
+            .where(Recipe.id > last_id)
+            .order_by(Recipe.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return updated
+
+        for row in batch:
+            sync_recipe_ingredients(connection, row.id, row.ingredients)
+        updated += len(batch)
+        last_id = batch[-1].id
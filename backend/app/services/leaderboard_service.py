@@ -0,0 +1,215 @@
+from collections import defaultdict, namedtuple
+from typing import Optional
+from sqlalchemy import select, update, delete, insert, func, tuple_, literal, and_, case, exists
+from sqlalchemy.orm import Session, aliased
+from app.models import Recipe, User, LeaderboardEntry
+from app.services.recipe_projection import recipe_rows
+from app.schemas.recipe_schema import RecipeView
+from app.services import site_counters
+
+TOP_RATED = "top_rated"
+MOST_FAVORITED = "most_favorited"
+
+# ציון של מתכון בכל לוח + תנאי הכניסה ללוח (רק מתכונים ציבוריים שיש להם דירוג/מועדף)
+BOARDS = {
+    TOP_RATED: (Recipe.average_rating, Recipe.rating_count > 0),
+    MOST_FAVORITED: (Recipe.favorite_count, Recipe.favorite_count > 0),
+}
+
+# ציבורי, ושל יוצר שלא ממתין למחיקה ברקע (deleted_at) – בדיקה לפי מפתח ראשי
+LISTED = and_(
+    Recipe.is_public == True,
+    ~exists().where(User.id == Recipe.user_id, User.deleted_at.isnot(None)),
+)
+
+
+# השורה הנוכחית של מתכון בלוח (או None)
+_Entry = namedtuple("_Entry", ["score", "position"])
+
+
+def _entry_of(board: str, recipe_id: int):
+    return and_(LeaderboardEntry.board == board, LeaderboardEntry.recipe_id == recipe_id)
+
+
+# 🔒 המיקומים רציפים וייחודיים, ולכן שני עדכונים של אותו לוח חייבים לרוץ בזה אחר זה (אחרת שניהם סופרים את
+# אותו "ahead" וכותבים מיקום כפול / חור). ב-Postgres – נעילת advisory לכל לוח עד סוף הטרנזקציה, תמיד באותו סדר
+# (בלי deadlock). SQLite ממילא מריץ כותב אחד בכל פעם
+def _lock_boards(db: Session, boards):
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(*(func.pg_advisory_xact_lock(func.hashtext(f"leaderboard:{board}")) for board in boards)))
+
+
+# הזזת position בטווח [first, last] (last=None – עד סוף הלוח) בפקודה אחת
+def _shift(db: Session, board: str, first: int, last: Optional[int], delta: int):
+    if last is not None and first > last:
+        return
+    stmt = update(LeaderboardEntry).where(LeaderboardEntry.board == board, LeaderboardEntry.position >= first)
+    if last is not None:
+        stmt = stmt.where(LeaderboardEntry.position <= last)
+    db.execute(stmt.values(position=LeaderboardEntry.position + delta))
+
+
+# 🔄 עדכון אינקרמנטלי (הלוח כבר נעול): current = (score, position) הנוכחיים של המתכון או None,
+# ahead = כמה שורות אחרות לפני הציון החדש (ספירה על אינדקס (board, score, recipe_id), ראו _refresh_entries).
+# שינוי ציון מזיז רק את השורות שבין המיקום הישן לחדש, ורק כניסה ללוח / יציאה ממנו מזיזה את כל הזנב.
+# מתכון שנכנס למקום הראשון או יוצא ממנו מעדכן גם את מצביע המקום הראשון
+def _place(db: Session, board: str, recipe_id: int, current, score: Optional[float], ahead: int = 0):
+    if current is None and score is None:
+        return
+    if current is not None and current.score == score:
+        return
+    old = current.position if current is not None else None
+
+    if score is None:
+        db.execute(delete(LeaderboardEntry).where(_entry_of(board, recipe_id)))
+        _shift(db, board, old + 1, None, -1)
+        if old == 1:
+            _store_leader(db, board)
+        return
+
+    position = ahead + 1
+    if old is None:
+        _shift(db, board, position, None, 1)
+        db.execute(insert(LeaderboardEntry).values(board=board, recipe_id=recipe_id, score=score, position=position))
+    else:
+        if position < old:
+            _shift(db, board, position, old - 1, 1)
+        else:
+            _shift(db, board, old + 1, position, -1)
+        db.execute(update(LeaderboardEntry).where(_entry_of(board, recipe_id)).values(score=score, position=position))
+
+    if position == 1:
+        if old != 1:
+            _store_leader(db, board, recipe_id)
+    elif old == 1:
+        _store_leader(db, board)
+
+
+# 🥇 המצביע למקום הראשון ב-site_counters (שממנו קורא לוח הבקרה של האדמין). בלי recipe_id – נקרא מהטבלה
+def _store_leader(db: Session, board: str, recipe_id: Optional[int] = None):
+    if recipe_id is None:
+        recipe_id = db.scalar(
+            select(LeaderboardEntry.recipe_id).where(LeaderboardEntry.board == board, LeaderboardEntry.position == 1)
+        )
+    site_counters.put(db, site_counters.leader(board), recipe_id or 0)
+
+
+# נקרא אחרי כל שינוי בדירוג / מועדפים / נראות של מתכון (לפני commit, באותה טרנזקציה).
+# הציון בכל לוח, השורה הנוכחית בכל לוח והמיקום החדש מגיעים בשאילתה אחת
+def refresh_recipe(db: Session, recipe_id: int):
+    refresh_recipes(db, [recipe_id])
+
+
+# נקרא לפני מחיקה של מתכון, באותה טרנזקציה
+def remove_recipe(db: Session, recipe_id: int):
+    remove_recipes(db, [recipe_id])
+
+
+# כמה מתכונים בנעילה אחת (מחיקת משתמש: המתכונים שלו יוצאים, ואלה שדירג / סימן במועדפים מתעדכנים)
+def refresh_recipes(db: Session, recipe_ids):
+    if not recipe_ids:
+        return
+    _lock_boards(db, BOARDS)
+    for recipe_id in recipe_ids:
+        _refresh_entries(db, recipe_id)
+
+
+def remove_recipes(db: Session, recipe_ids):
+    if not recipe_ids:
+        return
+    _lock_boards(db, BOARDS)
+    _remove_entries(db, recipe_ids)
+
+
+def _refresh_entries(db: Session, recipe_id: int):
+    columns, joins = [], []
+    for board, (score, condition) in BOARDS.items():
+        entry = aliased(LeaderboardEntry, name=f"entry_{board}")
+        new_score = case((and_(LISTED, condition), score), else_=None)
+        ahead = (
+            select(func.count())
+            .select_from(LeaderboardEntry)
+            .where(
+                LeaderboardEntry.board == board,
+                LeaderboardEntry.recipe_id != Recipe.id,
+                tuple_(LeaderboardEntry.score, LeaderboardEntry.recipe_id) > tuple_(new_score, Recipe.id),
+            )
+            .scalar_subquery()
+        )
+        columns += [
+            new_score.label(board),
+            entry.score.label(f"{board}_score"),
+            entry.position.label(f"{board}_position"),
+            ahead.label(f"{board}_ahead"),
+        ]
+        joins.append((entry, and_(entry.board == board, entry.recipe_id == Recipe.id)))
+
+    stmt = select(*columns).select_from(Recipe)
+    for entry, on in joins:
+        stmt = stmt.outerjoin(entry, on)
+    row = db.execute(stmt.where(Recipe.id == recipe_id)).first()
+    if row is None:
+        _remove_entries(db, [recipe_id])
+        return
+
+    values = row._mapping
+    for board in BOARDS:
+        current = None
+        if values[f"{board}_position"] is not None:
+            current = _Entry(values[f"{board}_score"], values[f"{board}_position"])
+        score = values[board]
+        _place(db, board, recipe_id, current, float(score) if score is not None else None, values[f"{board}_ahead"])
+
+
+# לפני מחיקה / הסתרה של מתכונים (ה-CASCADE של ה-DB היה מוחק את השורות בלי לסגור את הרווח במיקומים).
+# DELETE אחד לכל המתכונים, ואז כל קטע שבין שני מיקומים שנמחקו זז למעלה בכמות שנמחקה לפניו –
+# כל שורה בלוח זזה לכל היותר פעם אחת, גם כשמוציאים אלפי מתכונים של משתמש אחד
+def _remove_entries(db: Session, recipe_ids):
+    removed = defaultdict(list)
+    for row in db.execute(
+        select(LeaderboardEntry.board, LeaderboardEntry.position).where(LeaderboardEntry.recipe_id.in_(recipe_ids))
+    ):
+        removed[row.board].append(row.position)
+    if not removed:
+        return
+
+    db.execute(delete(LeaderboardEntry).where(LeaderboardEntry.recipe_id.in_(recipe_ids)))
+    for board, positions in removed.items():
+        positions.sort()
+        following = positions[1:] + [None]
+        for gone, (position, next_position) in enumerate(zip(positions, following), start=1):
+            _shift(db, board, position + 1, next_position - 1 if next_position is not None else None, -gone)
+        if positions[0] == 1:
+            _store_leader(db, board)
+
+
+# 🧱 בנייה מלאה מחדש (backfill / תיקון – manage rebuild-leaderboards) – INSERT ... SELECT עם row_number() בצד ה-DB
+def rebuild(db: Session):
+    for board, (score, condition) in BOARDS.items():
+        ranked = (
+            select(
+                literal(board),
+                Recipe.id,
+                score,
+                func.row_number().over(order_by=(score.desc(), Recipe.id.desc())),
+            )
+            .where(LISTED, condition)
+        )
+        db.execute(delete(LeaderboardEntry).where(LeaderboardEntry.board == board))
+        db.execute(
+            insert(LeaderboardEntry).from_select(["board", "recipe_id", "score", "position"], ranked)
+        )
+        _store_leader(db, board)
+
+
+def board_size(db: Session, board: str) -> int:
+    # המיקומים רציפים (1..n), כך ש-MAX על האינדקס שווה למספר השורות
+    return db.scalar(select(func.coalesce(func.max(LeaderboardEntry.position), 0)).where(LeaderboardEntry.board == board))
+
+
+def leaderboard_rows(board: str, view: RecipeView = RecipeView.full):
+    return (
+        recipe_rows(view)
+        .add_columns(LeaderboardEntry.position)
+        .join(LeaderboardEntry, and_(LeaderboardEntry.recipe_id == Recipe.id, LeaderboardEntry.board == board))
+    )
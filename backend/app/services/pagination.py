@@ -0,0 +1,97 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, tuple_, literal
+from sqlalchemy.orm import Session
+
+# רשימות האדמין (משתמשים / מתכונים) – עמודים גדולים מהפידים, אבל תמיד חסומים
+ADMIN_PAGE_SIZE = 50
+MAX_ADMIN_PAGE_SIZE = 200
+# ייצוא בזרימה: כמה שורות נמשכות מה-DB בכל פעם (yield_per)
+EXPORT_BATCH_SIZE = 1000
+
+
+# 🔑 cursor אטום ללקוח – ערכי מפתח המיון של השורה האחרונה בעמוד, מקודדים ב-base64
+def encode_cursor(values: list) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_columns: list) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(sort_columns):
+            raise ValueError("cursor length mismatch")
+        return [_cursor_value(v, column) for v, column in zip(payload, sort_columns)]
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# כל ערך חייב להתאים לסוג של עמודת המיון – cursor שזויף ("abc" במקום id) הוא 400, ולא שגיאת DB (500) בהשוואה
+def _cursor_value(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if python_type is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if python_type in (int, str, bool) and type(value) is python_type:
+        return value
+    raise TypeError(f"cursor value {value!r} does not match {column.key}")
+
+
+def _sort_values(row, sort_columns: list) -> list:
+    return [getattr(row, column.key) for column in sort_columns]
+
+
+def _ordering(sort_columns: list, descending: bool) -> list:
+    return [column.desc() if descending else column.asc() for column in sort_columns]
+
+
+# 📄 keyset: WHERE (sort_key, id) < (...) ORDER BY ... LIMIT n+1
+# עולה O(גודל עמוד) בכל עומק, בתנאי שיש אינדקס על עמודות המיון
+def keyset_statement(stmt, sort_columns: list, cursor: Optional[str], limit: int, descending: bool = True):
+    if cursor:
+        values = decode_cursor(cursor, sort_columns)
+        row_key = tuple_(*sort_columns)
+        after = tuple_(*[literal(v, column.type) for v, column in zip(values, sort_columns)])
+        stmt = stmt.where(row_key < after if descending else row_key > after)
+    return stmt.order_by(*_ordering(sort_columns, descending)).limit(limit + 1)
+
+
+def keyset_result(rows: list, sort_columns: list, limit: int):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(_sort_values(rows[-1], sort_columns)) if has_more and rows else None
+    return rows, next_cursor
+
+
+# 📄 offset (תאימות לאחור) – מחזיר גם next_cursor כדי שהלקוח יוכל לעבור ל-keyset מהעמוד הבא
+def offset_statement(stmt, sort_columns: list, page: int, limit: int, descending: bool = True):
+    return stmt.order_by(*_ordering(sort_columns, descending)).offset((page - 1) * limit).limit(limit)
+
+
+def count_statement(stmt):
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+def offset_next_cursor(rows: list, sort_columns: list, page: int, limit: int, total: int) -> Optional[str]:
+    has_more = page * limit < total
+    return encode_cursor(_sort_values(rows[-1], sort_columns)) if has_more and rows else None
+
+
+def keyset_page(db: Session, stmt, sort_columns: list, cursor: Optional[str], limit: int, descending: bool = True):
+    rows = db.execute(keyset_statement(stmt, sort_columns, cursor, limit, descending)).all()
+    return keyset_result(rows, sort_columns, limit)
+
+
+def offset_page(db: Session, stmt, sort_columns: list, page: int, limit: int, descending: bool = True):
+    total = db.scalar(count_statement(stmt))
+    rows = db.execute(offset_statement(stmt, sort_columns, page, limit, descending)).all()
+    return rows, total, offset_next_cursor(rows, sort_columns, page, limit, total)
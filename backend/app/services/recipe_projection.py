@@ -0,0 +1,92 @@
+from sqlalchemy import select
+from app.models import Recipe, User
+from app.schemas.recipe_schema import RecipeResponse, RecipeCard, RecipeView
+
+UNKNOWN_CREATOR = "לא ידוע"
+
+# 🧩 העמודות ש-RecipeResponse צריך (+ מפתחות המיון של הפידים).
+# שאילתה אחת עם שם היוצר והדירוג המתוחזק – בלי אובייקטי ORM ובלי lazy load של recipe.creator
+RECIPE_RESPONSE_COLUMNS = (
+    Recipe.id,
+    Recipe.title,
+    Recipe.description,
+    Recipe.ingredients,
+    Recipe.instructions,
+    Recipe.image_url,
+    Recipe.video_url,
+    Recipe.created_at,
+    Recipe.share_token,
+    Recipe.is_public,
+    Recipe.user_id,
+    Recipe.prep_time,
+    Recipe.difficulty,
+    Recipe.average_rating,
+    Recipe.rating_count,
+    Recipe.favorite_count,
+    Recipe.random_key,
+    Recipe.version,
+    Recipe.updated_at,
+)
+
+# 🃏 הכרטיס: בלי עמודות ה-Text הגדולות (description / ingredients / instructions) – הן לא יוצאות מה-DB בכלל
+RECIPE_CARD_COLUMNS = tuple(
+    column for column in RECIPE_RESPONSE_COLUMNS
+    if column.key not in ("description", "ingredients", "instructions", "video_url")
+)
+
+
+def recipe_rows(view: RecipeView = RecipeView.full):
+    columns = RECIPE_CARD_COLUMNS if view == RecipeView.card else RECIPE_RESPONSE_COLUMNS
+    return (
+        select(*columns, User.username.label("creator_name"))
+        .outerjoin(User, User.id == Recipe.user_id)
+        .where(User.deleted_at.is_(None))  # מתכונים של חשבון שממתין למחיקה ברקע לא מוצגים
+    )
+
+
+def public_recipe_rows(view: RecipeView = RecipeView.full):
+    return recipe_rows(view).where(Recipe.is_public == True)
+
+
+def to_recipe_response(row) -> RecipeResponse:
+    return RecipeResponse(
+        id=row.id,
+        title=row.title,
+        description=row.description,
+        ingredients=row.ingredients,
+        instructions=row.instructions,
+        image_url=row.image_url,
+        video_url=row.video_url,
+        created_at=row.created_at.isoformat() if row.created_at else None,
+        creator_name=row.creator_name or UNKNOWN_CREATOR,
+        share_token=row.share_token,
+        is_public=row.is_public,
+        average_rating=round(row.average_rating, 2) if row.average_rating else None,
+        user_id=row.user_id,
+        difficulty=row.difficulty,
+        prep_time=row.prep_time,
+        version=row.version,
+        updated_at=row.updated_at.isoformat() if row.updated_at else None,
+    )
+
+
+def to_recipe_card(row) -> RecipeCard:
+    return RecipeCard(
+        id=row.id,
+        title=row.title,
+        image_url=row.image_url,
+        created_at=row.created_at.isoformat() if row.created_at else None,
+        creator_name=row.creator_name or UNKNOWN_CREATOR,
+        share_token=row.share_token,
+        is_public=row.is_public,
+        average_rating=round(row.average_rating, 2) if row.average_rating else None,
+        user_id=row.user_id,
+        difficulty=row.difficulty,
+        prep_time=row.prep_time,
+        version=row.version,
+    )
+
+
+def to_recipe_responses(rows, view: RecipeView = RecipeView.full) -> list:
+    convert = to_recipe_card if view == RecipeView.card else to_recipe_response
+    return [convert(row) for row in rows]
@@ -1,8 +1,7 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc
-from sqlalchemy.sql.expression import func as sql_func
-from app.models import Recipe, Rating, Favorite,User
-from app.schemas.recipe_schema import RecipeResponse, DifficultyLevel, RecipeUpdate, RecipeAdminUpdate, ratingRequest, ShareRequest
+from sqlalchemy.orm import Session, joinedload, undefer_group
+from sqlalchemy import func, update, select, case, cast, Float, and_, exists
+from app.models import Recipe, Rating, User, LeaderboardEntry, dialect_insert
+from app.schemas.recipe_schema import DifficultyLevel, RecipeUpdate, RecipeAdminUpdate, ratingRequest, ShareRequest, RecipeView, AdminRecipeFilters, AdminSort
 import random
 from app.services.cloudinary_service import upload_image_to_cloudinary
 from fastapi import HTTPException, UploadFile, BackgroundTasks
@@ -11,152 +10,118 @@ from uuid import uuid4
 from typing import Optional
 from app import models
 from app.services.email import send_rating_notification_email, send_recipe_email_with_pdf
+from app.services.pagination import keyset_page, offset_page, offset_next_cursor, encode_cursor, decode_cursor, EXPORT_BATCH_SIZE
+from app.services.recipe_projection import recipe_rows, public_recipe_rows, to_recipe_response, to_recipe_responses, UNKNOWN_CREATOR
+from app.services import leaderboard_service, site_counters
+from app.services.cache import invalidate_recipe
+from app.services.autocomplete import autocomplete
 
 PAGE_SIZE = 8
+FEED_SEED_RANGE = 1_000_000
+TAIL_START_KEY = -1.0  # קטן מכל random_key ([0, 1)) – cursor שמצביע לתחילת החלק השני של הסיבוב
 
 
 
 
-def get_top_rated_recipes_raw(db: Session, limit: int = 8):
-    subquery = (
-        db.query(
-            Rating.recipe_id,
-            func.avg(Rating.rating).label("avg_rating")
-        )
-        .group_by(Rating.recipe_id)
-        .subquery()
-    )
+# 📄 פיד ממוין: עם cursor – עמוד keyset אחד; בלי cursor – page/offset כמו קודם (+ next_cursor להמשך)
+def _sorted_feed(db: Session, stmt, sort_columns: list, page: int, cursor: Optional[str], limit: int,
+                 view: RecipeView = RecipeView.card) -> dict:
+    if cursor:
+        rows, next_cursor = keyset_page(db, stmt, sort_columns, cursor, limit)
+        return {"recipes": to_recipe_responses(rows, view), "next_cursor": next_cursor}
 
-    recipes = (
-        db.query(Recipe)
-        .join(subquery, Recipe.id == subquery.c.recipe_id)
-        .filter(Recipe.is_public == True)
-        .order_by(desc(subquery.c.avg_rating))
-        .limit(limit)
-        .options(joinedload(Recipe.creator))
-        .all()
-    )
-    return recipes
+    rows, total, next_cursor = offset_page(db, stmt, sort_columns, page, limit)
+    return {
+        "recipes": to_recipe_responses(rows, view),
+        "total_pages": (total + limit - 1) // limit,
+        "current_page": page,
+        "next_cursor": next_cursor,
+    }
 
 
+# 🏆 פיד מתוך טבלת דירוג: המיקומים רציפים, ולכן גם עמוד לפי page הוא טווח position באינדקס – O(גודל עמוד)
+def _leaderboard_feed(db: Session, board: str, page: int, cursor: Optional[str], limit: int,
+                      view: RecipeView = RecipeView.card) -> dict:
+    stmt = leaderboard_service.leaderboard_rows(board, view)
+    sort_columns = [LeaderboardEntry.position]
+    if cursor:
+        rows, next_cursor = keyset_page(db, stmt, sort_columns, cursor, limit, descending=False)
+        return {"recipes": to_recipe_responses(rows, view), "next_cursor": next_cursor}
+
+    total = leaderboard_service.board_size(db, board)
+    start = (page - 1) * limit
+    rows = db.execute(
+        stmt.where(LeaderboardEntry.position > start, LeaderboardEntry.position <= start + limit)
+        .order_by(LeaderboardEntry.position)
+    ).all()
+    return {
+        "recipes": to_recipe_responses(rows, view),
+        "total_pages": (total + limit - 1) // limit,
+        "current_page": page,
+        "next_cursor": offset_next_cursor(rows, sort_columns, page, limit, total),
+    }
 
-def get_random_recipes(db: Session, limit: int = 8):
-    return (
-        db.query(Recipe)
-        .filter(Recipe.is_public == True)
-        .order_by(sql_func.random())
-        .limit(limit)
-        .all()
-    )
 
+# 🎲 פיד אקראי יציב: לכל מתכון random_key קבוע, וה-seed של הסשן קובע נקודת סיבוב (pivot).
+# הסדר הוא random_key >= pivot ואז random_key < pivot – כל עמוד הוא סריקת אינדקס קצרה, בלי shuffle בזיכרון
+def new_feed_seed() -> int:
+    return random.randrange(FEED_SEED_RANGE)
 
-def get_most_recent_recipes_from_db(db: Session, limit: int = 8):
-    return (
-        db.query(Recipe)
-        .filter(Recipe.is_public == True)
-        .order_by(Recipe.created_at.desc())
-        .limit(limit)
-        .all()
-    )
 
+RANDOM_SORT = [Recipe.random_key, Recipe.id]
 
-def get_most_favorited_recipes(db: Session, limit: int = 8):
-    subquery = (
-        db.query(
-            Favorite.recipe_id,
-            func.count(Favorite.id).label("fav_count")
-        )
-        .group_by(Favorite.recipe_id)
-        .subquery()
-    )
 
-    recipes = (
-        db.query(Recipe)
-        .join(subquery, Recipe.id == subquery.c.recipe_id)
-        .filter(Recipe.is_public == True)
-        .order_by(desc(subquery.c.fav_count))
-        .limit(limit)
-        .all()
-    )
-    return recipes
+# שני חלקי הסיבוב – כל אחד טווח רציף באינדקס (is_public, random_key, id)
+def _rotation(stmt, seed: int):
+    pivot = seed / FEED_SEED_RANGE
+    return pivot, stmt.where(Recipe.random_key >= pivot), stmt.where(Recipe.random_key < pivot)
 
 
-def get_all_recipes(db: Session, page: int, page_size: int = 8) -> dict:
-    query = db.query(Recipe).filter(Recipe.is_public == True)
-    total = query.count()
+def _random_feed_page(db: Session, stmt, seed: int, cursor: Optional[str], limit: int):
+    pivot, head, tail = _rotation(stmt, seed)
+    sort_columns = RANDOM_SORT
 
-    recipes = query.offset((page - 1) * page_size).limit(page_size).all()
+    # cursor עם מפתח מתחת ל-pivot => כבר עברנו לחלק השני של הסיבוב
+    if cursor and decode_cursor(cursor, sort_columns)[0] < pivot:
+        return keyset_page(db, tail, sort_columns, cursor, limit, descending=False)
 
-    avg_ratings = dict(
-        db.query(Rating.recipe_id, func.avg(Rating.rating))
-        .group_by(Rating.recipe_id)
-        .all()
-    )
+    rows, next_cursor = keyset_page(db, head, sort_columns, cursor, limit, descending=False)
+    if next_cursor is None:
+        remaining = limit - len(rows)
+        if remaining > 0:
+            more, next_cursor = keyset_page(db, tail, sort_columns, None, remaining, descending=False)
+            rows += more
+        elif db.execute(tail.limit(1)).first() is not None:
+            next_cursor = encode_cursor([TAIL_START_KEY, 0])
 
-    response = [
-        RecipeResponse(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            ingredients=r.ingredients,
-            instructions=r.instructions,
-            image_url=r.image_url,
-            video_url=r.video_url,
-            user_id=r.user_id,
-            share_token=r.share_token,
-            is_public=r.is_public,
-            creator_name=r.creator.username if r.creator else "Unknown",
-            created_at=r.created_at.isoformat() if r.created_at else None,
-            average_rating=round(avg_ratings.get(r.id), 2) if avg_ratings.get(r.id) else None,
-            prep_time=r.prep_time,
-            difficulty=r.difficulty
-        )
-        for r in recipes
-    ]
+    return rows, next_cursor
+
+
+def get_all_recipes(db: Session, page: int, page_size: int = 8, cursor: Optional[str] = None,
+                    view: RecipeView = RecipeView.card) -> dict:
+    stmt = public_recipe_rows(view)
 
+    if cursor:
+        rows, next_cursor = keyset_page(db, stmt, [Recipe.id], cursor, page_size, descending=False)
+        return {"recipes": to_recipe_responses(rows, view), "page_size": page_size, "next_cursor": next_cursor}
+
+    rows, total, next_cursor = offset_page(db, stmt, [Recipe.id], page, page_size, descending=False)
     return {
-        "recipes": response,
+        "recipes": to_recipe_responses(rows, view),
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size,
+        "next_cursor": next_cursor,
     }
 
 
-def get_random_public_recipes(db: Session, limit: int = 8):
-    all_public = (
-        db.query(Recipe)
-        .options(joinedload(Recipe.creator))
-        .filter(Recipe.is_public == True)
-        .all()
-    )
+def get_random_public_recipes(db: Session, limit: int = 8, seed: Optional[int] = None):
+    if seed is None:
+        seed = new_feed_seed()
 
-    random_recipes = random.sample(all_public, min(len(all_public), limit))
-
-    results = []
-    for r in random_recipes:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == r.id).scalar()
-        results.append(
-            RecipeResponse(
-                id=r.id,
-                title=r.title,
-                description=r.description,
-                ingredients=r.ingredients,
-                instructions=r.instructions,
-                image_url=r.image_url,
-                video_url=r.video_url,
-                created_at=r.created_at.isoformat() if r.created_at else None,
-                creator_name=r.creator.username if r.creator else "לא ידוע",
-                share_token=r.share_token,
-                is_public=r.is_public,
-                average_rating=round(avg_rating, 2) if avg_rating else None,
-                user_id=r.user_id,
-                difficulty=r.difficulty,
-                prep_time=r.prep_time
-            )
-        )
-
-    return results
+    rows, _ = _random_feed_page(db, public_recipe_rows(), seed, None, limit)
+    return to_recipe_responses(rows)
 
 
 def create_recipe(
@@ -196,8 +161,12 @@ def create_recipe(
     )
 
     db.add(new_recipe)
+    site_counters.increment(db, site_counters.RECIPE_COUNT)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
     db.refresh(new_recipe)
+    invalidate_recipe(new_recipe.id)
+    autocomplete.refresh_recipe(db, new_recipe.id)
 
     return {
         "message": "Recipe created successfully",
@@ -211,63 +180,17 @@ def create_recipe(
 
 def get_public_recipe(recipe_id: int, db: Session):
 
-    recipe = db.query(Recipe).filter_by(id=recipe_id, is_public=True).first()
+    row = db.execute(public_recipe_rows().where(Recipe.id == recipe_id)).first()
     
-    if not recipe:
+    if not row:
         raise HTTPException(status_code=404, detail="Public recipe not found")
     
-    return RecipeResponse(
-        id=recipe.id,
-        title=recipe.title,
-        description=recipe.description,
-        ingredients=recipe.ingredients,
-        instructions=recipe.instructions,
-        image_url=recipe.image_url,
-        video_url=recipe.video_url,
-        share_token = recipe.share_token,
-        is_public = recipe.is_public,
-        creator_name = recipe.creator.username if recipe.creator else "Unknown",
-        created_at = recipe.created_at.isoformat() if recipe.created_at else None,
-        user_id=recipe.user_id,
-        prep_time=recipe.prep_time,
-        difficulty=recipe.difficulty,
-    )
-
-
-def get_my_recipes(db: Session, current_user: User):
-    recipes = (
-        db.query(Recipe)
-        .options(joinedload(Recipe.creator))  # ⬅️ נטען את היוצר
-        .filter(Recipe.user_id == current_user.id)
-        .all()
-    )
+    return to_recipe_response(row)
 
-    avg_ratings = dict(
-        db.query(Rating.recipe_id, func.avg(Rating.rating))
-        .group_by(Rating.recipe_id)
-        .all()
-    )
 
-    return [
-        RecipeResponse(
-            id=recipe.id,
-            title=recipe.title,
-            description=recipe.description,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            image_url=recipe.image_url,
-            video_url=recipe.video_url,
-            user_id=recipe.user_id,
-            share_token=recipe.share_token,
-            is_public=recipe.is_public,
-            creator_name=recipe.creator.username if recipe.creator else "Unknown",
-            created_at=recipe.created_at.isoformat() if recipe.created_at else None,
-            prep_time=recipe.prep_time,
-            average_rating=round(avg_ratings.get(recipe.id), 2) if avg_ratings.get(recipe.id) else None,
-            difficulty=recipe.difficulty
-        )
-        for recipe in recipes
-    ]
+def get_my_recipes(db: Session, current_user: User, view: RecipeView = RecipeView.card):
+    rows = db.execute(recipe_rows(view).where(Recipe.user_id == current_user.id).order_by(Recipe.id)).all()
+    return to_recipe_responses(rows, view)
 
 
 def delete_recipe(recipe_id: int, db: Session , current_user):
@@ -279,8 +202,13 @@ def delete_recipe(recipe_id: int, db: Session , current_user):
     if recipe.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete your own recipes")
 
+    leaderboard_service.remove_recipe(db, recipe.id)
     db.delete(recipe)
+    site_counters.increment(db, site_counters.RECIPE_COUNT, -1)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)
 
     return {"message": "Recipe deleted successfully"}
 
@@ -309,104 +237,78 @@ def update_recipe(recipe_id: int,updated_data: RecipeUpdate,db: Session ,current
         recipe.video_url = updated_data.video_url
     if updated_data.is_public is not None:
         recipe.is_public = updated_data.is_public
+        db.flush()
+        leaderboard_service.refresh_recipe(db, recipe.id)
 
+    _touch_recipe(recipe)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)
     db.refresh(recipe)
 
     return {"message": "Recipe updated successfully"}
 
 
-def search_recipes(title: Optional[str] ,ingredient: Optional[str] ,creator_name: Optional[str] ,db: Session ):
-    query = db.query(models.Recipe).filter(models.Recipe.is_public == True)
-
-    if title and title.strip():
-        query = query.filter(models.Recipe.title.ilike(f"%{title.strip()}%"))
-    
-    if ingredient and ingredient.strip():
-        query = query.filter(models.Recipe.ingredients.ilike(f"%{ingredient.strip()}%"))
-    
-    if creator_name and creator_name.strip():
-        query = query.join(models.User).filter(models.User.username.ilike(f"%{creator_name.strip()}%"))
-
-    recipes = query.all()
-
-    result = []
-    for recipe in recipes:
-        creator = recipe.creator.username if recipe.creator else "Unknown"
-        result.append(RecipeResponse(
-            id=recipe.id,
-            title=recipe.title,
-            description=recipe.description,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            image_url=recipe.image_url,
-            video_url=recipe.video_url,
-            share_token=recipe.share_token,
-            is_public=recipe.is_public,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else None,
-            creator_name=creator,
-            prep_time=recipe.prep_time,
-            user_id=recipe.user_id,
-            difficulty=recipe.difficulty,
-        ))
-
-    return result
-
-
 def get_recipe_by_id(recipe_id: int,db: Session ,current_user: User ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    row = db.execute(recipe_rows().where(Recipe.id == recipe_id)).first()
 
-    if not recipe:
+    if not row:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    if not recipe.is_public and recipe.user_id != current_user.id and not current_user.is_admin:
+    if not row.is_public and row.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="You are not authorized to view this recipe")
 
-    avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == recipe_id).scalar()
-
-    return RecipeResponse(
-        id=recipe.id,
-        title=recipe.title,
-        description=recipe.description,
-        ingredients=recipe.ingredients,
-        instructions=recipe.instructions,
-        image_url=recipe.image_url,
-        video_url=recipe.video_url,
-        share_token=recipe.share_token,
-        is_public=recipe.is_public,
-        created_at=recipe.created_at.isoformat() if recipe.created_at else None,
-        prep_time=recipe.prep_time,
-        creator_name=recipe.creator.username if recipe.creator else "לא ידוע",
-        average_rating=round(avg_rating, 2) if avg_rating else None,
-        user_id=recipe.user_id,
-        difficulty=recipe.difficulty
-    )
+    return to_recipe_response(row)
 
 
 def get_all_recipes_admin(current_user: User, db: Session):
-    recipes = db.query(Recipe).options(joinedload(Recipe.creator)).all()
-    
-    response = []
-    for recipe in recipes:
-        creator_name = recipe.creator.username if recipe.creator else "Unknown"
-        response.append(RecipeResponse(
-            id=recipe.id,
-            title=recipe.title,
-            description=recipe.description,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            image_url=recipe.image_url,
-            video_url=recipe.video_url,
-            user_id=recipe.user_id,
-            share_token=recipe.share_token,
-            is_public=recipe.is_public,
-            creator_name=creator_name,
-            prep_time=recipe.prep_time,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else None,
-            difficulty=recipe.difficulty,
-        ))
-
-    return response
+    rows = db.execute(recipe_rows().order_by(Recipe.id)).all()
+    return to_recipe_responses(rows)
+
+
+ADMIN_SORT_COLUMNS = [Recipe.created_at, Recipe.id]
+# עמודות הייצוא – בלי הטקסטים הארוכים (תיאור, מצרכים, הוראות)
+ADMIN_EXPORT_COLUMNS = [Recipe.id, Recipe.title, Recipe.user_id, Recipe.is_public, Recipe.difficulty, Recipe.prep_time,
+    Recipe.created_at, Recipe.average_rating, Recipe.rating_count, Recipe.favorite_count]
+
+
+# סינון בצד ה-DB. created_to לא כולל (טווח חצי-פתוח). עם creator_id – האינדקס (user_id, created_at, id),
+# עם is_public – (is_public, created_at, id), ובלי שניהם – (created_at, id)
+def _admin_recipe_criteria(filters: AdminRecipeFilters) -> list:
+    criteria = []
+    if filters.is_public is not None:
+        criteria.append(Recipe.is_public == filters.is_public)
+    if filters.creator_id is not None:
+        criteria.append(Recipe.user_id == filters.creator_id)
+    if filters.created_from is not None:
+        criteria.append(Recipe.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        criteria.append(Recipe.created_at < filters.created_to)
+    if filters.difficulty is not None:
+        criteria.append(Recipe.difficulty == filters.difficulty.value)
+    return criteria
+
+
+# 📄 רשימת המתכונים של האדמין בעמודי keyset – כל עמוד עולה אותו דבר, גם ב-500 אלף מתכונים
+def get_admin_recipes_page(db: Session, filters: AdminRecipeFilters, cursor: Optional[str], limit: int):
+    stmt = recipe_rows().where(*_admin_recipe_criteria(filters))
+    rows, next_cursor = keyset_page(db, stmt, ADMIN_SORT_COLUMNS, cursor, limit, descending=filters.sort == AdminSort.newest)
+    return {"recipes": to_recipe_responses(rows), "next_cursor": next_cursor}
+
+
+# 📤 אותו סינון ומיון לייצוא: (שמות העמודות, שורות בזרימה). yield_per – מנה אחת בזיכרון בכל פעם
+def admin_recipe_export_rows(db: Session, filters: AdminRecipeFilters):
+    descending = filters.sort == AdminSort.newest
+    stmt = (
+        select(*ADMIN_EXPORT_COLUMNS, User.username.label("creator_name"))
+        .outerjoin(User, User.id == Recipe.user_id)
+        .where(User.deleted_at.is_(None), *_admin_recipe_criteria(filters))
+        .order_by(*[column.desc() if descending else column.asc() for column in ADMIN_SORT_COLUMNS])
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    columns = [column.key for column in ADMIN_EXPORT_COLUMNS] + ["creator_name"]
+    return columns, (row._asdict() for row in db.execute(stmt))
 
 
 def delete_recipe_admin(recipe_id: int,db: Session ,current_user: User):
@@ -415,8 +317,13 @@ def delete_recipe_admin(recipe_id: int,db: Session ,current_user: User):
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
+    leaderboard_service.remove_recipe(db, recipe.id)
     db.delete(recipe)
+    site_counters.increment(db, site_counters.RECIPE_COUNT, -1)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)
 
     return {"message": "Recipe deleted successfully"}
 
@@ -431,50 +338,108 @@ def update_recipe_admin(recipe_id: int,updated_data: RecipeAdminUpdate,db: Sessi
     for field, value in updated_data.dict(exclude_unset=True).items():
         setattr(recipe, field, value)
 
+    _touch_recipe(recipe)
+    db.flush()
+    leaderboard_service.refresh_recipe(db, recipe.id)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
+    autocomplete.refresh_recipe(db, recipe_id)
     db.refresh(recipe)
     return {"message": "Recipe updated successfully"}
 
 
+# ⭐ דירוג: קריאה אחת שנועלת את שורת המתכון ומביאה את הדירוג הקודם של המשתמש ואת פרטי היוצר,
+# ואז INSERT ... ON CONFLICT DO UPDATE על (user_id, recipe_id). הנעילה מסדרת דירוגים במקביל לאותו מתכון,
+# כך שהדלתא לסיכומים (חדש פחות קודם) נכונה גם בלחיצה כפולה
 def rate_recipe(recipe_id: int,rating_data: ratingRequest,db: Session ,current_user: User):
-    recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    existing_rating = db.query(models.Rating).filter(
-        models.Rating.recipe_id == recipe_id,
-        models.Rating.user_id == current_user.id
+    target = db.execute(
+        select(Recipe.title, User.email, User.wants_emails, Rating.rating.label("previous"))
+        .outerjoin(User, User.id == Recipe.user_id)
+        .outerjoin(Rating, and_(Rating.recipe_id == Recipe.id, Rating.user_id == current_user.id))
+        .where(Recipe.id == recipe_id)
+        .with_for_update(of=Recipe)
     ).first()
+    if target is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
 
-    if existing_rating:
-        existing_rating.rating = rating_data.rating
-    else:
-        new_rating = Rating(
-            user_id=current_user.id,
-            recipe_id=recipe_id,
+    insert = dialect_insert(db.get_bind())
+    stmt = insert(Rating).values(user_id=current_user.id, recipe_id=recipe_id, rating=rating_data.rating)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "recipe_id"],
+        set_={"rating": stmt.excluded.rating},
+    ))
+
+    is_new = target.previous is None
+    _apply_rating_change(db, recipe_id, count_delta=1 if is_new else 0,
+                         sum_delta=rating_data.rating - (target.previous or 0))
+
+    # ✅ שליחת מייל לבעל המתכון רק בדירוג חדש
+    if is_new and target.email and target.wants_emails:
+        send_rating_notification_email(
+            to_email=target.email,
+            recipe_title=target.title,
             rating=rating_data.rating
         )
-        db.add(new_rating)
-
-        # ✅ שליחת מייל לבעל המתכון רק בדירוג חדש
-        if recipe.creator and recipe.creator.email and recipe.creator.wants_emails:
-            send_rating_notification_email(
-                to_email=recipe.creator.email,
-                recipe_title=recipe.title,
-                rating=rating_data.rating
-            )
 
+    leaderboard_service.refresh_recipe(db, recipe_id)
+    site_counters.bump_feed_revision_after_commit(db)
     db.commit()
+    invalidate_recipe(recipe_id)
     return {"message": "Rating submitted successfully"}
 
 
+# 🏷️ כל שינוי שנראה בתשובה מקדם את הגרסה (ETag) ואת updated_at (Last-Modified)
+def _touch_recipe(recipe: Recipe):
+    recipe.version = Recipe.version + 1
+    recipe.updated_at = datetime.utcnow()
+
+
+def _apply_rating_change(db: Session, recipe_id: int, count_delta: int, sum_delta: int):
+    # עדכון אטומי בצד ה-DB (ולא read-modify-write) כדי ששני דירוגים במקביל לא ידרסו זה את זה
+    new_count = Recipe.rating_count + count_delta
+    new_sum = Recipe.rating_sum + sum_delta
+    db.execute(
+        update(Recipe)
+        .where(Recipe.id == recipe_id)
+        .values(
+            rating_count=new_count,
+            rating_sum=new_sum,
+            average_rating=case((new_count > 0, cast(new_sum, Float) / new_count), else_=None),
+            version=Recipe.version + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# חישוב מחדש של סיכומי הדירוג מטבלת ratings (backfill / תיקון סטיות).
+# בלי recipe_ids – לכל המתכונים. לא מבצע commit – הקורא אחראי על הטרנזקציה.
+def refresh_rating_aggregates(db: Session, recipe_ids: Optional[list[int]] = None) -> int:
+    ratings_of_recipe = Rating.recipe_id == Recipe.id
+    stmt = update(Recipe).values(
+        rating_count=select(func.count(Rating.id)).where(ratings_of_recipe).scalar_subquery(),
+        rating_sum=select(func.coalesce(func.sum(Rating.rating), 0)).where(ratings_of_recipe).scalar_subquery(),
+        average_rating=select(func.avg(Rating.rating)).where(ratings_of_recipe).scalar_subquery(),
+        version=Recipe.version + 1,
+        updated_at=datetime.utcnow(),
+    )
+    if recipe_ids is not None:
+        if not recipe_ids:
+            return 0
+        stmt = stmt.where(Recipe.id.in_(recipe_ids))
+
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
 def get_average_rating(recipe_id: int, db: Session):
     
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
     if not recipe:
         raise HTTPException(status_code = 404, detail = "Recipe not found")
     
-    avg = db.query(func.avg(Rating.rating)).filter(Recipe.id == recipe_id).scalar()
+    avg = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == recipe_id).scalar()
 
     return {
         "recipe_id": recipe_id,
@@ -483,38 +448,6 @@ def get_average_rating(recipe_id: int, db: Session):
 
 
 
-def get_top_rated_recipes(db: Session):
-    
-    recipes = (
-        db.query(models.Recipe)
-        .join(models.Rating, models.Rating.recipe_id == models.Recipe.id)
-        .filter(models.Recipe.is_public == True)
-        .group_by(models.Recipe.id)
-        .order_by(func.avg(models.Rating.rating).desc())
-        .all()
-    )
-
-    result = []
-    for recipe in recipes:
-        creator_name = recipe.creator.username if recipe.creator else "Unknown"
-        result.append(RecipeResponse(
-            id=recipe.id,
-            title=recipe.title,
-            description=recipe.description,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            image_url=recipe.image_url,
-            video_url=recipe.video_url,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else None,
-            creator_name=creator_name,
-            user_id=recipe.user_id,
-            prep_time=recipe.prep_time,
-            difficulty=recipe.difficulty,
-        ))
-
-    return result
-
-
 def upload_recipe_image(file: UploadFile):
     image_url = upload_image_to_cloudinary(file.file)
     return {"image_url": image_url}
@@ -522,33 +455,48 @@ def upload_recipe_image(file: UploadFile):
 
 
 def get_shared_recipe(token: str, db: Session):
-    recipe = (
-        db.query(models.Recipe)
-        .filter_by(share_token=token, is_public=True)
-        .first()
-    )
+    row = db.execute(public_recipe_rows().where(Recipe.share_token == token)).first()
 
-    if not recipe:
+    if not row:
         raise HTTPException(status_code=404, detail="Shared recipe not found")
 
     return {
-        "id": recipe.id,
-        "title": recipe.title,
-        "description": recipe.description,
-        "ingredients": recipe.ingredients,
-        "instructions": recipe.instructions,
-        "image_url": recipe.image_url,
-        "video_url": recipe.video_url,
-        "created_at": recipe.created_at.isoformat() if recipe.created_at else None,
-        "share_token": str(recipe.share_token),
-        "creator_name": recipe.creator.username if recipe.creator else "Unknown"
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "ingredients": row.ingredients,
+        "instructions": row.instructions,
+        "image_url": row.image_url,
+        "video_url": row.video_url,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "share_token": str(row.share_token),
+        "creator_name": row.creator_name or UNKNOWN_CREATOR,
+        "version": row.version,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
     }
 
 
+# 🏷️ בדיקת גרסה זולה ל-GET מותנה: שורה אחת לפי מפתח ראשי / share_token, בלי טקסטים ובלי JOIN.
+# אותו סינון של יוצר שממתין למחיקה כמו ב-recipe_rows – אחרת 304 היה חוזר למתכון שהקריאה המלאה מחזירה עליו 404
+def _validator_rows():
+    return (
+        select(Recipe.id, Recipe.version, Recipe.updated_at, Recipe.created_at, Recipe.is_public, Recipe.user_id)
+        .where(~exists().where(User.id == Recipe.user_id, User.deleted_at.isnot(None)))
+    )
+
+
+def get_recipe_validators(db: Session, recipe_id: int):
+    return db.execute(_validator_rows().where(Recipe.id == recipe_id)).first()
+
+
+def get_shared_recipe_validators(db: Session, token: str):
+    return db.execute(_validator_rows().where(Recipe.share_token == token)).first()
+
+
 def send_recipe_via_email(data: ShareRequest,background_tasks: BackgroundTasks,db: Session):
     recipe = (
         db.query(Recipe)
-        .options(joinedload(Recipe.creator))
+        .options(joinedload(Recipe.creator), undefer_group("body"))
         .filter(Recipe.id == data.recipe_id, Recipe.is_public == True)
         .first()
     )
@@ -559,182 +507,68 @@ def send_recipe_via_email(data: ShareRequest,background_tasks: BackgroundTasks,d
     return {"message": "Email is being sent"}
 
 
-def get_top_rated_recipes( db: Session,page: int = 1):
-    recipes = get_top_rated_recipes_raw(db)
-    total = len(recipes)
-    paginated = recipes[(page - 1) * PAGE_SIZE : page * PAGE_SIZE]
-    total_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-
-    results = []
-    for r in paginated:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == r.id).scalar()
-        results.append(RecipeResponse(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            ingredients=r.ingredients,
-            instructions=r.instructions,
-            image_url=r.image_url,
-            video_url=r.video_url,
-            created_at=r.created_at.isoformat() if r.created_at else None,
-            creator_name=r.creator.username if r.creator else "לא ידוע",
-            share_token=r.share_token,
-            is_public=r.is_public,
-            prep_time=r.prep_time,
-            average_rating=round(avg_rating, 2) if avg_rating else None,
-            user_id=r.user_id,
-            difficulty=r.difficulty
-        ))
-
-    return {"recipes": results, "total_pages": total_pages, "current_page": page}
-
-
-
-def get_random_recipes(db: Session, page: int = 1):
-    recipes = (
-        db.query(Recipe)
-        .filter(Recipe.is_public == True)
-        .options(joinedload(Recipe.creator))
-        .all()
-    )
-    random.shuffle(recipes)
-    total = len(recipes)
-    paginated = recipes[(page - 1) * PAGE_SIZE : page * PAGE_SIZE]
-    total_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-
-    results = []
-    for r in paginated:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == r.id).scalar()
-        results.append(RecipeResponse(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            ingredients=r.ingredients,
-            instructions=r.instructions,
-            image_url=r.image_url,
-            video_url=r.video_url,
-            created_at=r.created_at.isoformat() if r.created_at else None,
-            creator_name=r.creator.username if r.creator else "לא ידוע",
-            share_token=r.share_token,
-            prep_time=r.prep_time,
-            is_public=r.is_public,
-            average_rating=round(avg_rating, 2) if avg_rating else None,
-            user_id=r.user_id,
-            difficulty=r.difficulty
-        ))
-
-    return {"recipes": results, "total_pages": total_pages, "current_page": page}
-
-
-def get_recent_recipes(db: Session, page: int = 1):
-    recipes = (
-        db.query(Recipe)
-        .filter(Recipe.is_public == True)
-        .options(joinedload(Recipe.creator))
-        .order_by(Recipe.created_at.desc())
-        .all()
-    )
+def get_top_rated_recipes(db: Session, page: int = 1, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                          view: RecipeView = RecipeView.card):
+    return _leaderboard_feed(db, leaderboard_service.TOP_RATED, page, cursor, limit, view)
 
-    total = len(recipes)
-    paginated = recipes[(page - 1) * PAGE_SIZE : page * PAGE_SIZE]
-    total_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-
-    results = []
-    for r in paginated:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == r.id).scalar()
-        results.append(RecipeResponse(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            ingredients=r.ingredients,
-            instructions=r.instructions,
-            image_url=r.image_url,
-            video_url=r.video_url,
-            prep_time=r.prep_time,
-            created_at=r.created_at.isoformat() if r.created_at else None,
-            creator_name=r.creator.username if r.creator else "לא ידוע",
-            share_token=r.share_token,
-            is_public=r.is_public,
-            average_rating=round(avg_rating, 2) if avg_rating else None,
-            user_id=r.user_id,
-            difficulty=r.difficulty
-        ))
-
-    return {"recipes": results, "total_pages": total_pages, "current_page": page}
-
-
-def get_most_favorited_recipes(db: Session, page: int = 1):
-    offset = (page - 1) * PAGE_SIZE
-
-    # שליפת מתכונים עם מספר מועדפים > 0, ממוין לפי כמות מועדפים
-    recipes_query = (
-        db.query(Recipe)
-        .join(Favorite)
-        .group_by(Recipe.id)
-        .having(func.count(Favorite.id) > 0)
-        .order_by(func.count(Favorite.id).desc())
-    )
 
-    total = recipes_query.count()
-    paginated = recipes_query.offset(offset).limit(PAGE_SIZE).all()
-
-    results = []
-    for r in paginated:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == r.id).scalar()
-        results.append(RecipeResponse(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            ingredients=r.ingredients,
-            instructions=r.instructions,
-            image_url=r.image_url,
-            video_url=r.video_url,
-            created_at=r.created_at.isoformat() if r.created_at else None,
-            creator_name=r.creator.username if r.creator else "לא ידוע",
-            share_token=r.share_token,
-            is_public=r.is_public,
-            prep_time=r.prep_time,
-            average_rating=round(avg_rating, 2) if avg_rating else None,
-            user_id=r.user_id,
-            difficulty=r.difficulty
-        ))
-
-    total_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-    return {"recipes": results, "total_pages": total_pages, "current_page": page}
 
+def get_random_recipes(db: Session, page: int = 1, seed: Optional[int] = None, cursor: Optional[str] = None,
+                       limit: int = PAGE_SIZE, view: RecipeView = RecipeView.card):
+    # אותו seed => אותו סדר בכל העמודים, כך שעמוד 2 ממשיך את עמוד 1 בלי כפילויות
+    if seed is None:
+        seed = new_feed_seed()
+    stmt = public_recipe_rows(view)
 
-def get_admin_stats(db: Session ,current_user: User):
+    if cursor:
+        rows, next_cursor = _random_feed_page(db, stmt, seed, cursor, limit)
+        return {"recipes": to_recipe_responses(rows, view), "seed": seed, "next_cursor": next_cursor}
 
-    # מספר משתמשים
-    user_count = db.query(User).count()
+    pivot, head, tail = _rotation(stmt, seed)
+    counted = stmt.order_by(None).subquery()
+    total, head_total = db.execute(
+        select(func.count(), func.count().filter(counted.c.random_key >= pivot)).select_from(counted)
+    ).one()
 
-    # מספר מתכונים
-    recipe_count = db.query(Recipe).count()
+    # עמוד לפי מספר: offset בתוך החלק הראשון, ומה שחסר – מתחילת החלק השני (בלי ORDER BY על ביטוי, שלא משתמש באינדקס)
+    offset = (page - 1) * limit
+    if offset < head_total:
+        rows = db.execute(head.order_by(*RANDOM_SORT).offset(offset).limit(limit)).all()
+        remaining = limit - len(rows)
+        if remaining > 0 and total > head_total:
+            rows += db.execute(tail.order_by(*RANDOM_SORT).limit(remaining)).all()
+    else:
+        rows = db.execute(tail.order_by(*RANDOM_SORT).offset(offset - head_total).limit(limit)).all()
+    next_cursor = offset_next_cursor(rows, RANDOM_SORT, page, limit, total)
 
-    # מתכון עם דירוג ממוצע הכי גבוה
-    top_rated = (
-        db.query(Recipe.title, func.avg(Rating.rating).label("avg_rating"))
-        .join(Rating, Rating.recipe_id == Recipe.id)
-        .group_by(Recipe.id)
-        .order_by(func.avg(Rating.rating).desc())
-        .first()
-    )
-    top_rated_title = top_rated.title if top_rated else "אין"
-
-    # מתכון עם הכי הרבה מועדפים
-    most_favorited = (
-        db.query(Recipe.title, func.count(Favorite.user_id).label("fav_count"))
-        .join(Favorite, Favorite.recipe_id == Recipe.id)
-        .group_by(Recipe.id)
-        .order_by(func.count(Favorite.user_id).desc())
-        .first()
-    )
-    most_favorited_title = most_favorited.title if most_favorited else "אין"
+    return {
+        "recipes": to_recipe_responses(rows, view),
+        "total_pages": (total + limit - 1) // limit,
+        "current_page": page,
+        "seed": seed,
+        "next_cursor": next_cursor,
+    }
+
+
+def get_recent_recipes(db: Session, page: int = 1, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                       view: RecipeView = RecipeView.card):
+    return _sorted_feed(db, public_recipe_rows(view), [Recipe.created_at, Recipe.id], page, cursor, limit, view)
+
+
+def get_most_favorited_recipes(db: Session, page: int = 1, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                               view: RecipeView = RecipeView.card):
+    return _leaderboard_feed(db, leaderboard_service.MOST_FAVORITED, page, cursor, limit, view)
+
+
+def get_admin_stats(db: Session ,current_user: User):
+    # 📊 שאילתה אחת לפי מפתח ראשי על site_counters – המונים והמקום הראשון בכל טבלת דירוג מתעדכנים בכתיבה
+    top_rated, most_favorited = (site_counters.leader(board) for board in (leaderboard_service.TOP_RATED, leaderboard_service.MOST_FAVORITED))
+    counters = site_counters.read_many(db, [site_counters.USER_COUNT, site_counters.RECIPE_COUNT], [top_rated, most_favorited])
 
     return {
-        "user_count": user_count,
-        "recipe_count": recipe_count,
-        "top_rated_recipe": top_rated_title,
-        "most_favorited_recipe": most_favorited_title
+        "user_count": counters.get(site_counters.USER_COUNT, (0, None))[0],
+        "recipe_count": counters.get(site_counters.RECIPE_COUNT, (0, None))[0],
+        "top_rated_recipe": counters.get(top_rated, (0, None))[1] or "אין",
+        "most_favorited_recipe": counters.get(most_favorited, (0, None))[1] or "אין"
     }
 
@@ -0,0 +1,172 @@
+import os
+from typing import Optional
+from sqlalchemy import select, update, func, cast, type_coerce, literal, literal_column, table, column, or_, Float
+from sqlalchemy.orm import Session
+from app.models import Recipe, User, recipe_search_columns
+from app.schemas.recipe_schema import RecipeView
+from app.services.pagination import keyset_page, encode_cursor, decode_cursor
+from app.services.recipe_projection import public_recipe_rows, to_recipe_responses
+from app.services.trigram_index import trigram_index, reset_after_commit
+from app.utils.hebrew import tokens, variants
+
+SEARCH_PAGE_SIZE = 20
+MAX_QUERY_TOKENS = 8
+# סף הדמיון (word_similarity) לחיפוש fuzzy – ברירת המחדל של pg_trgm היא 0.6, נמוך יותר סולח ליותר טעויות
+FUZZY_THRESHOLD = float(os.getenv("FUZZY_SEARCH_THRESHOLD", "0.5"))
+
+# שדות החיפוש: None = כותרת + מצרכים; משקל הכותרת גבוה יותר בדירוג
+TITLE = "title"
+INGREDIENTS = "ingredients"
+POSTGRES_WEIGHTS = {TITLE: "A", INGREDIENTS: "B"}
+FTS_COLUMNS = {TITLE: "search_title", INGREDIENTS: "search_ingredients"}
+FTS_WEIGHTS = (10.0, 1.0)  # bm25(search_title, search_ingredients)
+
+recipes_fts = table("recipes_fts", column("rowid"))
+
+
+# כל מילה בשאילתה => קבוצת גרסאות (OR), וכל הקבוצות חייבות להתקיים (AND).
+# המילה האחרונה בכל שדה מחופשת כתחילית – "עגבנ" מוצא "עגבניות" תוך כדי הקלדה
+def _clauses(text: Optional[str], field: Optional[str]) -> list:
+    words = tokens(text or "")[:MAX_QUERY_TOKENS]
+    return [(field, variants(word), i == len(words) - 1) for i, word in enumerate(words)]
+
+
+def _tsquery(clauses: list) -> str:
+    groups = []
+    for field, forms, prefix in clauses:
+        suffix = ("*" if prefix else "") + POSTGRES_WEIGHTS.get(field, "")
+        groups.append("(" + " | ".join(f"{form}:{suffix}" if suffix else form for form in forms) + ")")
+    return " & ".join(groups)
+
+
+def _fts_query(clauses: list) -> str:
+    groups = []
+    for field, forms, prefix in clauses:
+        group = "(" + " OR ".join(f'"{form}"' + ("*" if prefix else "") for form in forms) + ")"
+        groups.append(f"{FTS_COLUMNS[field]} : {group}" if field else group)
+    return " AND ".join(groups)
+
+
+# 🔎 התאמה + ציון (גבוה = רלוונטי יותר) לפי ה-DB: tsvector/GIN ב-Postgres, FTS5 ב-SQLite
+def _matching(db: Session, stmt, clauses: list):
+    if db.get_bind().dialect.name == "postgresql":
+        query = func.to_tsquery("simple", _tsquery(clauses))
+        vector = literal_column("recipes.search_vector")
+        # float8 ולא real – כדי שהערך ב-cursor יחזור בדיוק לאותו ציון
+        rank = cast(func.ts_rank(vector, query), Float)
+        return stmt.where(vector.op("@@")(query)), rank.label("search_rank")
+
+    fts = literal_column("recipes_fts")
+    stmt = stmt.join(recipes_fts, recipes_fts.c.rowid == Recipe.id).where(fts.op("MATCH")(_fts_query(clauses)))
+    rank = type_coerce(-func.bm25(fts, *FTS_WEIGHTS), Float)
+    return stmt, rank.label("search_rank")
+
+
+def _by_creator(stmt, creator_name: Optional[str]):
+    if creator_name and creator_name.strip():
+        # טבלת המשתמשים קטנה; המתכונים עצמם נשלפים דרך האינדקס על user_id
+        creators = select(User.id).where(User.username.ilike(f"%{creator_name.strip()}%"))
+        stmt = stmt.where(Recipe.user_id.in_(creators))
+    return stmt
+
+
+def search_page(db: Session, q: Optional[str] = None, title: Optional[str] = None, ingredient: Optional[str] = None,
+                creator_name: Optional[str] = None, cursor: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE,
+                view: RecipeView = RecipeView.card, fuzzy: bool = False, threshold: Optional[float] = None):
+    if fuzzy:
+        return fuzzy_page(db, q, title, ingredient, creator_name, cursor, limit, view, threshold)
+
+    stmt = _by_creator(public_recipe_rows(view), creator_name)
+    clauses = _clauses(q, None) + _clauses(title, TITLE) + _clauses(ingredient, INGREDIENTS)
+    if not clauses:
+        rows, next_cursor = keyset_page(db, stmt, [Recipe.id], cursor, limit, descending=False)
+        return to_recipe_responses(rows, view), next_cursor
+
+    stmt, rank = _matching(db, stmt, clauses)
+    rows, next_cursor = keyset_page(db, stmt.add_columns(rank), [rank, Recipe.id], cursor, limit)
+    return to_recipe_responses(rows, view), next_cursor
+
+
+# 🔤 חיפוש fuzzy – מונח אחד: q בכותרת ובמצרכים, או title / ingredient לשדה מסוים
+def _fuzzy_term(q: Optional[str], title: Optional[str], ingredient: Optional[str]):
+    for text, fields in ((q, [TITLE, INGREDIENTS]), (title, [TITLE]), (ingredient, [INGREDIENTS])):
+        words = tokens(text or "")[:MAX_QUERY_TOKENS]
+        if words:
+            return words, fields
+    return [], []
+
+
+# Postgres: האופרטור <% (word_similarity מעל הסף) נתמך באינדקס GIN של pg_trgm – BitmapOr על שני האינדקסים,
+# ורק ההתאמות ממוינות לפי הדמיון. הסף נקבע ל-transaction הנוכחי בלבד (set_config עם is_local)
+def _postgres_fuzzy_page(db: Session, stmt, words: list, fields: list, threshold: float, cursor, limit: int):
+    db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)))
+    term = literal(" ".join(words))
+    columns = [literal_column(f"recipes.{FTS_COLUMNS[field]}") for field in fields]
+    similarity = [func.word_similarity(term, col) for col in columns]
+    score = func.greatest(*similarity) if len(similarity) > 1 else similarity[0]
+    rank = cast(score, Float).label("search_rank")
+    stmt = stmt.where(or_(*(term.op("<%")(col) for col in columns)))
+    return keyset_page(db, stmt.add_columns(rank), [rank, Recipe.id], cursor, limit)
+
+
+# SQLite / בדיקות: דירוג באינדקס הטריגרמות בזיכרון, ואז שאילתה אחת שמסננת (ציבורי / יוצר) ושאילתה לעמוד עצמו
+def _memory_fuzzy_page(db: Session, stmt, words: list, fields: list, threshold: float, cursor, limit: int):
+    trigram_index.ensure_built(db)
+    ranked = trigram_index.search(words, fields, threshold)
+    if cursor:
+        after = tuple(decode_cursor(cursor, [literal_column("search_rank", Float), Recipe.id]))
+        ranked = [(score, recipe_id) for score, recipe_id in ranked if (score, recipe_id) < after]
+    if not ranked:
+        return [], None
+
+    allowed = set(db.scalars(stmt.with_only_columns(Recipe.id).where(Recipe.id.in_([r for _, r in ranked]))))
+    page = [(score, recipe_id) for score, recipe_id in ranked if recipe_id in allowed][:limit + 1]
+    has_more = len(page) > limit
+    page = page[:limit]
+    if not page:
+        return [], None
+
+    rows = {row.id: row for row in db.execute(stmt.where(Recipe.id.in_([r for _, r in page])))}
+    next_cursor = encode_cursor(list(page[-1])) if has_more else None
+    return [rows[recipe_id] for _, recipe_id in page], next_cursor
+
+
+def fuzzy_page(db: Session, q: Optional[str] = None, title: Optional[str] = None, ingredient: Optional[str] = None,
+               creator_name: Optional[str] = None, cursor: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE,
+               view: RecipeView = RecipeView.card, threshold: Optional[float] = None):
+    words, fields = _fuzzy_term(q, title, ingredient)
+    if not words:
+        return search_page(db, creator_name=creator_name, cursor=cursor, limit=limit, view=view)
+
+    threshold = FUZZY_THRESHOLD if threshold is None else threshold
+    stmt = _by_creator(public_recipe_rows(view), creator_name)
+    if db.get_bind().dialect.name == "postgresql":
+        rows, next_cursor = _postgres_fuzzy_page(db, stmt, words, fields, threshold, cursor, limit)
+    else:
+        rows, next_cursor = _memory_fuzzy_page(db, stmt, words, fields, threshold, cursor, limit)
+    return to_recipe_responses(rows, view), next_cursor
+
+
+# ✅ מילוי search_title / search_ingredients למתכונים קיימים (במנות לפי מפתח ראשי).
+# עדכון העמודות מעדכן גם את האינדקס: עמודה מחושבת ב-Postgres, טריגרים ב-SQLite, בנייה מחדש של אינדקס הטריגרמות
+def refresh_search_columns(db: Session, batch_size: int = 500) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Recipe.id, Recipe.title, Recipe.ingredients)
+            .where(Recipe.id > last_id)
+            .order_by(Recipe.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            reset_after_commit(db)
+            return updated
+
+        # bulk UPDATE לפי מפתח ראשי – פקודה אחת עם executemany לכל מנה
+        db.execute(
+            update(Recipe),
+            [{"id": row.id, **recipe_search_columns(row.title, row.ingredients)} for row in batch],
+        )
+        updated += len(batch)
+        last_id = batch[-1].id
@@ -0,0 +1,105 @@
+from datetime import datetime
+from sqlalchemy import select, func, and_, event
+from sqlalchemy.orm import Session
+from app.models import SiteCounter, User, Recipe, LeaderboardEntry, dialect_insert
+
+FEED_REVISION = "feed_revision"
+FEED_REVISION_PENDING = "feed_revision_pending"  # המפתח ב-session.info
+
+# 📊 מוני לוח הבקרה של האדמין – מתעדכנים באותה טרנזקציה של הכתיבה (הרשמה, מחיקת משתמש, יצירה / מחיקת מתכון),
+# כך ש-get_admin_stats הוא קריאה אחת לפי מפתח ראשי ולא COUNT(*) על טבלאות שלמות. reconcile מתקן סטייה
+USER_COUNT = "user_count"
+RECIPE_COUNT = "recipe_count"
+
+
+# 🥇 "מצביע" למקום הראשון בכל טבלת דירוג: value = id המתכון (0 = הטבלה ריקה). leaderboard_service מעדכן אותו
+# בכל פעם שמתכון נכנס למקום הראשון או יוצא ממנו
+def leader(board: str) -> str:
+    return f"leader_{board}"
+
+
+# הגדלה אטומית בתוך הטרנזקציה של הכתיבה (נקרא ממש לפני commit, כדי שנעילת השורה תוחזק כמה שפחות).
+# INSERT ... ON CONFLICT DO UPDATE – גם כששתי טרנזקציות יוצרות את אותו מונה לראשונה, אף אחת לא נכשלת
+def increment(db: Session, name: str, delta: int = 1):
+    db.execute(_increment_statement(db.get_bind(), name, delta))
+
+
+def _increment_statement(bind, name: str, delta: int):
+    insert = dialect_insert(bind)
+    now = datetime.utcnow()
+    return (
+        insert(SiteCounter)
+        .values(name=name, value=delta, updated_at=now)
+        .on_conflict_do_update(index_elements=[SiteCounter.name], set_={"value": SiteCounter.value + delta, "updated_at": now})
+    )
+
+
+# קביעת ערך מוחלט – INSERT ... ON CONFLICT DO UPDATE, פקודה אחת גם כשהשורה עוד לא קיימת
+def put(db: Session, name: str, value: int):
+    insert = dialect_insert(db.get_bind())
+    now = datetime.utcnow()
+    db.execute(
+        insert(SiteCounter)
+        .values(name=name, value=value, updated_at=now)
+        .on_conflict_do_update(index_elements=[SiteCounter.name], set_={"value": value, "updated_at": now})
+    )
+
+
+def read(db: Session, name: str):
+    return db.execute(select(SiteCounter.value, SiteCounter.updated_at).where(SiteCounter.name == name)).first()
+
+
+# כמה מונים בשאילתה אחת (IN על המפתח הראשי); מצביעי המקום הראשון מגיעים עם שם המתכון
+def read_many(db: Session, names: list, leaders: list = ()) -> dict:
+    rows = db.execute(
+        select(SiteCounter.name, SiteCounter.value, Recipe.title)
+        .outerjoin(Recipe, and_(SiteCounter.name.in_(list(leaders)), Recipe.id == SiteCounter.value))
+        .where(SiteCounter.name.in_([*names, *leaders]))
+    ).all()
+    return {row.name: (row.value, row.title) for row in rows}
+
+
+# 🏷️ גרסת הפיד (ה-ETag של הפידים) מתקדמת בטרנזקציה קצרה משלה אחרי ה-commit של הכתיבה, ולא בתוכה –
+# אחרת נעילת השורה היחידה הזו הייתה מוחזקת עד סוף כל טרנזקציית כתיבה, וכל הדירוגים / המועדפים / העריכות
+# באתר היו רצים בתור אחריה. ה-ETag נקרא לפני התוכן, כך שבחלון שבין ה-commit לקידום הוא לכל היותר ישן מהתוכן
+def bump_feed_revision_after_commit(db: Session):
+    db.info[FEED_REVISION_PENDING] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_pending_feed_revision(session):
+    if session.info.pop(FEED_REVISION_PENDING, False):
+        with session.get_bind().begin() as connection:
+            connection.execute(_increment_statement(connection, FEED_REVISION, 1))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_feed_revision(session):
+    session.info.pop(FEED_REVISION_PENDING, None)
+
+
+# 🧮 הערכים האמיתיים, מחושבים מהטבלאות (משתמשים שממתינים למחיקה ברקע – והמתכונים שלהם – לא נספרים)
+def actual_values(db: Session, boards) -> dict:
+    active = User.deleted_at.is_(None)
+    values = {
+        USER_COUNT: db.scalar(select(func.count()).select_from(User).where(active)),
+        RECIPE_COUNT: db.scalar(select(func.count()).select_from(Recipe).join(User, User.id == Recipe.user_id).where(active)),
+    }
+    for board in boards:
+        values[leader(board)] = db.scalar(
+            select(LeaderboardEntry.recipe_id).where(LeaderboardEntry.board == board, LeaderboardEntry.position == 1)
+        ) or 0
+    return values
+
+
+# ✅ תיקון סטייה (באג, כתיבה ישירה ל-DB, ייבוא): כותב את הערכים האמיתיים ומחזיר רק את מה שהשתנה – {name: (היה, עכשיו)}.
+# לא מבצע commit
+def reconcile(db: Session, boards) -> dict:
+    actual = actual_values(db, boards)
+    stored = dict(db.execute(select(SiteCounter.name, SiteCounter.value).where(SiteCounter.name.in_(list(actual)))).all())
+    drift = {}
+    for name, value in actual.items():
+        if stored.get(name) != value:
+            drift[name] = (stored.get(name), value)
+            put(db, name, value)
+    return drift
@@ -0,0 +1,163 @@
+import threading
+from collections import defaultdict
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from app.models import Recipe
+
+TITLE = "title"
+INGREDIENTS = "ingredients"
+
+
+# טריגרמות כמו ב-pg_trgm: כל מילה מרופדת ברווחים ("  בצל ") ונחתכת לשלשות
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# 🧮 מקבילה ל-word_similarity של pg_trgm: איזה חלק מהטריגרמות של כל מילה בשאילתה נמצא במילה הכי דומה במסמך
+def word_similarity(query_words: list, doc_words) -> float:
+    if not query_words or not doc_words:
+        return 0.0
+    total = 0.0
+    for query_word in query_words:
+        wanted = trigrams(query_word)
+        total += max(len(wanted & trigrams(word)) / len(wanted) for word in doc_words)
+    return total / len(query_words)
+
+
+# 🔎 אינדקס טריגרמות בזיכרון – החלופה ל-pg_trgm כשאין Postgres (SQLite / בדיקות).
+# נבנה בעצלתיים מהעמודות search_* ומתעדכן אחרי כל commit שנגע במתכונים
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._fields = {}  # recipe_id -> {TITLE: set(words), INGREDIENTS: set(words)}
+        self._postings = defaultdict(set)  # trigram -> recipe_ids
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._fields.clear()
+            self._postings.clear()
+
+    def ensure_built(self, db: Session):
+        if self._built:
+            return
+        rows = db.execute(select(Recipe.id, Recipe.search_title, Recipe.search_ingredients)).all()
+        with self._lock:
+            if self._built:
+                return
+            for row in rows:
+                self._add(row.id, row.search_title, row.search_ingredients)
+            self._built = True
+
+    def _add(self, recipe_id: int, search_title, search_ingredients):
+        fields = {TITLE: set((search_title or "").split()), INGREDIENTS: set((search_ingredients or "").split())}
+        self._fields[recipe_id] = fields
+        for words in fields.values():
+            for word in words:
+                for trigram in trigrams(word):
+                    self._postings[trigram].add(recipe_id)
+
+    def _remove(self, recipe_id: int):
+        fields = self._fields.pop(recipe_id, None)
+        if fields is None:
+            return
+        for words in fields.values():
+            for word in words:
+                for trigram in trigrams(word):
+                    self._postings[trigram].discard(recipe_id)
+
+    def apply(self, upserts: dict, deletes: set):
+        with self._lock:
+            if not self._built:
+                return
+            for recipe_id in deletes:
+                self._remove(recipe_id)
+            for recipe_id, (search_title, search_ingredients) in upserts.items():
+                self._remove(recipe_id)
+                self._add(recipe_id, search_title, search_ingredients)
+
+    # מחזיר [(score, recipe_id)] מעל הסף, מהדומה ביותר
+    def search(self, query_words: list, fields: list, threshold: float) -> list:
+        if not query_words:
+            return []
+        with self._lock:
+            # מועמדים: מתכונים שחולקים מספיק טריגרמות עם השאילתה (סינון גס לפני חישוב מלא)
+            hits = defaultdict(int)
+            wanted = set().union(*(trigrams(word) for word in query_words))
+            for trigram in wanted:
+                for recipe_id in self._postings.get(trigram, ()):
+                    hits[recipe_id] += 1
+            minimum = threshold * len(wanted) / len(query_words)
+
+            results = []
+            for recipe_id, shared in hits.items():
+                if shared < minimum:
+                    continue
+                doc = self._fields[recipe_id]
+                score = max(word_similarity(query_words, doc[field]) for field in fields)
+                if score >= threshold:
+                    results.append((score, recipe_id))
+        results.sort(reverse=True)
+        return results
+
+
+trigram_index = TrigramIndex()
+
+
+# 🔄 שינויים נאספים בזמן flush ומוחלים רק אחרי commit – rollback לא משאיר את האינדקס מקולקל
+def _pending(recipe):
+    session = object_session(recipe)
+    if session is None or not trigram_index.built:
+        return None
+    return session.info.setdefault("trigram_pending", ({}, set()))
+
+
+@event.listens_for(Recipe, "after_insert")
+@event.listens_for(Recipe, "after_update")
+def _collect_upsert(mapper, connection, recipe):
+    pending = _pending(recipe)
+    state = recipe.__dict__
+    if pending is None or ("search_title" not in state and "search_ingredients" not in state):
+        return
+    # העמודות deferred: בעדכון של שדה אחד (למשל רק הכותרת) השני לא טעון – קוראים את שתיהן מהשורה שנכתבה עכשיו,
+    # אחרת המתכון היה נכנס לאינדקס בלי מצרכים
+    if "search_title" in state and "search_ingredients" in state:
+        values = (state["search_title"], state["search_ingredients"])
+    else:
+        values = tuple(connection.execute(
+            select(Recipe.search_title, Recipe.search_ingredients).where(Recipe.id == recipe.id)
+        ).one())
+    pending[0][recipe.id] = values
+
+
+@event.listens_for(Recipe, "after_delete")
+def _collect_delete(mapper, connection, recipe):
+    pending = _pending(recipe)
+    if pending is not None:
+        pending[1].add(recipe.id)
+
+
+# עדכוני Core / bulk עוקפים את אירועי ה-mapper – אחרי commit האינדקס ייבנה מחדש בשאילתה הבאה
+def reset_after_commit(session: Session):
+    session.info["trigram_reset"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop("trigram_pending", None)
+    if session.info.pop("trigram_reset", False):
+        trigram_index.reset()
+    elif pending is not None:
+        trigram_index.apply(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("trigram_pending", None)
+    session.info.pop("trigram_reset", None)
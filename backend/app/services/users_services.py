@@ -1,16 +1,26 @@
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import update, delete, select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 import os
 import datetime
-from app.db.database import get_db
-from app.models import User
+from typing import Optional
+from app.db.database import get_db, SessionLocal
+from app.db.async_database import get_async_read_db
+from app.db import routing
+from app.models import User, Recipe, Rating, Favorite, Comment
 from app import models
-from app.schemas.user_schema import UserCreate,UserLogin, UserUpdate, ForgotPasswordRequest, ResetPasswordRequest
+from app.schemas.user_schema import UserCreate,UserLogin, UserUpdate, ForgotPasswordRequest, ResetPasswordRequest, AdminUserFilters, AdminUserSort
+from app.services.pagination import keyset_page, EXPORT_BATCH_SIZE
 from app.services.email import send_reset_email
+from app.services import recipe_services, favorites_services, leaderboard_service, site_counters
+from app.services.cache import invalidate_all, invalidate_user, principal_cache, user_tag
+from app.services.autocomplete import autocomplete
+from app.services.trigram_index import reset_after_commit
 
 
 
@@ -21,6 +31,10 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 
+# 🗑️ משתמש עם לפחות כך וכך שורות (מתכונים + דירוגים + מועדפים + תגובות) נמחק ברקע: הבקשה רק מסמנת deleted_at
+PURGE_THRESHOLD = int(os.getenv("USER_PURGE_THRESHOLD", "1000"))
+PURGE_BATCH_SIZE = 1000
+
 # 📥 טופס התחברות של OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -48,28 +62,84 @@ def create_reset_token(user_id: int, expires_minutes: int = 15) -> str:
     to_encode = {"sub": str(user_id), "exp": expire}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# ✅ שליפת המשתמש הנוכחי לפי הטוקן
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+# (user_id, כמה שניות נשארו לטוקן). jwt.decode כבר דוחה טוקן שפג
+def _token_claims(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    expires_in = payload["exp"] - datetime.datetime.now(datetime.timezone.utc).timestamp() if "exp" in payload else None
+    return int(user_id), expires_in
+
+
+# 🪪 המשתמש המחובר: תמונת מצב רזה מ-principal_cache (id, username, is_admin, wants_emails), בלי SELECT בכל בקשה.
+# ה-User המלא (ORM, באותו session של הבקשה) נטען רק כשניגשים לשדה אחר (email, created_at...) או ל-.user
+class CurrentUser:
+    FIELDS = (User.id, User.username, User.is_admin, User.wants_emails)
+
+    def __init__(self, snapshot: dict, db: Session):
+        self.id = snapshot["id"]
+        self.username = snapshot["username"]
+        self.is_admin = snapshot["is_admin"]
+        self.wants_emails = snapshot["wants_emails"]
+        self._db = db
+        self._user = None
+
+    @property
+    def user(self) -> User:
+        if self._user is None:
+            self._user = self._db.get(User, self.id)
+            if self._user is None:
+                raise _credentials_exception()
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+# משתמש שלא קיים / נמחק – 401 לפני שמשהו נכנס למטמון, כך שהוא לא נשמר שם כתשובה שלילית
+def _load_principal(db: Session, user_id: int) -> dict:
+    row = db.execute(select(*CurrentUser.FIELDS).where(User.id == user_id, User.deleted_at.is_(None))).first()
+    if row is None:
+        raise _credentials_exception()
+    return dict(row._mapping)
+
+
+# המטמון לא מחזיק משתמש יותר מה-TTL שלו, וגם לא יותר מהזמן שנשאר לטוקן שטען אותו
+def _principal(db: Session, token: str) -> CurrentUser:
+    user_id, expires_in = _token_claims(token)
+    snapshot = principal_cache.get_or_set(user_id, [user_tag(user_id)], lambda: _load_principal(db, user_id), expires_in)
+    return CurrentUser(snapshot, db)
+
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
+# ✅ שליפת המשתמש הנוכחי לפי הטוקן
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    user = _principal(db, token)
+    # 🔀 commit ב-session הזה פותח למשתמש את חלון ה-read-your-writes
+    db.info[routing.USER_KEY] = user.id
     return user
 
+
+# ⚡ אותו דבר ל-routes האסינכרוניים. ה-User המלא נטען דרך ה-session הסינכרוני של ה-AsyncSession,
+# כלומר רק מתוך run_sync (שם רצים השירותים)
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)) -> CurrentUser:
+    return await db.run_sync(lambda session: _principal(session, token))
+
 # ✅ דרישה להרשאת אדמין
-def admin_required(current_user: User = Depends(get_current_user)) -> User:
+def admin_required(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -97,14 +167,17 @@ def signup(user: UserCreate, db: Session) -> dict:
     )
 
     db.add(new_user)
+    site_counters.increment(db, site_counters.USER_COUNT)
     db.commit()
     db.refresh(new_user)
+    # המשתמש החדש עוד לא ב-replica – ההתחברות והקריאות הראשונות שלו הולכות ל-primary
+    routing.sticky_writes.mark(new_user.id)
 
     return {"message": "User created successfully", "user_id": new_user.id}
 
 def login(user: UserLogin, db: Session):
     
-    db_user = db.query(User).filter(User.email == user.email.lower()).first()
+    db_user = db.query(User).filter(User.email == user.email.lower(), User.deleted_at.is_(None)).first()
     if not db_user or not verify_password(user.password, db_user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -119,6 +192,7 @@ def login(user: UserLogin, db: Session):
 
 
 def update_profile(user_update: UserUpdate,db: Session ,current_user: User ):
+    current_user = db.get(User, current_user.id)  # ה-User המלא – גם כשהגיע CurrentUser מהמטמון
     # אם נשלח שם משתמש – נעדכן
     if user_update.username:
         existing_username = db.query(User).filter(
@@ -128,6 +202,14 @@ def update_profile(user_update: UserUpdate,db: Session ,current_user: User ):
         if existing_username:
             raise HTTPException(status_code=400, detail="Username already taken")
         current_user.username = user_update.username
+        # שם היוצר הוא חלק מהתשובה של כל מתכון שלו – הגרסאות (ETag) מתקדמות
+        db.execute(
+            update(Recipe)
+            .where(Recipe.user_id == current_user.id)
+            .values(version=Recipe.version + 1, updated_at=datetime.datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        site_counters.bump_feed_revision_after_commit(db)
 
     if user_update.password:
         current_user.password = hash_password(user_update.password)
@@ -137,6 +219,11 @@ def update_profile(user_update: UserUpdate,db: Session ,current_user: User ):
 
     db.commit()
     db.refresh(current_user)
+    invalidate_user(current_user.id)
+    if user_update.username:
+        # שם היוצר מופיע בכל מתכון של המשתמש בפידים
+        invalidate_all()
+        autocomplete.refresh_user(db, current_user.id)
 
     return {"message": "Profile updated successfully"}
 
@@ -183,16 +270,67 @@ def reset_password(request: ResetPasswordRequest,db: Session):
 
     user.password = hash_password(request.new_password)
     db.commit()
+    invalidate_user(user.id)
 
     return {"message": "Password reset successfully"}
 
 
 def get_all_users(current_user: User ,db: Session):
-    return db.query(User).all()
+    return db.query(User).filter(User.deleted_at.is_(None)).all()
+
+
+# בלי הסיסמה – רק מה שמוצג לאדמין
+ADMIN_USER_COLUMNS = [User.id, User.username, User.email, User.is_admin, User.created_at, User.wants_emails, User.profile_image_url]
+# מיון -> (עמודות ה-keyset, יורד?). (created_at, id) על ix_users_created, (username, id) על האינדקס הייחודי של username
+ADMIN_USER_SORTS = {
+    AdminUserSort.newest: ([User.created_at, User.id], True),
+    AdminUserSort.oldest: ([User.created_at, User.id], False),
+    AdminUserSort.username: ([User.username, User.id], False),
+}
+
+
+def _admin_users(filters: AdminUserFilters):
+    stmt = select(*ADMIN_USER_COLUMNS).where(User.deleted_at.is_(None))
+    if filters.is_admin is not None:
+        stmt = stmt.where(User.is_admin == filters.is_admin)
+    if filters.created_from is not None:
+        stmt = stmt.where(User.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        stmt = stmt.where(User.created_at < filters.created_to)
+    return stmt
+
+
+# 📄 רשימת המשתמשים של האדמין בעמודי keyset
+def get_admin_users_page(db: Session, filters: AdminUserFilters, cursor: Optional[str], limit: int):
+    sort_columns, descending = ADMIN_USER_SORTS[filters.sort]
+    rows, next_cursor = keyset_page(db, _admin_users(filters), sort_columns, cursor, limit, descending)
+    return {"users": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+
+# 📤 ייצוא בזרימה באותו סינון ומיון: (שמות העמודות, שורות)
+def admin_user_export_rows(db: Session, filters: AdminUserFilters):
+    sort_columns, descending = ADMIN_USER_SORTS[filters.sort]
+    stmt = (
+        _admin_users(filters)
+        .order_by(*[column.desc() if descending else column.asc() for column in sort_columns])
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    return [column.key for column in ADMIN_USER_COLUMNS], (row._asdict() for row in db.execute(stmt))
+
 
+# האם למשתמש יש לפחות threshold שורות – כל ספירה עוצרת ב-LIMIT, כך שגם לחשבון ענק הבדיקה זולה
+def _owns_at_least(db: Session, user_id: int, threshold: int) -> bool:
+    total = 0
+    for model in (Recipe, Rating, Favorite, Comment):
+        owned = select(model.id).where(model.user_id == user_id).limit(threshold - total).subquery()
+        total += db.scalar(select(func.count()).select_from(owned))
+        if total >= threshold:
+            return True
+    return False
 
-def delete_user(user_id: int,current_user: User ,db: Session ):
-    user_to_delete = db.query(User).filter(User.id == user_id).first()
+
+def delete_user(user_id: int,current_user: User ,db: Session, background_tasks: BackgroundTasks = None):
+    user_to_delete = db.query(User).filter(User.id == user_id, User.deleted_at.is_(None)).first()
 
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User not found")
@@ -200,13 +338,105 @@ def delete_user(user_id: int,current_user: User ,db: Session ):
     if user_to_delete.id == current_user.id:
         raise HTTPException(status_code=400, detail="Admin cannot delete themselves")
 
+    # 🗑️ חשבון גדול: מסמנים deleted_at (UPDATE אחד) – המשתמש לא מתחבר יותר והמתכונים שלו יוצאים מהפידים מיד –
+    # ואת המחיקה עצמה עושה purge_user במנות אחרי שהתשובה נשלחה. המונים יורדים כבר עכשיו
+    if background_tasks is not None and _owns_at_least(db, user_id, PURGE_THRESHOLD):
+        user_to_delete.deleted_at = datetime.datetime.utcnow()
+        # המתכונים המוסתרים יוצאים מטבלאות הדירוג כבר עכשיו – אחרת הם תופסים מיקומים (עמודים קצרים)
+        # ומצביע המקום הראשון יכול להצביע על אחד מהם
+        owned_recipe_ids = db.scalars(select(Recipe.id).where(Recipe.user_id == user_id)).all()
+        leaderboard_service.remove_recipes(db, owned_recipe_ids)
+        _count_removed_user(db, len(owned_recipe_ids))
+        site_counters.bump_feed_revision_after_commit(db)
+        db.commit()
+        invalidate_all()
+        invalidate_user(user_id)
+        autocomplete.refresh_user(db, user_id)
+        background_tasks.add_task(purge_user_in_background, user_id)
+        return {"message": f"User with ID {user_id} scheduled for deletion"}
+
+    # הדירוגים והמועדפים של המשתמש נמחקים יחד איתו – צריך לעדכן את הסיכומים של המתכונים שנגע בהם.
+    # המתכונים שלו יוצאים מטבלאות הדירוג לפני ה-DELETE, והמתכונים של אחרים שנגע בהם מתעדכנים שם אחריו
+    owned_recipe_ids = db.scalars(select(Recipe.id).where(Recipe.user_id == user_id)).all()
+    rated_recipe_ids = [rid for (rid,) in db.query(Rating.recipe_id).filter(Rating.user_id == user_id)]
+    favorited_recipe_ids = [rid for (rid,) in db.query(Favorite.recipe_id).filter(Favorite.user_id == user_id)]
+    leaderboard_service.remove_recipes(db, owned_recipe_ids)
+
+    # DELETE אחד – המתכונים, המועדפים, הדירוגים והתגובות נמחקים ב-ON DELETE CASCADE של ה-DB (passive_deletes)
     db.delete(user_to_delete)
+    db.flush()
+    recipe_services.refresh_rating_aggregates(db, rated_recipe_ids)
+    favorites_services.refresh_favorite_counts(db, favorited_recipe_ids)
+    owned = set(owned_recipe_ids)
+    leaderboard_service.refresh_recipes(db, sorted((set(rated_recipe_ids) | set(favorited_recipe_ids)) - owned))
+    _count_removed_user(db, len(owned_recipe_ids))
+    site_counters.bump_feed_revision_after_commit(db)
+    reset_after_commit(db)
     db.commit()
+    invalidate_all()
+    invalidate_user(user_id)
+    autocomplete.refresh_user(db, user_id)
+    autocomplete.refresh_recipes(db, favorited_recipe_ids)
     return {"message": f"User with ID {user_id} deleted successfully"}
 
 
+def _count_removed_user(db: Session, owned_recipes: int):
+    site_counters.increment(db, site_counters.USER_COUNT, -1)
+    site_counters.increment(db, site_counters.RECIPE_COUNT, -owned_recipes)
+
+
+# ✅ מחיקה במנות של משתמש שסומן deleted_at, commit אחרי כל מנה – שום טרנזקציה לא נועלת את כל החשבון.
+# דירוגים ומועדפים קודם (עם עדכון הסיכומים וטבלאות הדירוג של המתכונים שנגעו בהם), אחר כך תגובות ומתכונים
+# (כל מנת מתכונים יוצאת קודם מטבלאות הדירוג, וה-CASCADE של כל מתכון לוקח את הילדים שלו), ולבסוף המשתמש עצמו. אפשר להריץ שוב אחרי הפסקה באמצע
+def purge_user(user_id: int, db: Session, batch_size: int = PURGE_BATCH_SIZE):
+    touched_recipe_ids = set()
+    for model, refresh in (
+        (Rating, recipe_services.refresh_rating_aggregates),
+        (Favorite, favorites_services.refresh_favorite_counts),
+    ):
+        while True:
+            rows = db.execute(select(model.id, model.recipe_id).where(model.user_id == user_id).limit(batch_size)).all()
+            if not rows:
+                break
+            recipe_ids = list({row.recipe_id for row in rows})
+            db.execute(delete(model).where(model.id.in_([row.id for row in rows])).execution_options(synchronize_session=False))
+            refresh(db, recipe_ids)
+            leaderboard_service.refresh_recipes(db, recipe_ids)
+            db.commit()
+            touched_recipe_ids.update(recipe_ids)
+
+    for model in (Comment, Recipe):
+        while True:
+            ids = db.scalars(select(model.id).where(model.user_id == user_id).limit(batch_size)).all()
+            if not ids:
+                break
+            if model is Recipe:
+                leaderboard_service.remove_recipes(db, ids)
+            db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+
+    db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    site_counters.bump_feed_revision_after_commit(db)
+    reset_after_commit(db)
+    db.commit()
+    invalidate_all()
+    autocomplete.refresh_user(db, user_id)
+    autocomplete.refresh_recipes(db, sorted(touched_recipe_ids))
+
+
+# BackgroundTasks רץ אחרי שה-session של הבקשה נסגר – פותחים אחד משלו
+def purge_user_in_background(user_id: int):
+    db = SessionLocal()
+    try:
+        purge_user(user_id, db)
+    finally:
+        db.close()
+
+
 def update_profile_image(image_url: str, db: Session , current_user: User):
+    current_user = db.get(User, current_user.id)
     current_user.profile_image_url = image_url
     db.commit()
     db.refresh(current_user)
+    invalidate_user(current_user.id)
     return {"message": "Profile image updated successfully", "image_url": image_url}
\ No newline at end of file
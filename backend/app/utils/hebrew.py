@@ -0,0 +1,49 @@
+import re
+import unicodedata
+
+# טעמים וניקוד (U+0591–U+05C7, בלי המקף U+05BE וסוף פסוק U+05C3)
+_NIQQUD = re.compile(r"[\u0591-\u05BD\u05BF-\u05C2\u05C4-\u05C7]")
+# גרש וגרשיים הם חלק מהמילה ("צ׳יפס", "כ״ף") – מוחקים; מקף מפריד בין מילים
+_GERESH = re.compile(r"[\u05F3\u05F4'\"`]")
+_MAQAF = "\u05BE"
+_TOKEN = re.compile(r"[^\W_]+")
+_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+
+# אותיות השימוש שנצמדות לתחילת מילה: ו / ה / ב / ל / מ / ש (למשל "והעגבניות", "בשמן")
+PREFIX_LETTERS = "והבלמש"
+MAX_PREFIX_LENGTH = 3
+MIN_STEM_LENGTH = 3
+
+
+# 🔤 "עַגְבָנִיּוֹת, ובצל!" → "עגבניות ובצל"
+def normalize(text: str) -> str:
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text)
+    text = _NIQQUD.sub("", text)
+    text = _GERESH.sub("", text).replace(_MAQAF, " ")
+    return text.casefold().translate(_FINAL_LETTERS)
+
+
+def tokens(text: str) -> list[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+# המילה עצמה + הגרסאות בלי אותיות שימוש. בלי מילון אי אפשר לדעת אם "מ" ב"מלח" היא תחילית,
+# ולכן שומרים את כולן – אבל רק כשנשאר גזע של MIN_STEM_LENGTH אותיות לפחות ("מלח" לא הופך ל"לח")
+def variants(token: str) -> list[str]:
+    forms = [token]
+    for i in range(1, MAX_PREFIX_LENGTH + 1):
+        if len(token) - i < MIN_STEM_LENGTH or token[i - 1] not in PREFIX_LETTERS:
+            break
+        forms.append(token[i:])
+    return forms
+
+
+# 🗂️ הטקסט שנשמר בעמודות search_* ונכנס לאינדקס: כל מילה עם כל הגרסאות שלה
+def index_terms(text: str) -> str:
+    seen = {}
+    for token in tokens(text):
+        for form in variants(token):
+            seen.setdefault(form, None)
+    return " ".join(seen)
@@ -0,0 +1,54 @@
+import json
+import re
+from app.utils.hebrew import tokens
+
+# בטופס המצרכים מופרדים בפסיקים או בשורות (כמו בתצוגה ב-RecipeDetailsPage)
+_SEPARATORS = re.compile(r"[\n,;]+")
+_WORD_EDGES = re.compile(r"^[\W_]+|[\W_]+$")
+
+# מילות כמות ויחידות מידה – לא חלק משם המצרך ("2 כוסות קמח" → "קמח"). בצורה מנורמלת (אותיות סופיות מקופלות)
+QUANTITY_WORDS = {
+    "כוס", "כוסות", "כפ", "כפות", "כפית", "כפיות", "גרמ", "גר", "ג", "קג", "קילו", "מל", "ליטר", "ליטרימ",
+    "יחידה", "יחידות", "חבילה", "חבילות", "קופסה", "קופסת", "קופסאות", "שקית", "שקיות", "צרור", "קורט", "מעט",
+    "חצי", "רבע", "שליש", "אחד", "אחת", "שני", "שתי", "שתיימ", "שלוש", "שלושה", "ארבע", "ארבעה", "כמה", "לפי", "הטעמ",
+    "g", "kg", "ml", "l", "cup", "cups", "tbsp", "tsp", "pinch",
+}
+
+
+def _is_quantity(token: str) -> bool:
+    return token in QUANTITY_WORDS or any(ch.isnumeric() for ch in token)
+
+
+# 🧾 ingredients כפי שנשמר: JSON ([{"name": "בצל", "amount": "1"}]) או טקסט חופשי
+def ingredient_items(ingredients) -> list[str]:
+    if not ingredients:
+        return []
+    try:
+        items = json.loads(ingredients)
+    except ValueError:
+        items = None
+    if isinstance(items, list):
+        return [str(item.get("name", "")) if isinstance(item, dict) else str(item) for item in items]
+    return _SEPARATORS.split(ingredients)
+
+
+# 🥕 "2 כוסות קמח מנופה" → ("קמח מנופה", "קמח מנופה") – שם לתצוגה + מפתח קנוני למילון המצרכים
+def parse_ingredient(item: str):
+    words = []
+    for word in item.split():
+        word = _WORD_EDGES.sub("", word)
+        forms = tokens(word)
+        if word and forms and not all(_is_quantity(form) for form in forms):
+            words.append(word)
+    name = " ".join(words)
+    return name, " ".join(tokens(name))
+
+
+# רשימת (canonical, name) בלי כפילויות, לפי סדר ההופעה
+def parse_ingredients(ingredients) -> list[tuple[str, str]]:
+    parsed = {}
+    for item in ingredient_items(ingredients):
+        name, canonical = parse_ingredient(item)
+        if canonical:
+            parsed.setdefault(canonical, name)
+    return list(parsed.items())
@@ -0,0 +1,180 @@
+# 🧪 מחולל נתונים סינתטיים דטרמיניסטי: משתמשים, מתכונים עם טקסט עברי "אמיתי", דירוגים, מועדפים ותגובות,
+# בכל קנה מידה. אותו seed = אותם נתונים בדיוק. הפופולריות מוטה (מעט מתכונים מקבלים את רוב הדירוגים), כמו באתר אמיתי.
+# נטען ישירות למסד (דרך data_transfer – אותו מסלול של make manage import-data), או נכתב כקבצי NDJSON:
+#   cd backend && PYTHONPATH=. python -m benchmarks.generate_data --url sqlite:///./bench.db --recipes 100000 --ratings 1000000
+#   cd backend && PYTHONPATH=. python -m benchmarks.generate_data --out /tmp/dataset
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+START = datetime(2023, 1, 1)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+
+DISHES = ["שקשוקה", "פשטידה", "עוגה", "מרק", "סלט", "קציצות", "פסטה", "ריזוטו", "קוסקוס", "מג'דרה",
+          "חמין", "לביבות", "עוגיות", "פוקאצ'ה", "חלה", "מקלובה", "תבשיל", "פאי", "קישי", "בורקס"]
+FLAVORS = ["עגבניות", "תרד", "גבינות", "שוקולד", "עדשים", "בטטה", "חצילים", "פטריות", "תפוחים", "לימון",
+           "עוף", "דג", "אורז", "קישואים", "תמרים", "טחינה", "כרובית", "גזר", "דלעת", "חומוס"]
+STYLES = ["של סבתא", "מהירה", "חריפה", "טבעונית", "ביתית", "בתנור", "במחבת", "לשבת", "ללא גלוטן", "קלאסית"]
+INGREDIENTS = ["ביצים", "קמח", "סוכר", "שמן זית", "מלח", "פלפל שחור", "בצל", "שום", "עגבניות", "תפוחי אדמה",
+               "גזר", "חלב", "חמאה", "שמנת", "גבינה צהובה", "גבינה בולגרית", "אורז", "עדשים", "פטרוזיליה",
+               "כוסברה", "כמון", "פפריקה", "לימון", "דבש", "טחינה", "שוקולד", "אבקת אפייה", "שמרים", "חצילים", "תרד"]
+AMOUNTS = ["1", "2", "3", "חצי כוס", "כוס", "2 כוסות", "כף", "2 כפות", "כפית", "קורט", "100 גרם", "חבילה"]
+STEPS = ["מחממים תנור ל-180 מעלות", "קוצצים את הבצל והשום", "מטגנים עד להזהבה", "מוסיפים את התבלינים ומערבבים",
+         "מבשלים על אש נמוכה כחצי שעה", "מערבבים את כל החומרים בקערה", "אופים כ-40 דקות", "מגישים חם",
+         "מצננים ופורסים", "מתבלים במלח ופלפל לפי הטעם"]
+COMMENTS = ["מתכון מעולה!", "יצא טעים מאוד, תודה", "הכנתי לשבת וכולם אהבו", "קצת מלוח לטעמי", "הוספתי עוד שום",
+            "פשוט ומהיר", "הילדים ביקשו עוד", "יצא לי יבש, אולי פחות זמן בתנור", "שומרת במועדפים", "וואו"]
+DIFFICULTIES = ["קל", "בינוני", "קשה"]
+PREP_TIMES = ["10 דקות", "20 דקות", "30 דקות", "45 דקות", "שעה", "שעתיים"]
+
+ENTITIES = ["users", "recipes", "ratings", "favorites", "comments"]
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    return START + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+
+# משקלי פופולריות בסגנון Zipf, בסדר אקראי (קבוע ל-seed) – המתכון הפופולרי לא תמיד id=1
+def popularity(rng: random.Random, recipes: int) -> list:
+    weights = [1 / (rank ** 0.8) for rank in range(1, recipes + 1)]
+    rng.shuffle(weights)
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+def users(rng: random.Random, count: int):
+    for user_id in range(1, count + 1):
+        # wants_emails=False – בנצ'מרק של דירוגים לא שולח מיילים לאף אחד
+        yield {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com",
+               "password": "x", "created_at": _timestamp(rng), "is_admin": user_id == 1, "wants_emails": False}
+
+
+def recipes(rng: random.Random, count: int, user_count: int):
+    for recipe_id in range(1, count + 1):
+        items = rng.sample(INGREDIENTS, rng.randint(3, 9))
+        yield {
+            "id": recipe_id,
+            "title": f"{rng.choice(DISHES)} {rng.choice(FLAVORS)} {rng.choice(STYLES)}",
+            "description": f"{rng.choice(DISHES)} {rng.choice(STYLES)} עם {' ו'.join(rng.sample(FLAVORS, 2))}",
+            "ingredients": json.dumps([{"name": name, "amount": rng.choice(AMOUNTS)} for name in items], ensure_ascii=False),
+            "instructions": ". ".join(rng.sample(STEPS, rng.randint(3, 6))),
+            "is_public": rng.random() < 0.85,
+            "created_at": _timestamp(rng),
+            "prep_time": rng.choice(PREP_TIMES),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "user_id": rng.randint(1, user_count),
+        }
+
+
+# total שורות ייחודיות (user_id, recipe_id), מחולקות לפי הפופולריות. כל מתכון מקבל מדגם משתמשים בלי חזרות,
+# כך שאין צורך להחזיק בזיכרון קבוצה של כל הזוגות
+def _per_recipe(rng: random.Random, total: int, weights: list, user_count: int):
+    for recipe_id, weight in enumerate(weights, start=1):
+        expected = total * weight
+        count = min(user_count, int(expected) + (rng.random() < expected % 1))
+        if count:
+            yield recipe_id, rng.sample(range(1, user_count + 1), count)
+
+
+def ratings(rng: random.Random, total: int, weights: list, user_count: int):
+    for recipe_id, user_ids in _per_recipe(rng, total, weights, user_count):
+        for user_id in user_ids:
+            # רוב הדירוגים גבוהים, כמו באתרי מתכונים
+            yield {"user_id": user_id, "recipe_id": recipe_id, "rating": rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 6, 8])[0],
+                   "created_at": _timestamp(rng)}
+
+
+def favorites(rng: random.Random, total: int, weights: list, user_count: int):
+    for recipe_id, user_ids in _per_recipe(rng, total, weights, user_count):
+        for user_id in user_ids:
+            yield {"user_id": user_id, "recipe_id": recipe_id, "created_at": _timestamp(rng)}
+
+
+def comments(rng: random.Random, total: int, weights: list, user_count: int):
+    recipe_ids = rng.choices(range(1, len(weights) + 1), weights, k=total)
+    for recipe_id in recipe_ids:
+        yield {"user_id": rng.randint(1, user_count), "recipe_id": recipe_id, "content": rng.choice(COMMENTS),
+               "created_at": _timestamp(rng)}
+
+
+# כל ישות מקבלת RNG משלה (נגזר מה-seed) – שינוי בכמות התגובות לא משנה את הדירוגים
+def dataset(seed: int, scale: dict) -> dict:
+    rngs = {entity: random.Random(f"{seed}:{entity}") for entity in ENTITIES}
+    weights = popularity(random.Random(f"{seed}:popularity"), scale["recipes"])
+    return {
+        "users": users(rngs["users"], scale["users"]),
+        "recipes": recipes(rngs["recipes"], scale["recipes"], scale["users"]),
+        "ratings": ratings(rngs["ratings"], scale["ratings"], weights, scale["users"]),
+        "favorites": favorites(rngs["favorites"], scale["favorites"], weights, scale["users"]),
+        "comments": comments(rngs["comments"], scale["comments"], weights, scale["users"]),
+    }
+
+
+def load(url: str, seed: int, scale: dict, batch_size: int):
+    from alembic import command
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.db.migrations import alembic_config
+    from app.services import data_transfer
+
+    command.upgrade(alembic_config(url), "head")
+    engine = create_engine(url)
+    for entity, rows in dataset(seed, scale).items():
+        started = time.perf_counter()
+        with Session(engine) as db:
+            # טעינה ראשונית למסד ריק – בנייה מלאה אחת של טבלאות הדירוג זולה מעדכון כל מתכון בנפרד
+            count = data_transfer.import_rows(db, entity, rows, batch_size, rebuild_leaderboards=True)
+            db.commit()
+        elapsed = time.perf_counter() - started
+        print(f"{entity:<10} {count:>10,} rows  {elapsed:7.1f}s  {count / max(elapsed, 1e-9):>10,.0f} rows/s")
+    engine.dispose()
+
+
+def write(out: str, seed: int, scale: dict):
+    from app.services import data_transfer
+
+    os.makedirs(out, exist_ok=True)
+    for entity, rows in dataset(seed, scale).items():
+        path = os.path.join(out, f"{entity}.ndjson")
+        with open(path, "w", encoding="utf-8") as stream:
+            count = data_transfer.write_rows(stream, data_transfer.NDJSON, data_transfer.ENTITIES[entity][1], rows)
+        print(f"{entity:<10} {count:>10,} rows  → {path}")
+
+
+def add_scale_arguments(parser):
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--ratings", type=int, default=100000)
+    parser.add_argument("--favorites", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def scale_of(args) -> dict:
+    return {entity: getattr(args, entity) for entity in ENTITIES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="נתונים סינתטיים לבנצ'מרק (דטרמיניסטי לפי seed)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="מסד יעד (הסכמה מעודכנת ל-head לפני הטעינה)")
+    target.add_argument("--out", help="תיקייה לקבצי NDJSON (לטעינה עם make manage import-data)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # app.db.database יוצר את המנוע כבר ב-import; בכתיבה לקבצים הוא לא נוגע במסד
+    if args.url:
+        os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    if args.url:
+        load(args.url, args.seed, scale_of(args), args.batch_size)
+    else:
+        write(args.out, args.seed, scale_of(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# 🏋️ בנצ'מרק עומס מקצה לקצה: משתמשים וירטואליים במקביל מריצים תרחישים (דפדוף בפידים, חיפוש, פתיחת מתכון,
+# דירוג, מועדף, תגובה) מול האפליקציה – בתוך התהליך (ASGI, בלי רשת) או מול uvicorn שרץ (--base-url).
+# מדפיס p50 / p95 / p99 ותפוקה לכל endpoint, ושומר JSON להשוואה בין ריצות (--compare).
+#   cd backend && PYTHONPATH=. python -m benchmarks.load_test                      # מסד SQLite זמני שנוצר במחולל
+#   cd backend && PYTHONPATH=. python -m benchmarks.load_test --url sqlite:///./bench.db --duration 60
+#   cd backend && PYTHONPATH=. python -m benchmarks.load_test --url postgresql://... --base-url http://localhost:8000
+#   cd backend && PYTHONPATH=. python -m benchmarks.load_test --compare benchmarks/results/load-20260101-120000.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from benchmarks import generate_data
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+FEEDS = ["/recipes/sorted/recent", "/recipes/sorted/top-rated", "/recipes/sorted/favorited", "/recipes/sorted/random"]
+SEARCH_TERMS = generate_data.DISHES + generate_data.FLAVORS + generate_data.INGREDIENTS
+
+
+# ⚖️ תרחיש -> משקל: כמה פעמים, יחסית, משתמש וירטואלי בוחר בו. רוב התנועה קריאות, כמו באתר אמיתי
+SCENARIOS = {
+    "browse_feeds": 45,
+    "search": 15,
+    "open_recipe": 25,
+    "rate": 7,
+    "favorite": 5,
+    "comment": 3,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    # name = ה-route (עם {recipe_id}), לא ה-URL – כל המתכונים נספרים יחד
+    async def request(self, client, method: str, name: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            response, status = None, type(e).__name__
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][str(status)] += 1
+        return response
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, rng: random.Random, user_id: int, recipe_ids: list, token: str):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.user_id = user_id
+        self.recipe_ids = recipe_ids
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _recipe(self) -> int:
+        return self.rng.choice(self.recipe_ids)
+
+    async def browse_feeds(self):
+        feed = self.rng.choice(FEEDS)
+        params = {"seed": self.rng.randint(1, 1000)} if feed.endswith("random") else {}
+        response = await self.recorder.request(self.client, "GET", f"GET {feed}", feed, params=params)
+        # חצי מהמשתמשים ממשיכים לעמוד הבא
+        cursor = response.json().get("next_cursor") if response is not None and response.status_code == 200 else None
+        if cursor and self.rng.random() < 0.5:
+            await self.recorder.request(self.client, "GET", f"GET {feed} (cursor)", feed, params={**params, "cursor": cursor})
+
+    async def search(self):
+        await self.recorder.request(self.client, "GET", "GET /recipes/search", "/recipes/search",
+            params={"q": self.rng.choice(SEARCH_TERMS)})
+
+    async def open_recipe(self):
+        recipe_id = self._recipe()
+        await self.recorder.request(self.client, "GET", "GET /recipes/public/{recipe_id}", f"/recipes/public/{recipe_id}")
+        await self.recorder.request(self.client, "GET", "GET /comments/{recipe_id}", f"/comments/{recipe_id}")
+
+    async def rate(self):
+        recipe_id = self._recipe()
+        await self.recorder.request(self.client, "POST", "POST /recipes/recipe/{recipe_id}/rate",
+            f"/recipes/recipe/{recipe_id}/rate", json={"rating": self.rng.randint(1, 5)}, headers=self.headers)
+
+    # מועדף קיים (400) => מסירים אותו, כך שהתרחיש מודד גם הוספה וגם הסרה
+    async def favorite(self):
+        recipe_id = self._recipe()
+        response = await self.recorder.request(self.client, "POST", "POST /favorites/{recipe_id}",
+            f"/favorites/{recipe_id}", headers=self.headers)
+        if response is not None and response.status_code == 400:
+            await self.recorder.request(self.client, "DELETE", "DELETE /favorites/{recipe_id}",
+                f"/favorites/{recipe_id}", headers=self.headers)
+
+    async def comment(self):
+        recipe_id = self._recipe()
+        await self.recorder.request(self.client, "POST", "POST /comments/{recipe_id}", f"/comments/{recipe_id}",
+            json={"content": self.rng.choice(generate_data.COMMENTS)}, headers=self.headers)
+
+    async def run(self, deadline: float):
+        names, weights = list(SCENARIOS), list(SCENARIOS.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        statuses = dict(recorder.statuses[name])
+        endpoints[name] = {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+            "statuses": statuses,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def print_report(summary: dict, previous: dict = None):
+    print(f"\n{'endpoint':<46}{'req':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}")
+    for name, e in summary["endpoints"].items():
+        line = f"{name:<46}{e['requests']:>8}{e['rps']:>9.1f}{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}{e['errors']:>6}"
+        before = (previous or {}).get("endpoints", {}).get(name)
+        if before:
+            line += f"   p95 {e['p95_ms'] - before['p95_ms']:+.1f}ms, rps {e['rps'] - before['rps']:+.1f}"
+        print(line)
+    print(f"\ntotal: {summary['requests']} requests in {summary['elapsed_s']}s = {summary['rps']} req/s")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _population(url: str, sample: int, rng: random.Random):
+    from sqlalchemy import create_engine, select, func
+    from app.models import User, Recipe
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        user_ids = connection.scalars(select(User.id)).all()
+        public_ids = connection.scalars(select(Recipe.id).where(Recipe.is_public == True)).all()
+        dialect = engine.dialect.name
+        counts = {
+            "users": len(user_ids),
+            "recipes": connection.scalar(select(func.count()).select_from(Recipe)),
+        }
+    engine.dispose()
+    return user_ids, rng.sample(public_ids, min(sample, len(public_ids))), dialect, counts
+
+
+async def drive(args, url: str) -> dict:
+    import httpx
+    from app.services.users_services import create_access_token
+
+    rng = random.Random(args.seed)
+    user_ids, recipe_ids, dialect, counts = _population(url, args.recipe_sample, rng)
+    recorder = Recorder()
+
+    async def run_all(client):
+        users = [
+            VirtualUser(client, recorder, random.Random(f"{args.seed}:{i}"), user_id, recipe_ids,
+                        create_access_token({"sub": str(user_id)}))
+            for i, user_id in enumerate(rng.sample(user_ids, min(args.concurrency, len(user_ids))))
+        ]
+        # חימום: מטמונים, בריכת חיבורים, עץ ההשלמה – לא נכנס לתוצאות
+        await asyncio.gather(*(user.run(time.perf_counter() + args.warmup) for user in users))
+        recorder.latencies.clear()
+        recorder.statuses.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run(started + args.duration) for user in users))
+        return time.perf_counter() - started
+
+    timeout = httpx.Timeout(30.0)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout) as client:
+            elapsed = await run_all(client)
+    else:
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+                elapsed = await run_all(client)
+
+    return {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "target": args.base_url or "in-process",
+            "dialect": dialect,
+            "dataset": counts,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "scenarios": SCENARIOS,
+        },
+        **summarize(recorder, elapsed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="בנצ'מרק עומס: תרחישי משתמש מול ה-API, p50/p95/p99 לכל endpoint")
+    parser.add_argument("--url", help="המסד של האפליקציה (ברירת מחדל: SQLite זמני שממולא במחולל)")
+    parser.add_argument("--base-url", help="uvicorn שרץ מול אותו מסד, במקום להריץ את האפליקציה בתוך התהליך")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="שניות מדידה")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--recipe-sample", type=int, default=2000, help="כמה מתכונים ציבוריים המשתמשים פותחים / מדרגים")
+    parser.add_argument("--output", help=f"קובץ התוצאות (ברירת מחדל: {RESULTS_DIR}/load-<זמן>.json)")
+    parser.add_argument("--compare", help="ריצה קודמת (JSON) – מדפיס את ההפרש ב-p95 וב-rps")
+    generate_data.add_scale_arguments(parser)
+    parser.set_defaults(users=500, recipes=5000, ratings=20000, favorites=10000, comments=5000)
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+        print(f"📦 מסד זמני {url}")
+    # האפליקציה קוראת את המשתנים כבר ב-import – קובעים אותם לפני שנוגעים ב-app
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    if not args.url:
+        generate_data.load(url, args.seed, generate_data.scale_of(args), batch_size=5000)
+
+    summary = asyncio.run(drive(args, url))
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as stream:
+            previous = json.load(stream)
+    print_report(summary, previous)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as stream:
+        json.dump(summary, stream, ensure_ascii=False, indent=2)
+    print(f"💾 {output}")
+
+
+if __name__ == "__main__":
+    main()
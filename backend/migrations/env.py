@@ -0,0 +1,62 @@
+from alembic import context
+from sqlalchemy import create_engine
+from app.db.database import Base, DATABASE_URL
+import app.models  # noqa: F401 – רושם את כל הטבלאות ב-Base.metadata (בשביל --autogenerate)
+
+config = context.config
+target_metadata = Base.metadata
+
+# טבלאות שאינן במודלים: אינדקס FTS5 של SQLite (והטבלאות הפנימיות שלו) – נוצרות ב-DDL ידני
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and name.startswith("recipes_fts"))
+
+
+# בניית טבלה מחדש (batch) ב-SQLite מוחקת את הטבלה הישנה – עם מפתחות זרים פעילים זה היה מפעיל ON DELETE CASCADE
+# על כל השורות שמצביעות עליה. PRAGMA עובד רק מחוץ לטרנזקציה, לכן לפני begin_transaction.
+# exec_driver_sql פותח טרנזקציה (autobegin) – בלי commit מיד אחריו, begin_transaction של alembic הופך ל-no-op
+# וה-connect() מבטל את כל המיגרציות ביציאה. חיבור שהקורא העביר (config.attributes) – הטרנזקציה שלו, לא נוגעים
+def _without_sqlite_foreign_keys(connection, owned: bool):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        if owned:
+            connection.commit()
+
+
+def _configure(**options):
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=True,  # SQLite לא יודע ALTER מלא – alembic בונה את הטבלה מחדש
+        **options,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=config.get_main_option("sqlalchemy.url") or DATABASE_URL, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+# חיבור קיים (בדיקות / app.db.migrations) מגיע ב-config.attributes, אחרת מתחברים לפי DATABASE_URL
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _without_sqlite_foreign_keys(connection, owned=False)
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(config.get_main_option("sqlalchemy.url") or DATABASE_URL)
+    with engine.connect() as connection:
+        _without_sqlite_foreign_keys(connection, owned=True)
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,202 @@
+"""feed aggregates, leaderboards, site counters, search and ingredient tables
+
+העמודות והטבלאות שנוספו למודלים אחרי ה-baseline. המיגרציה גם ממלאת את העמודות החדשות למתכונים קיימים:
+סיכומי דירוג ומועדפים, random_key ועמודות החיפוש. טבלאות הדירוג נבנות ב-0006 (אחרי deleted_at של 0005).
+נשאר רק האינדקס ההפוך של המצרכים, שבנוי בקוד:
+    python -m app.manage backfill-ingredients
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models import recipe_search_columns
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+# עותק קפוא של POSTGRES_SEARCH_DDL / SQLITE_SEARCH_DDL מ-app/models.py – מיגרציה לא משתנה כשהמודלים משתנים
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(search_title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(search_ingredients, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_title_trgm ON recipes USING GIN (search_title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_ingredients_trgm ON recipes USING GIN (search_ingredients gin_trgm_ops)",
+]
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts
+        USING fts5(search_title, search_ingredients, content='recipes', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, search_title, search_ingredients)
+        VALUES (new.id, new.search_title, new.search_ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, search_title, search_ingredients)
+        VALUES ('delete', old.id, old.search_title, old.search_ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_update AFTER UPDATE OF search_title, search_ingredients ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, search_title, search_ingredients)
+        VALUES ('delete', old.id, old.search_title, old.search_ingredients);
+        INSERT INTO recipes_fts(rowid, search_title, search_ingredients)
+        VALUES (new.id, new.search_title, new.search_ingredients);
+    END""",
+]
+
+# טבלת FTS5 עם content חיצוני מתמלאת רק מהטריגרים – השורות שכבר מולאו ב-_backfill נכנסות באינדקס ב-rebuild
+SQLITE_FTS_REBUILD = "INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')"
+
+POSTGRES_SEARCH_DROP = [
+    "DROP INDEX IF EXISTS ix_recipes_search_ingredients_trgm",
+    "DROP INDEX IF EXISTS ix_recipes_search_title_trgm",
+    "DROP INDEX IF EXISTS ix_recipes_search_vector",
+    "ALTER TABLE recipes DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_SEARCH_DROP = [
+    "DROP TRIGGER IF EXISTS recipes_fts_update",
+    "DROP TRIGGER IF EXISTS recipes_fts_delete",
+    "DROP TRIGGER IF EXISTS recipes_fts_insert",
+    "DROP TABLE IF EXISTS recipes_fts",
+]
+
+
+# פונקציה ולא רשימה – Column שייך לטבלה אחת, ולכן בכל הרצה (upgrade אחרי downgrade, כמה מסדים בתהליך) נבנים חדשים
+def _recipe_columns():
+    return [
+        sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("average_rating", sa.Float(), nullable=True),
+        sa.Column("favorite_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("random_key", sa.Float(), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("search_title", sa.Text(), nullable=True),
+        sa.Column("search_ingredients", sa.Text(), nullable=True),
+    ]
+
+
+# random_key ב-[0, 1) כמו random.random() במודל – ב-SQLite random() מחזיר מספר שלם של 64 ביט
+RANDOM_KEY_SQL = {
+    "postgresql": "random()",
+    "sqlite": "(abs(random()) % 1000000000) / 1000000000.0",
+}
+
+AGGREGATES_BACKFILL = [
+    """UPDATE recipes SET
+        rating_count = (SELECT count(*) FROM ratings WHERE ratings.recipe_id = recipes.id),
+        rating_sum = (SELECT coalesce(sum(rating), 0) FROM ratings WHERE ratings.recipe_id = recipes.id),
+        average_rating = (SELECT avg(rating) FROM ratings WHERE ratings.recipe_id = recipes.id),
+        favorite_count = (SELECT count(*) FROM favorites WHERE favorites.recipe_id = recipes.id)""",
+]
+
+SEARCH_BACKFILL_BATCH = 500
+
+
+# הנרמול העברי (ניקוד, אותיות סופיות, אותיות שימוש) לא ניתן לביטוי ב-SQL – במנות לפי מפתח ראשי, כמו backfill-search
+def _backfill_search_columns(bind):
+    recipes = sa.table("recipes", sa.column("id"), sa.column("title"), sa.column("ingredients"),
+        sa.column("search_title"), sa.column("search_ingredients"))
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(recipes.c.id, recipes.c.title, recipes.c.ingredients)
+            .where(recipes.c.id > last_id).order_by(recipes.c.id).limit(SEARCH_BACKFILL_BATCH)
+        ).all()
+        if not batch:
+            return
+        bind.execute(
+            recipes.update().where(recipes.c.id == sa.bindparam("recipe_id")),
+            [{"recipe_id": row.id, **recipe_search_columns(row.title, row.ingredients)} for row in batch],
+        )
+        last_id = batch[-1].id
+
+
+def _backfill():
+    bind = op.get_bind()
+    for statement in AGGREGATES_BACKFILL:
+        op.execute(statement)
+    op.execute(f"UPDATE recipes SET random_key = {RANDOM_KEY_SQL.get(bind.dialect.name, 'random()')}")
+    if not op.get_context().as_sql:
+        _backfill_search_columns(bind)
+
+
+def _search_ddl(postgresql, sqlite):
+    dialect = op.get_bind().dialect.name
+    for statement in {"postgresql": postgresql, "sqlite": sqlite}.get(dialect, []):
+        op.execute(statement)
+
+
+def upgrade():
+    with op.batch_alter_table("recipes") as batch:
+        for column in _recipe_columns():
+            batch.add_column(column)
+    _backfill()
+    op.create_index("ix_recipes_user_id", "recipes", ["user_id"])
+    op.create_index("ix_recipes_public_created", "recipes", ["is_public", "created_at", "id"])
+    op.create_index("ix_recipes_public_random", "recipes", ["is_public", "random_key", "id"])
+    _search_ddl(POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL + [SQLITE_FTS_REBUILD])
+
+    op.create_table(
+        "leaderboard_entries",
+        sa.Column("board", sa.String(), nullable=False),
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("board", "recipe_id"),
+    )
+    op.create_index("ix_leaderboard_board_position", "leaderboard_entries", ["board", "position"])
+    op.create_index("ix_leaderboard_board_score", "leaderboard_entries", ["board", "score", "recipe_id"])
+
+    op.create_table(
+        "site_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    op.create_table(
+        "ingredients",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("canonical", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("canonical"),
+    )
+    op.create_index("ix_ingredients_id", "ingredients", ["id"])
+
+    op.create_table(
+        "recipe_ingredients",
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("ingredient_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ingredient_id"], ["ingredients.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("recipe_id", "ingredient_id"),
+    )
+    op.create_index("ix_recipe_ingredients_ingredient", "recipe_ingredients", ["ingredient_id", "recipe_id"])
+
+
+def downgrade():
+    op.drop_table("recipe_ingredients")
+    op.drop_table("ingredients")
+    op.drop_table("site_counters")
+    op.drop_table("leaderboard_entries")
+
+    _search_ddl(POSTGRES_SEARCH_DROP, SQLITE_SEARCH_DROP)
+    op.drop_index("ix_recipes_public_random", table_name="recipes")
+    op.drop_index("ix_recipes_public_created", table_name="recipes")
+    op.drop_index("ix_recipes_user_id", table_name="recipes")
+    with op.batch_alter_table("recipes") as batch:
+        for column in reversed(_recipe_columns()):
+            batch.drop_column(column.name)
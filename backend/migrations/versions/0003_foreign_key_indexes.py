@@ -0,0 +1,43 @@
+"""indexes on the foreign keys the hot paths filter on
+
+ratings.recipe_id (ממוצע / ספירה למתכון), favorites.user_id ו-favorites.recipe_id (המועדפים שלי, ספירה ומחיקה),
+comments (recipe_id, created_at) – תגובות של מתכון לפי סדר, בלי מיון.
+recipes.user_id ו-(is_public, created_at, id) של הפידים כבר נוצרו ב-0002.
+ב-Postgres נבנים CONCURRENTLY – בלי לנעול כתיבות לטבלה בזמן הבנייה
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_ratings_recipe_id", "ratings", ["recipe_id"]),
+    ("ix_favorites_user_id", "favorites", ["user_id"]),
+    ("ix_favorites_recipe_id", "favorites", ["recipe_id"]),
+    ("ix_comments_recipe_created", "comments", ["recipe_id", "created_at"]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY לא רץ בתוך טרנזקציה
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        return
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,37 @@
+"""one favorite per user and recipe
+
+לפני האילוץ: מוחקים כפילויות (לחיצות כפולות במקביל – נשאר המועדף הראשון) ומתקנים את favorite_count
+של המתכונים שנפגעו. לוח המועדפים נבנה מחדש ב-0006 מהספירות המתוקנות.
+האילוץ (user_id, recipe_id) מכסה גם שאילתות לפי user_id, ולכן ix_favorites_user_id מ-0003 יורד
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM favorites WHERE id NOT IN (SELECT min(id) FROM favorites GROUP BY user_id, recipe_id)"
+    )
+    op.execute(
+        """UPDATE recipes SET favorite_count = (SELECT count(*) FROM favorites WHERE favorites.recipe_id = recipes.id)
+        WHERE favorite_count <> (SELECT count(*) FROM favorites WHERE favorites.recipe_id = recipes.id)"""
+    )
+    with op.batch_alter_table("favorites") as batch:
+        batch.create_unique_constraint("unique_user_recipe_favorite", ["user_id", "recipe_id"])
+    op.drop_index("ix_favorites_user_id", table_name="favorites")
+
+
+def downgrade():
+    op.create_index("ix_favorites_user_id", "favorites", ["user_id"])
+    with op.batch_alter_table("favorites") as batch:
+        batch.drop_constraint("unique_user_recipe_favorite", type_="unique")
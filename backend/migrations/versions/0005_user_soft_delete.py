@@ -0,0 +1,27 @@
+"""users.deleted_at for background account purge
+
+חשבון גדול מסומן deleted_at ונמחק במנות ברקע (users_services.purge_user). אם השרת נפל באמצע –
+python -m app.manage purge-deleted-users משלים את המחיקה
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("deleted_at")
@@ -0,0 +1,63 @@
+"""seed the admin dashboard counters
+
+מעכשיו get_admin_stats קורא את מספר המשתמשים / המתכונים ואת המקום הראשון בכל טבלת דירוג מ-site_counters,
+ושבילי הכתיבה מעדכנים אותם. כאן הם מקבלים את ערכי ההתחלה מהנתונים הקיימים
+(אותו חישוב כמו python -m app.manage reconcile-counters). קודם נבנות מחדש טבלאות הדירוג
+(כמו rebuild-leaderboards), כדי שהמקום הראשון ייקרא מלוח מלא ולא מטבלה ריקה
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+NAMES = ("user_count", "recipe_count", "leader_top_rated", "leader_most_favorited")
+
+# עותק קפוא של BOARDS / LISTED מ-app/services/leaderboard_service.py: ציון, תנאי כניסה
+BOARDS = {
+    "top_rated": ("average_rating", "rating_count > 0"),
+    "most_favorited": ("favorite_count", "favorite_count > 0"),
+}
+LISTED = """recipes.is_public AND NOT EXISTS (
+    SELECT 1 FROM users WHERE users.id = recipes.user_id AND users.deleted_at IS NOT NULL)"""
+
+
+def _rebuild_leaderboards():
+    op.execute("DELETE FROM leaderboard_entries")
+    for board, (score, condition) in BOARDS.items():
+        op.execute(
+            f"""INSERT INTO leaderboard_entries (board, recipe_id, score, position)
+            SELECT '{board}', id, {score}, row_number() OVER (ORDER BY {score} DESC, id DESC)
+            FROM recipes WHERE {LISTED} AND {condition}"""
+        )
+
+
+def upgrade():
+    _rebuild_leaderboards()
+    op.execute(f"DELETE FROM site_counters WHERE name IN {NAMES}")
+    op.execute(
+        """INSERT INTO site_counters (name, value, updated_at)
+        SELECT 'user_count', count(*), CURRENT_TIMESTAMP FROM users WHERE deleted_at IS NULL"""
+    )
+    op.execute(
+        """INSERT INTO site_counters (name, value, updated_at)
+        SELECT 'recipe_count', count(*), CURRENT_TIMESTAMP
+        FROM recipes JOIN users ON users.id = recipes.user_id WHERE users.deleted_at IS NULL"""
+    )
+    for board in ("top_rated", "most_favorited"):
+        op.execute(
+            f"""INSERT INTO site_counters (name, value, updated_at)
+            SELECT 'leader_{board}', coalesce(max(recipe_id), 0), CURRENT_TIMESTAMP
+            FROM leaderboard_entries WHERE board = '{board}' AND position = 1"""
+        )
+
+
+def downgrade():
+    op.execute(f"DELETE FROM site_counters WHERE name IN {NAMES}")
@@ -0,0 +1,42 @@
+"""indexes for the paginated admin listings
+
+רשימות האדמין (GET /recipes/admin/recipes/page, GET /auth/admin/users/page) ממוינות ב-keyset על (created_at, id),
+עם סינון אופציונלי לפי יוצר. (user_id, created_at, id) מחליף את ix_recipes_user_id – אותה קידומת.
+ב-Postgres נבנים CONCURRENTLY, כמו ב-0003
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_recipes_user_created", "recipes", ["user_id", "created_at", "id"]),
+    ("ix_recipes_created", "recipes", ["created_at", "id"]),
+    ("ix_users_created", "users", ["created_at", "id"]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+    op.drop_index("ix_recipes_user_id", table_name="recipes")
+
+
+def downgrade():
+    op.create_index("ix_recipes_user_id", "recipes", ["user_id"])
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
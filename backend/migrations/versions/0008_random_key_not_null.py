@@ -0,0 +1,36 @@
+"""random_key is required
+
+הפיד האקראי קורא שני טווחים באינדקס (random_key >= pivot, random_key < pivot) – מתכון בלי random_key
+לא נופל באף אחד מהם אבל כן נספר ב-total. משלימים מפתח למי שחסר (מסד שעבר 0002 לפני שהיא מילאה אותו) ומחייבים NOT NULL
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# random_key ב-[0, 1) כמו random.random() במודל – ב-SQLite random() מחזיר מספר שלם של 64 ביט
+RANDOM_KEY_SQL = {
+    "postgresql": "random()",
+    "sqlite": "(abs(random()) % 1000000000) / 1000000000.0",
+}
+
+
+def upgrade():
+    random_key = RANDOM_KEY_SQL.get(op.get_bind().dialect.name, "random()")
+    op.execute(f"UPDATE recipes SET random_key = {random_key} WHERE random_key IS NULL")
+    with op.batch_alter_table("recipes") as batch:
+        batch.alter_column("random_key", existing_type=sa.Float(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table("recipes") as batch:
+        batch.alter_column("random_key", existing_type=sa.Float(), nullable=True)
@@ -1,17 +1,36 @@
+import os
+import tempfile
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from app.db.database import Base, get_db
+from sqlalchemy.pool import StaticPool, NullPool
+from app.db.database import Base, get_db, get_read_db
+from app.db.async_database import get_async_db, get_async_read_db
+from app.db.routing import sticky_writes
+from app.db.query_stats import query_metrics
+from app.db.slow_queries import slow_queries
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.cache import response_cache, principal_cache
+from app.services.trigram_index import trigram_index
+from app.services.autocomplete import autocomplete
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# קובץ SQLite זמני – גם ה-routes האסינכרוניים (aiosqlite) צריכים לראות את אותו מסד
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
+# StaticPool – חיבור יחיד, כך שגם ה-TestClient (שרץ ב-thread אחר) משתמש באותו session של הבדיקה
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool – ה-TestClient מריץ כל בקשה ב-event loop משלו, וחיבור aiosqlite קשור ללולאה שפתחה אותו
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 @pytest.fixture(scope="function")
 def db():
     Base.metadata.create_all(bind=engine)
@@ -22,9 +41,71 @@ def db():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+# המטמונים (תשובות ומשתמשים מחוברים), אינדקס הטריגרמות, עץ ההשלמה, חלונות ה-read-your-writes, מוני השאילתות ויומן האיטיות חיים ברמת התהליך – מנקים אותם כדי שבדיקה לא תקבל תשובות של בדיקה קודמת
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    response_cache.reset()
+    principal_cache.reset()
+    trigram_index.reset()
+    autocomplete.reset()
+    sticky_writes.reset()
+    query_metrics.reset()
+    slow_queries.reset()
+    yield
+
+
 @pytest.fixture()
 def client(db):
     def override_get_db():
         yield db
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as async_db:
+            yield async_db
+
+    # בבדיקות אין replica: גם תלויות הקריאה מקבלות את אותו מסד
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
     yield TestClient(app)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, *args):
+        self.count += 1
+        self.statements.append(statement)
+
+
+# ✅ סופר כמה פקודות SQL נשלחו ל-DB בתוך בלוק with (בשני המנועים – sync ו-async)
+@pytest.fixture()
+def count_queries():
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        engines = [engine, async_engine.sync_engine]
+        for target in engines:
+            event.listen(target, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", counter)
+    return counting
+
+
+# ✅ תקציב שאילתות: הבדיקה נכשלת אם הבלוק שלח יותר פקודות SQL מהמותר, ומדפיסה אותן (כך רואים N+1 מיד)
+@pytest.fixture()
+def query_budget(count_queries):
+    @contextmanager
+    def budget(limit):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= limit, (
+            f"{counter.count} SQL statements, budget is {limit}:\n" + "\n".join(counter.statements)
+        )
+    return budget
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+from app.models import User, Recipe
+from app.services import users_services
+
+START = datetime(2026, 1, 1)
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user.id)})}"}
+
+
+def seed(db):
+    admin = User(username="admin", email="admin@example.com", password="x", is_admin=True, created_at=START)
+    cook = User(username="cook", email="cook@example.com", password="x", created_at=START + timedelta(days=1))
+    baker = User(username="baker", email="baker@example.com", password="x", created_at=START + timedelta(days=2))
+    db.add_all([admin, cook, baker])
+    db.flush()
+    # (יוצר, ציבורי, קושי) – המתכון ה-i נוצר ביום i
+    for day, (owner, public, difficulty) in enumerate([
+        (cook, True, "קל"), (baker, False, "קשה"), (cook, True, "בינוני"), (baker, True, "קל"), (cook, False, "קל"),
+    ]):
+        db.add(Recipe(title=f"recipe {day}", ingredients="מלח", user_id=owner.id, is_public=public, difficulty=difficulty,
+                      prep_time="10", share_token=str(uuid4()), created_at=START + timedelta(days=day)))
+    db.commit()
+    return admin, cook, baker
+
+
+def all_pages(client, url, headers, key, **params):
+    titles, cursor = [], None
+    while True:
+        res = client.get(url, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200, res.text
+        body = res.json()
+        titles += [item["title" if key == "recipes" else "username"] for item in body[key]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return titles
+
+
+def test_admin_recipe_pages_filter_and_sort_on_the_server(client, db):
+    admin, cook, _ = seed(db)
+    headers, url = auth(admin), "/recipes/admin/recipes/page"
+
+    assert all_pages(client, url, headers, "recipes", limit=2) == [f"recipe {i}" for i in (4, 3, 2, 1, 0)]
+    assert all_pages(client, url, headers, "recipes", limit=2, sort="oldest") == [f"recipe {i}" for i in range(5)]
+    assert all_pages(client, url, headers, "recipes", is_public="false") == ["recipe 4", "recipe 1"]
+    assert all_pages(client, url, headers, "recipes", limit=1, creator_id=cook.id) == ["recipe 4", "recipe 2", "recipe 0"]
+    assert all_pages(client, url, headers, "recipes", difficulty="קל", is_public="true") == ["recipe 3", "recipe 0"]
+    assert all_pages(client, url, headers, "recipes", created_from=(START + timedelta(days=1)).isoformat(),
+                     created_to=(START + timedelta(days=3)).isoformat()) == ["recipe 2", "recipe 1"]
+
+
+def test_admin_user_pages(client, db):
+    admin, _, _ = seed(db)
+    headers, url = auth(admin), "/auth/admin/users/page"
+
+    assert all_pages(client, url, headers, "users", limit=2, sort="username") == ["admin", "baker", "cook"]
+    assert all_pages(client, url, headers, "users", limit=2) == ["baker", "cook", "admin"]
+    assert all_pages(client, url, headers, "users", is_admin="false", sort="oldest") == ["cook", "baker"]
+    res = client.get(url, headers=headers)
+    assert "password" not in res.json()["users"][0]
+
+
+def test_admin_listings_are_admin_only(client, db):
+    _, cook, _ = seed(db)
+    for url in ("/recipes/admin/recipes/page", "/auth/admin/users/page", "/recipes/admin/recipes/export", "/auth/admin/users/export"):
+        assert client.get(url, headers=auth(cook)).status_code == 403, url
+
+
+def test_admin_exports_stream_filtered_rows(client, db):
+    admin, cook, _ = seed(db)
+
+    res = client.get("/recipes/admin/recipes/export", headers=auth(admin), params={"creator_id": cook.id, "sort": "oldest"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert 'filename="recipes.csv"' in res.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [row["title"] for row in rows] == ["recipe 0", "recipe 2", "recipe 4"]
+    assert {row["creator_name"] for row in rows} == {"cook"}
+    assert "ingredients" not in rows[0]
+
+    res = client.get("/auth/admin/users/export", headers=auth(admin), params={"format": "ndjson", "sort": "username"})
+    assert res.headers["content-type"] == "application/x-ndjson"
+    users = [json.loads(line) for line in res.text.splitlines()]
+    assert [user["username"] for user in users] == ["admin", "baker", "cook"]
+    assert "password" not in users[0]
+
+    assert client.get("/auth/admin/users/export", headers=auth(admin), params={"format": "xml"}).status_code == 422
@@ -0,0 +1,42 @@
+from uuid import uuid4
+from app.main import app
+from app.db.database import get_db
+from app.db.async_database import async_url
+from app.models import User, Recipe, Comment, Favorite
+from app.services import users_services
+
+
+def test_async_url_swaps_in_async_driver():
+    assert async_url("postgresql://app:secret@db:5432/recipes") == "postgresql+asyncpg://app:secret@db:5432/recipes"
+    assert async_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+
+
+def test_hot_read_routes_do_not_use_the_sync_session(client, db):
+    user = User(username="chef", email="chef@example.com", password="x")
+    db.add(user)
+    db.commit()
+    recipe = Recipe(title="שקשוקה", ingredients="ביצים", user_id=user.id, is_public=True,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    db.add_all([Comment(content="טעים", user_id=user.id, recipe_id=recipe.id), Favorite(user_id=user.id, recipe_id=recipe.id)])
+    db.commit()
+    recipe_id, token = recipe.id, recipe.share_token
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user.id)})}"}
+
+    # כל שימוש ב-get_db (הסינכרוני) בבקשות האלה יכשיל את הבדיקה
+    def no_sync_db():
+        raise AssertionError("sync session used")
+        yield
+    app.dependency_overrides[get_db] = no_sync_db
+
+    for url in ("/recipes/", "/recipes/sorted/recent", "/recipes/sorted/top-rated", "/recipes/sorted/favorited",
+                "/recipes/sorted/random?seed=1", "/recipes/public-random", f"/recipes/public/{recipe_id}",
+                f"/recipes/share/{token}", f"/comments/{recipe_id}"):
+        assert client.get(url).status_code == 200, url
+
+    assert client.get(f"/recipes/{recipe_id}", headers=headers).json()["title"] == "שקשוקה"
+    assert [r["id"] for r in client.get("/favorites/", headers=headers).json()] == [recipe_id]
+    assert client.get("/favorites/").status_code == 401
+    bad = users_services.create_access_token({"sub": "999"})
+    assert client.get(f"/recipes/{recipe_id}", headers={"Authorization": f"Bearer {bad}"}).status_code == 401
@@ -0,0 +1,89 @@
+from uuid import uuid4
+from app.models import User, Recipe
+from app.services import recipe_services, favorites_services, users_services
+from app.services.autocomplete import PrefixTrie, autocomplete
+from app.schemas.recipe_schema import RecipeUpdate
+from app.schemas.user_schema import UserUpdate
+
+
+def create_user(db, username="chef"):
+    user = User(username=username, email=f"{username}@example.com", password="pass")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def create_recipe(db, user, title, ingredients="מים", public=True):
+    recipe = Recipe(title=title, ingredients=ingredients, user_id=user.id, is_public=public,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    return recipe
+
+
+def texts(suggestions):
+    return [s["text"] for s in suggestions]
+
+
+def test_trie_returns_top_k_by_weight_and_matches_word_starts():
+    trie = PrefixTrie(k=2)
+    trie.add("עוגת שוקולד", "עוגת שוקולד", 3)
+    trie.add("שוקו חם", "שוקו חם", 1)
+    trie.add("שקשוקה", "שקשוקה", 2)
+    assert [key for key, _, _ in trie.top("ש", 2)] == ["עוגת שוקולד", "שקשוקה"]
+
+    trie.add("שוקו חם", "שוקו חם", 5)  # עלייה נכנסת למטמון הקיים
+    assert [key for key, _, _ in trie.top("ש", 2)] == ["שוקו חם", "עוגת שוקולד"]
+    trie.add("שוקו חם", "שוקו חם", -6)  # הסרה מחשבת את המטמון מחדש
+    assert [key for key, _, _ in trie.top("ש", 2)] == ["עוגת שוקולד", "שקשוקה"]
+    assert trie.top("שוקו ח", 2) == []
+    shoko = trie.root.children["ש"].children["ו"].children["ק"].children["ו"]
+    assert list(shoko.children) == ["ל"]  # הענף של "שוקו חם" נגזם
+
+
+def test_trie_is_bounded():
+    trie = PrefixTrie(max_terms=2)
+    for key in ("אורז", "אפונה", "אגס"):
+        trie.add(key, key, 1)
+    assert len(trie) == 2
+    assert trie.dropped == 1
+
+
+def test_suggestions_follow_recipe_and_user_writes(db):
+    user = create_user(db)
+    other = create_user(db, "baker")
+    soup = create_recipe(db, user, "מרק עגבניות", "עגבניות, בצל")
+    create_recipe(db, other, "מרק בצל", "בצל, חמאה")
+    create_recipe(db, other, "מרק סודי", "מלח", public=False)
+    autocomplete.ensure_built(db)
+
+    assert texts(autocomplete.suggest("מר", ["title"])) == ["מרק בצל", "מרק עגבניות"]
+    assert autocomplete.suggest("בצ", ["ingredient"]) == [{"text": "בצל", "kind": "ingredient", "score": 2}]
+
+    favorites_services.add_favorite(soup.id, db, other)
+    assert texts(autocomplete.suggest("מר", ["title"])) == ["מרק עגבניות", "מרק בצל"]
+
+    recipe_services.update_recipe(soup.id, RecipeUpdate(title="מרק ירקות", ingredients="גזר"), db, user)
+    assert texts(autocomplete.suggest("מרק", ["title"])) == ["מרק ירקות", "מרק בצל"]
+    assert autocomplete.suggest("עגב") == []
+
+    users_services.update_profile(UserUpdate(username="chefit"), db, user)
+    assert texts(autocomplete.suggest("chef", ["creator"])) == ["chefit"]
+
+    recipe_services.delete_recipe(soup.id, db, user)
+    assert autocomplete.suggest("chef") == []
+    assert texts(autocomplete.suggest("ירק")) == []
+
+
+def test_autocomplete_route(client, db):
+    user = create_user(db)
+    create_recipe(db, user, "שקשוקה", "ביצים, שמן זית")
+
+    res = client.get("/recipes/autocomplete", params={"q": "ש"})
+    assert res.status_code == 200
+    assert res.json() == [
+        {"text": "שמן זית", "kind": "ingredient", "score": 1},
+        {"text": "שקשוקה", "kind": "title", "score": 1},
+    ]
+    res = client.get("/recipes/autocomplete", params={"q": "זי", "kind": "ingredient"})
+    assert texts(res.json()) == ["שמן זית"]
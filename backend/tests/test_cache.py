@@ -0,0 +1,89 @@
+from uuid import uuid4
+from app.models import User, Recipe
+from app.services import users_services
+from app.services.cache import TTLCache, response_cache, FEEDS, recipe_tag
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" הופך לאחרון בשימוש
+    cache.set("c", 3)
+
+    assert cache.get_or_set("b", [], lambda: "recomputed") == "recomputed"
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 2
+
+
+def test_cache_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("feed", "v1")
+    clock.now = 4.9
+    assert cache.get("feed") == "v1"
+    clock.now = 5.0
+    assert cache.get_or_set("feed", [], lambda: "v2") == "v2"
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_cache_invalidates_by_tag():
+    cache = TTLCache()
+    cache.set("recent", "feed", [FEEDS])
+    cache.set("public-1", "one", [recipe_tag(1)])
+    cache.set("public-2", "two", [recipe_tag(2)])
+
+    cache.invalidate(FEEDS, recipe_tag(1))
+    assert cache.stats()["size"] == 1
+    assert cache.get_or_set("public-2", [], lambda: "new") == "two"
+
+
+def test_cache_drops_result_computed_before_a_write():
+    cache = TTLCache()
+
+    def compute_while_written():
+        cache.invalidate(FEEDS)  # כתיבה שהסתיימה בזמן שהשאילתה רצה
+        return "stale"
+
+    assert cache.get_or_set("recent", [FEEDS], compute_while_written) == "stale"
+    assert cache.stats()["size"] == 0
+
+
+def test_feed_served_from_cache_until_a_write(client, db, count_queries):
+    user = User(username="chef", email="chef@example.com", password="x", is_admin=True)
+    db.add(user)
+    db.commit()
+    recipe = Recipe(title="שקשוקה", ingredients="ביצים", user_id=user.id, is_public=True,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    recipe_id = recipe.id
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user.id)})}"}
+
+    assert client.get("/recipes/sorted/recent").json()["recipes"][0]["average_rating"] is None
+    with count_queries() as counter:
+        client.get("/recipes/sorted/recent")
+        client.get(f"/recipes/public/{recipe_id}")
+        client.get(f"/recipes/public/{recipe_id}")
+    assert counter.count == 1  # רק הקריאה הראשונה ל-public/{id}
+
+    res = client.post(f"/recipes/recipe/{recipe_id}/rate", json={"rating": 5}, headers=headers)
+    assert res.status_code == 200
+    assert client.get("/recipes/sorted/recent").json()["recipes"][0]["average_rating"] == 5.0
+    assert client.get(f"/recipes/public/{recipe_id}").json()["average_rating"] == 5.0
+
+    stats = client.get("/metrics/cache", headers=headers).json()
+    assert stats["hits"] == 2
+    assert stats["invalidations"] == 2
+    assert response_cache.stats()["size"] == 2
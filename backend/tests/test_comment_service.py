@@ -60,19 +60,25 @@ def test_add_comment_recipe_not_found(db):
 
 # ====== get_comments ======
 
-def test_get_comments_success(db):
+def test_get_comments_success(db, query_budget):
     user = create_user()
     recipe = create_recipe(user_id=user.id)
+    other = create_user(id=2)
     comment = create_comment(content="Yummy!", user_id=user.id, recipe_id=recipe.id)
+    replies = [create_comment(content="Agreed", user_id=other.id, recipe_id=recipe.id) for _ in range(3)]
 
-    db.add_all([user, recipe, comment])
+    db.add_all([user, other, recipe, comment, *replies])
     db.commit()
+    recipe_id = recipe.id
 
-    result = comments_service.get_comments(recipe.id, db)
+    # שמות הכותבים נטענים באותה שאילתה – לא שאילתה לכל תגובה
+    with query_budget(1):
+        result = comments_service.get_comments(recipe_id, db)
 
     assert isinstance(result, list)
-    assert len(result) == 1
-    assert result[0].content == "Yummy!"
+    assert len(result) == 4
+    assert {c.content for c in result} == {"Yummy!", "Agreed"}
+    assert all(c.username != "Unknown" for c in result)
 
 # ====== delete_comment ======
 
@@ -0,0 +1,115 @@
+import io
+import json
+from sqlalchemy import select, func
+from app.models import User, Recipe, RecipeIngredient, LeaderboardEntry
+from app.services import data_transfer, search_service, site_counters, leaderboard_service
+
+
+USERS = [
+    {"id": 1, "username": "chef", "email": "chef@example.com", "password": "hash"},
+    {"id": 2, "username": "guest", "email": "guest@example.com", "password": "hash", "is_admin": True},
+]
+RECIPES = [
+    {"id": 10, "title": "שקשוקה", "ingredients": '[{"name": "ביצים", "amount": "4"}, {"name": "עגבניות"}]',
+     "prep_time": "20", "difficulty": "קל", "user_id": 1, "created_at": "2024-01-01T08:00:00"},
+    {"id": 11, "title": "פסטה", "ingredients": "פסטה, שמן זית", "prep_time": "15", "user_id": 2, "is_public": False},
+]
+RATINGS = [
+    {"user_id": 1, "recipe_id": 10, "rating": 4},
+    {"user_id": 2, "recipe_id": 10, "rating": 5},
+]
+FAVORITES = [{"user_id": 2, "recipe_id": 10}]
+
+
+def ndjson(rows):
+    return io.StringIO("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+
+def load_all(db, batch_size=1):
+    for entity, rows in (("users", USERS), ("recipes", RECIPES), ("ratings", RATINGS), ("favorites", FAVORITES)):
+        data_transfer.import_rows(db, entity, data_transfer.read_rows(ndjson(rows), data_transfer.NDJSON), batch_size)
+    db.commit()
+
+
+def test_import_fills_defaults_and_derived_state(db):
+    revision = (site_counters.read(db, site_counters.FEED_REVISION) or (0,))[0]
+    load_all(db)
+
+    shakshuka = db.get(Recipe, 10)
+    assert shakshuka.is_public and shakshuka.random_key is not None
+    assert shakshuka.created_at.year == 2024
+    assert (shakshuka.rating_count, shakshuka.average_rating, shakshuka.favorite_count) == (2, 4.5, 1)
+    assert db.get(User, 2).is_admin and db.get(User, 1).wants_emails
+    assert db.scalar(select(func.count()).select_from(RecipeIngredient).where(RecipeIngredient.recipe_id == 10)) == 2
+    assert db.scalar(select(func.count()).select_from(LeaderboardEntry)) == 2  # top_rated + most_favorited
+    assert site_counters.read(db, site_counters.FEED_REVISION).value > revision
+
+    # עמודות החיפוש מולאו – החיפוש מוצא את המתכון המיובא
+    results, _ = search_service.search_page(db, q="שקשוקה")
+    assert [r.id for r in results] == [10]
+
+
+def leaderboards(db):
+    return db.execute(
+        select(LeaderboardEntry.board, LeaderboardEntry.position, LeaderboardEntry.recipe_id)
+        .order_by(LeaderboardEntry.board, LeaderboardEntry.position)
+    ).all()
+
+
+def test_import_refreshes_only_touched_recipes_unless_asked_to_rebuild(db, count_queries):
+    load_all(db)
+    with count_queries() as counter:
+        data_transfer.import_rows(db, "favorites", [{"user_id": 1, "recipe_id": 10}])
+    db.commit()
+    assert not any("row_number()" in statement for statement in counter.statements)
+    incremental = leaderboards(db)
+    leaderboard_service.rebuild(db)
+    db.commit()
+    assert incremental == leaderboards(db)
+
+    with count_queries() as counter:
+        data_transfer.import_rows(db, "ratings", [{"user_id": 1, "recipe_id": 11, "rating": 3}], rebuild_leaderboards=True)
+    assert any("row_number()" in statement for statement in counter.statements)
+
+
+def test_import_touching_most_recipes_rebuilds_leaderboards(db, count_queries, monkeypatch):
+    load_all(db)
+    monkeypatch.setattr(data_transfer, "LEADERBOARD_REBUILD_MIN", 0)
+    with count_queries() as counter:
+        data_transfer.import_rows(db, "ratings", [{"user_id": 1, "recipe_id": 11, "rating": 3}], rebuild_leaderboards=False)
+    assert not any("row_number()" in statement for statement in counter.statements)
+
+    with count_queries() as counter:
+        data_transfer.import_rows(db, "favorites", [{"user_id": 1, "recipe_id": 11}])
+    assert any("row_number()" in statement for statement in counter.statements)
+    db.commit()
+    rebuilt = leaderboards(db)
+    leaderboard_service.rebuild(db)
+    db.commit()
+    assert rebuilt == leaderboards(db)
+
+
+def test_export_round_trips_through_csv(db):
+    load_all(db, batch_size=data_transfer.BATCH_SIZE)
+    for entity in ("users", "recipes"):
+        _, columns = data_transfer.ENTITIES[entity]
+        stream = io.StringIO()
+        exported = data_transfer.write_rows(stream, data_transfer.CSV, columns, data_transfer.export_rows(db, entity, batch_size=1))
+        assert exported == 2
+
+        stream.seek(0)
+        rows = list(data_transfer.read_rows(stream, data_transfer.CSV))
+        assert [row["id"] for row in rows] == ["1", "2"] if entity == "users" else ["10", "11"]
+        if entity == "recipes":
+            assert rows[1]["is_public"] == "false" and rows[1]["description"] is None
+            assert rows[0]["created_at"] == "2024-01-01T08:00:00"
+
+
+def test_import_without_id_is_rejected(db):
+    rows = [{"username": "x", "email": "x@example.com", "password": "x"}]
+    try:
+        data_transfer.import_rows(db, "users", rows)
+    except ValueError as e:
+        assert "line 1" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
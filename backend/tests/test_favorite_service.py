@@ -1,8 +1,8 @@
 import pytest
 from fastapi import HTTPException
-from app.services import favorites_services
+from app.services import favorites_services, recipe_services
 from app.models import User, Recipe, Favorite
-from app.schemas.recipe_schema import RecipeResponse
+from app.schemas.recipe_schema import RecipeResponse, RecipeCard, RecipeView
 
 # יצירת משתמש מזויף (בלי id מוגדר מראש)
 def create_mock_user(username="testuser", email="test@example.com"):
@@ -31,7 +31,7 @@ def create_mock_recipe(user_id: int, title="Test Recipe"):
         difficulty="קל"
     )
 
-def test_add_favorite_success(db):
+def test_add_favorite_success(db, query_budget):
     user = create_mock_user(username="user1", email="user1@example.com")
     db.add(user)
     db.commit()
@@ -41,8 +41,12 @@ def test_add_favorite_success(db):
     db.add(recipe)
     db.commit()
     db.refresh(recipe)
+    db.refresh(user)
 
-    res = favorites_services.add_favorite(recipe.id, db, user)
+    # upsert המועדף ועדכון המונה, ואז טבלאות הדירוג: קריאה אחת (ציון, שורה נוכחית ומיקום חדש לשני הלוחות),
+    # פתיחת מקום והכנסה, מצביע המקום הראשון – וקידום גרסת הפיד אחרי ה-commit
+    with query_budget(7):
+        res = favorites_services.add_favorite(recipe.id, db, user)
     assert res == {"message": "Recipe added to favorites"}
 
 def test_add_favorite_already_exists(db):
@@ -92,6 +96,16 @@ def test_remove_favorite_not_found(db):
     assert e.value.status_code == 404
     assert "not found" in str(e.value.detail)
 
+def test_add_favorite_missing_recipe_is_404_and_writes_nothing(db):
+    user = create_mock_user(username="user5", email="user5@example.com")
+    db.add(user)
+    db.commit()
+
+    with pytest.raises(HTTPException) as e:
+        favorites_services.add_favorite(999, db, user)
+    assert e.value.status_code == 404
+    assert db.query(Favorite).count() == 0
+
 def test_get_favorites(db):
     user = create_mock_user(username="user5", email="user5@example.com")
     db.add(user)
@@ -109,5 +123,34 @@ def test_get_favorites(db):
     res = favorites_services.get_favorites(db, user)
     assert isinstance(res, list)
     assert len(res) == 1
-    assert isinstance(res[0], RecipeResponse)
+    assert isinstance(res[0], RecipeCard)
     assert res[0].id == recipe.id
+
+    full = favorites_services.get_favorites(db, user, RecipeView.full)
+    assert isinstance(full[0], RecipeResponse)
+    assert full[0].ingredients == "Tomatoes, Cheese"
+
+def test_favorite_count_and_most_favorited_feed(db):
+    owner = create_mock_user(username="owner", email="owner@example.com")
+    fans = [create_mock_user(username=f"fan{i}", email=f"fan{i}@example.com") for i in range(2)]
+    db.add_all([owner, *fans])
+    db.commit()
+
+    popular = create_mock_recipe(user_id=owner.id, title="Popular")
+    niche = create_mock_recipe(user_id=owner.id, title="Niche")
+    niche.share_token = "223e4567-e89b-12d3-a456-426614174000"
+    db.add_all([popular, niche])
+    db.commit()
+
+    for fan in fans:
+        favorites_services.add_favorite(popular.id, db, fan)
+    favorites_services.add_favorite(niche.id, db, fans[0])
+    favorites_services.remove_favorite(niche.id, db, fans[0])
+    favorites_services.add_favorite(niche.id, db, fans[1])
+
+    db.refresh(popular)
+    db.refresh(niche)
+    assert (popular.favorite_count, niche.favorite_count) == (2, 1)
+
+    feed = recipe_services.get_most_favorited_recipes(db, page=1)
+    assert [r.title for r in feed["recipes"]] == ["Popular", "Niche"]
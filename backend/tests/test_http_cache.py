@@ -0,0 +1,107 @@
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import event
+from app.models import User, Recipe
+from app.services import users_services, favorites_services, site_counters
+from app.services.cache import invalidate_all
+
+
+def create_recipe(db):
+    user = User(username="chef", email="chef@example.com", password="x")
+    db.add(user)
+    db.commit()
+    recipe = Recipe(title="שקשוקה", ingredients="ביצים", user_id=user.id, is_public=True,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user.id)})}"}
+    return recipe.id, recipe.share_token, headers
+
+
+def test_public_recipe_not_modified_with_single_lookup(client, db, count_queries):
+    recipe_id, _, headers = create_recipe(db)
+
+    first = client.get(f"/recipes/public/{recipe_id}")
+    etag = first.headers["ETag"]
+    assert etag == f'"r{recipe_id}-v1"'
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert "Last-Modified" in first.headers
+
+    with count_queries() as counter:
+        res = client.get(f"/recipes/public/{recipe_id}", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["ETag"] == etag
+    assert counter.count == 1
+
+    client.put(f"/recipes/{recipe_id}", json={"title": "שקשוקה חריפה"}, headers=headers)
+    res = client.get(f"/recipes/public/{recipe_id}", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["title"] == "שקשוקה חריפה"
+    assert res.headers["ETag"] == f'"r{recipe_id}-v2"'
+
+    client.post(f"/recipes/recipe/{recipe_id}/rate", json={"rating": 4}, headers=headers)
+    res = client.get(f"/recipes/{recipe_id}", headers={**headers, "If-None-Match": f'"r{recipe_id}-v2"'})
+    assert res.status_code == 200
+    assert res.json()["version"] == 3
+
+
+def test_shared_recipe_honors_if_modified_since(client, db):
+    _, token, _ = create_recipe(db)
+
+    first = client.get(f"/recipes/share/{token}")
+    res = client.get(f"/recipes/share/{token}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert res.status_code == 304
+    res = client.get(f"/recipes/share/{token}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert res.status_code == 200
+
+
+def test_conditional_get_of_a_pending_deletion_creator_is_not_found(client, db):
+    recipe_id, token, _ = create_recipe(db)
+    etag = client.get(f"/recipes/public/{recipe_id}").headers["ETag"]
+    last_modified = client.get(f"/recipes/share/{token}").headers["Last-Modified"]
+
+    db.query(User).update({User.deleted_at: datetime.utcnow()})
+    db.commit()
+    invalidate_all()
+    assert client.get(f"/recipes/public/{recipe_id}", headers={"If-None-Match": etag}).status_code == 404
+    assert client.get(f"/recipes/share/{token}", headers={"If-Modified-Since": last_modified}).status_code == 404
+
+
+def test_feed_etag_changes_on_write(client, db):
+    recipe_id, _, headers = create_recipe(db)
+
+    etag = client.get("/recipes/sorted/recent").headers["ETag"]
+    assert client.get("/recipes/sorted/recent", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"/favorites/{recipe_id}", headers=headers)
+    res = client.get("/recipes/sorted/recent", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert client.get("/recipes/sorted/favorited", headers={"If-None-Match": res.headers["ETag"]}).status_code == 304
+
+
+def test_feed_revision_advances_after_commit_not_inside_the_write(db, count_queries):
+    recipe_id, _, _ = create_recipe(db)
+    user = db.query(User).one()
+    revision = (site_counters.read(db, site_counters.FEED_REVISION) or (0,))[0]
+    committed_at = []
+    record = lambda session: committed_at.append(len(counter.statements))
+
+    event.listen(db, "before_commit", record)
+    try:
+        with count_queries() as counter:
+            favorites_services.add_favorite(recipe_id, db, user)
+    finally:
+        event.remove(db, "before_commit", record)
+
+    # הטרנזקציה של הכתיבה לא נוגעת בשורת הגרסה – הקידום הוא פקודה אחת אחרי ה-COMMIT
+    assert len(counter.statements) == committed_at[0] + 1
+    assert "site_counters" in counter.statements[-1]
+    assert site_counters.read(db, site_counters.FEED_REVISION).value == revision + 1
+
+    # כתיבה שהתבטלה לא מקדמת את הגרסה
+    site_counters.bump_feed_revision_after_commit(db)
+    db.rollback()
+    db.commit()
+    assert site_counters.read(db, site_counters.FEED_REVISION).value == revision + 1
@@ -0,0 +1,93 @@
+from uuid import uuid4
+from sqlalchemy import select, delete
+from app.models import User, Recipe, Ingredient, RecipeIngredient
+from app.services import ingredient_service, recipe_services
+from app.schemas.recipe_schema import RecipeUpdate
+from app.utils.ingredients import parse_ingredients
+
+
+def create_user(db):
+    user = User(username="chef", email="chef@example.com", password="pass")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def create_recipe(db, user, title, ingredients, public=True):
+    recipe = Recipe(title=title, ingredients=ingredients, user_id=user.id, is_public=public,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    return recipe
+
+
+def ingredient_names(db, recipe_id):
+    return sorted(db.scalars(
+        select(Ingredient.name)
+        .join(RecipeIngredient, RecipeIngredient.ingredient_id == Ingredient.id)
+        .where(RecipeIngredient.recipe_id == recipe_id)
+    ))
+
+
+def test_parse_ingredients_drops_quantities_and_units():
+    parsed = parse_ingredients("2 כוסות קמח, 3 ביצים\nמלח לפי הטעם\n½ כוס שמן-זית\nקמח")
+    assert [name for _, name in parsed] == ["קמח", "ביצים", "מלח", "שמן-זית"]
+    assert parse_ingredients('[{"name": "בצל", "amount": "1"}]') == [("בצל", "בצל")]
+
+
+def test_recipe_ingredients_follow_writes(db):
+    user = create_user(db)
+    recipe = create_recipe(db, user, "חביתה", "2 ביצים, מלח")
+    recipe_id = recipe.id
+    create_recipe(db, user, "עוגה", "ביצים, קמח")
+    assert ingredient_names(db, recipe_id) == ["ביצים", "מלח"]
+    assert db.query(Ingredient).count() == 3  # "ביצים" נכנס למילון פעם אחת
+
+    recipe_services.update_recipe(recipe_id, RecipeUpdate(ingredients="ביצים\nבצל ירוק"), db, user)
+    assert ingredient_names(db, recipe_id) == ["ביצים", "בצל ירוק"]
+
+    recipe_services.delete_recipe(recipe_id, db, user)
+    assert ingredient_names(db, recipe_id) == []
+
+
+def test_cook_ranks_recipes_by_coverage(db):
+    user = create_user(db)
+    create_recipe(db, user, "חביתה", "ביצים, מלח")
+    create_recipe(db, user, "עוגה", "ביצים, קמח, סוכר")
+    create_recipe(db, user, "לחם", "קמח, מים")
+    create_recipe(db, user, "ביצה קשה", "ביצים", public=False)
+
+    results, next_cursor = ingredient_service.cook_page(db, ["2 ביצים", "מלח"])
+    assert [(r["recipe"].title, r["matched"], r["total"]) for r in results] == [("חביתה", 2, 2), ("עוגה", 1, 3)]
+    assert results[0]["coverage"] == 1.0 and results[0]["missing"] == []
+    assert results[1]["missing"] == ["סוכר", "קמח"]
+    assert next_cursor is None
+
+    results, _ = ingredient_service.cook_page(db, ["ביצים", "מלח"], min_coverage=0.5)
+    assert [r["recipe"].title for r in results] == ["חביתה"]
+    assert ingredient_service.cook_page(db, ["שוקולד"]) == ([], None)
+
+
+def test_rebuild_recipe_ingredients_backfills_existing_rows(db):
+    user = create_user(db)
+    recipe = create_recipe(db, user, "שקשוקה", "ביצים, עגבניות")
+    recipe_id = recipe.id
+    db.execute(delete(RecipeIngredient))
+    db.commit()
+
+    assert ingredient_service.rebuild_recipe_ingredients(db, batch_size=1) == 1
+    db.commit()
+    assert ingredient_names(db, recipe_id) == ["ביצים", "עגבניות"]
+
+
+def test_cook_route_pages_with_cursor(client, db):
+    user = create_user(db)
+    for i in range(3):
+        create_recipe(db, user, f"סלט {i}", "עגבניות, מלפפון" + ", בצל" * (i % 2))
+
+    res = client.get("/recipes/cook", params={"have": ["עגבניות, מלפפון"], "limit": 2})
+    assert res.status_code == 200
+    assert [r["coverage"] for r in res.json()] == [1.0, 1.0]
+    res = client.get("/recipes/cook", params={"have": ["עגבניות, מלפפון"], "limit": 2, "cursor": res.headers["X-Next-Cursor"]})
+    assert [r["recipe"]["title"] for r in res.json()] == ["סלט 1"]
+    assert "X-Next-Cursor" not in res.headers
@@ -0,0 +1,157 @@
+from uuid import uuid4
+from sqlalchemy import select, update
+from app.services import recipe_services, favorites_services, leaderboard_service, users_services, site_counters
+from app.models import User, Recipe, LeaderboardEntry
+from app.schemas.recipe_schema import DifficultyLevel, RecipeUpdate, ratingRequest
+from app.schemas.user_schema import UserCreate
+
+
+def create_user(db, name):
+    user = User(username=name, email=f"{name}@example.com", password="pass")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def create_recipe(db, user, title, public=True):
+    recipe = Recipe(
+        title=title,
+        ingredients="ingr",
+        user_id=user.id,
+        is_public=public,
+        prep_time="10",
+        difficulty=DifficultyLevel.קל.value,
+        share_token=str(uuid4())
+    )
+    db.add(recipe)
+    db.commit()
+    db.refresh(recipe)
+    return recipe
+
+
+def snapshot(db):
+    rows = db.execute(
+        select(LeaderboardEntry.board, LeaderboardEntry.position, LeaderboardEntry.recipe_id, LeaderboardEntry.score)
+        .order_by(LeaderboardEntry.board, LeaderboardEntry.position)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def test_incremental_positions_match_rebuild(db):
+    owner = create_user(db, "owner")
+    raters = [create_user(db, f"rater{i}") for i in range(3)]
+    recipes = [create_recipe(db, owner, f"recipe {i}") for i in range(5)]
+
+    for recipe, rater, stars in [(0, 0, 3), (1, 0, 5), (2, 1, 3), (0, 1, 5), (3, 2, 1), (1, 0, 2), (4, 2, 4)]:
+        recipe_services.rate_recipe(recipes[recipe].id, ratingRequest(rating=stars), db, raters[rater])
+    for recipe, user in [(2, 0), (2, 1), (4, 0), (0, 2), (2, 2)]:
+        favorites_services.add_favorite(recipes[recipe].id, db, raters[user])
+    favorites_services.remove_favorite(recipes[2].id, db, raters[1])
+
+    recipe_services.update_recipe(recipes[3].id, RecipeUpdate(is_public=False), db, owner)
+    recipe_services.delete_recipe(recipes[4].id, db, owner)
+
+    incremental = snapshot(db)
+    # מצביעי המקום הראשון שהתעדכנו בדרך = מה שבנייה מלאה הייתה נותנת
+    assert site_counters.reconcile(db, leaderboard_service.BOARDS).keys() <= {site_counters.USER_COUNT, site_counters.RECIPE_COUNT}
+    leaderboard_service.rebuild(db)
+    db.commit()
+    assert incremental == snapshot(db)
+    # recipe 3 מוסתר ו-recipe 4 נמחק – לא מופיעים בלוח
+    assert {row[2] for row in incremental} == {recipes[0].id, recipes[1].id, recipes[2].id}
+
+
+def test_score_changes_move_only_the_rows_in_between(db):
+    owner = create_user(db, "owner")
+    raters = [create_user(db, f"rater{i}") for i in range(4)]
+    recipes = [create_recipe(db, owner, f"recipe {i}") for i in range(6)]
+    for recipe, stars in zip(recipes, [1, 2, 3, 4, 5, 3]):
+        recipe_services.rate_recipe(recipe.id, ratingRequest(rating=stars), db, raters[0])
+
+    # עלייה, ירידה, קפיצה למקום הראשון ויציאה ממנו – אחרי כל צעד המיקומים רציפים, ייחודיים וזהים לבנייה מלאה
+    for recipe, rater, stars in [(0, 1, 5), (4, 0, 1), (2, 1, 5), (2, 2, 5), (2, 0, 1), (5, 3, 3), (1, 1, 1)]:
+        recipe_services.rate_recipe(recipes[recipe].id, ratingRequest(rating=stars), db, raters[rater])
+        incremental = snapshot(db)
+        positions = [row[1] for row in incremental if row[0] == leaderboard_service.TOP_RATED]
+        assert positions == list(range(1, len(recipes) + 1))
+        leaderboard_service.rebuild(db)
+        db.commit()
+        assert incremental == snapshot(db)
+
+
+def test_removing_many_recipes_closes_every_gap(db):
+    owner = create_user(db, "owner")
+    rater = create_user(db, "rater")
+    recipes = [create_recipe(db, owner, f"recipe {i}") for i in range(7)]
+    for recipe, stars in zip(recipes, [5, 4, 4, 3, 2, 2, 1]):
+        recipe_services.rate_recipe(recipe.id, ratingRequest(rating=stars), db, rater)
+
+    # המקום הראשון, שני מקומות צמודים ואחד באמצע
+    removed = [recipes[i].id for i in (0, 2, 3, 5)]
+    db.execute(update(Recipe).where(Recipe.id.in_(removed)).values(is_public=False))
+    leaderboard_service.remove_recipes(db, removed)
+    db.commit()
+
+    incremental = snapshot(db)
+    assert [row[2] for row in incremental] == [recipes[i].id for i in (1, 4, 6)]
+    assert site_counters.read(db, site_counters.leader(leaderboard_service.TOP_RATED)).value == recipes[1].id
+    leaderboard_service.rebuild(db)
+    db.commit()
+    assert incremental == snapshot(db)
+
+
+def test_leaderboard_feeds_and_admin_stats(db):
+    owner = create_user(db, "owner")
+    rater = create_user(db, "rater")
+    low = create_recipe(db, owner, "low")
+    high = create_recipe(db, owner, "high")
+    recipe_services.rate_recipe(low.id, ratingRequest(rating=2), db, rater)
+    recipe_services.rate_recipe(high.id, ratingRequest(rating=5), db, rater)
+    favorites_services.add_favorite(low.id, db, rater)
+
+    top = recipe_services.get_top_rated_recipes(db, limit=1)
+    assert [r.title for r in top["recipes"]] == ["high"]
+    assert top["total_pages"] == 2
+    rest = recipe_services.get_top_rated_recipes(db, cursor=top["next_cursor"], limit=1)
+    assert [r.title for r in rest["recipes"]] == ["low"]
+    assert rest["next_cursor"] is None
+
+    favorited = recipe_services.get_most_favorited_recipes(db)
+    assert [r.title for r in favorited["recipes"]] == ["low"]
+
+    stats = recipe_services.get_admin_stats(db, owner)
+    assert stats["top_rated_recipe"] == "high"
+    assert stats["most_favorited_recipe"] == "low"
+
+
+def test_admin_stats_counters_follow_writes_and_reconcile(db, query_budget):
+    for name in ("owner", "rater"):
+        users_services.signup(UserCreate(username=name, email=f"{name}@example.com", password="secret1", wants_emails=False), db)
+    owner, rater = db.query(User).order_by(User.id).all()
+    recipe_ids = [
+        recipe_services.create_recipe(db, title, None, "ingr", None, None, None, True, DifficultyLevel.קל, "10", owner)["recipe_id"]
+        for title in ("first", "second", "third")
+    ]
+    recipe_services.rate_recipe(recipe_ids[1], ratingRequest(rating=4), db, rater)
+    favorites_services.add_favorite(recipe_ids[2], db, rater)
+    recipe_services.delete_recipe(recipe_ids[0], db, owner)
+
+    with query_budget(1):
+        stats = recipe_services.get_admin_stats(db, owner)
+    assert stats == {"user_count": 2, "recipe_count": 2, "top_rated_recipe": "second", "most_favorited_recipe": "third"}
+
+    # כתיבה שעוקפת את השירותים – reconcile מתקן
+    create_recipe(db, owner, "direct")
+    assert site_counters.reconcile(db, leaderboard_service.BOARDS) == {site_counters.RECIPE_COUNT: (2, 3)}
+    db.commit()
+    assert recipe_services.get_admin_stats(db, owner)["recipe_count"] == 3
+
+
+def test_counter_increment_is_a_single_upsert(db, count_queries):
+    with count_queries() as counter:
+        site_counters.increment(db, "imports", 2)
+        site_counters.increment(db, "imports", 3)
+    db.commit()
+    assert counter.count == 2
+    assert site_counters.read(db, "imports").value == 5
@@ -0,0 +1,133 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+from app.db.database import Base
+from app.db.migrations import alembic_config, ensure_schema_at_head, head_revisions, upgrade_to_head, SchemaOutOfDate
+import app.models  # noqa: F401
+
+
+def _upgrade(engine, revision="head"):
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def test_migrations_build_the_same_schema_as_the_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    _upgrade(engine)
+
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={
+            "include_object": lambda obj, name, type_, *args: not (type_ == "table" and name.startswith("recipes_fts")),
+        })
+        assert compare_metadata(context, Base.metadata) == []
+    assert "recipes_fts" in inspect(engine).get_table_names()
+
+
+def test_startup_check_refuses_a_schema_behind_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    with pytest.raises(SchemaOutOfDate):
+        ensure_schema_at_head(engine)
+
+    _upgrade(engine, "0002")
+    with pytest.raises(SchemaOutOfDate, match="0002"):
+        ensure_schema_at_head(engine)
+
+    _upgrade(engine)
+    ensure_schema_at_head(engine)
+    assert head_revisions() == {"0008"}
+
+
+# כמו `alembic upgrade head` מה-CLI: env.py פותח חיבור משלו לפי ה-URL (בלי חיבור ב-config.attributes)
+def test_cli_upgrade_reaches_head(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cli.db'}"
+    command.upgrade(alembic_config(url), "head")
+
+    engine = create_engine(url)
+    ensure_schema_at_head(engine)
+    assert "site_counters" in inspect(engine).get_table_names()
+
+
+def test_downgrade_to_base_and_back(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'roundtrip.db'}")
+    _upgrade(engine)
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, "base")
+    assert set(inspect(engine).get_table_names()) <= {"alembic_version"}
+    _upgrade(engine)
+    ensure_schema_at_head(engine)
+
+
+def test_unique_favorites_migration_drops_duplicates_and_fixes_counts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'favorites.db'}")
+    _upgrade(engine, "0003")
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, email, password) VALUES (1, 'u', 'u@example.com', 'x')"))
+        connection.execute(text(
+            "INSERT INTO recipes (id, title, prep_time, user_id, favorite_count) VALUES (1, 't', '5', 1, 2)"))
+        connection.execute(text("INSERT INTO favorites (user_id, recipe_id) VALUES (1, 1), (1, 1)"))
+
+    _upgrade(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM favorites")).scalar() == 1
+        assert connection.execute(text("SELECT favorite_count FROM recipes")).scalar() == 1
+
+
+def test_migrate_stamps_a_database_built_before_migrations(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    _upgrade(engine, "0001")
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+
+    assert upgrade_to_head(url, attempts=1) == {"0001"}
+    ensure_schema_at_head(engine)
+    assert upgrade_to_head(url, attempts=1) == head_revisions()
+
+
+def test_upgrade_fills_derived_columns_and_leaderboards_for_existing_recipes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    _upgrade(engine, "0001")
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, email, password) VALUES (1, 'u', 'u@example.com', 'x')"))
+        connection.execute(text(
+            "INSERT INTO recipes (id, title, ingredients, prep_time, user_id, is_public) VALUES "
+            "(1, 'עוגת שוקולד', 'קמח', '5', 1, 1), (2, 'שקשוקה', 'ועגבניות', '5', 1, 1), (3, 'סוד', 'מלח', '5', 1, 0)"))
+        connection.execute(text("INSERT INTO ratings (user_id, recipe_id, rating) VALUES (1, 1, 3), (1, 2, 5), (1, 3, 5)"))
+        connection.execute(text("INSERT INTO favorites (user_id, recipe_id) VALUES (1, 1)"))
+
+    _upgrade(engine)
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT id, rating_count, average_rating, favorite_count, random_key, search_ingredients FROM recipes ORDER BY id"
+        )).all()
+        assert [(r.id, r.rating_count, r.average_rating, r.favorite_count) for r in rows] == [
+            (1, 1, 3.0, 1), (2, 1, 5.0, 0), (3, 1, 5.0, 0)]
+        assert all(0 <= r.random_key < 1 for r in rows)
+        assert "עגבניות" in rows[1].search_ingredients.split()
+        assert connection.execute(text("SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH 'עגבניות'")).scalars().all() == [2]
+
+        boards = connection.execute(text(
+            "SELECT board, recipe_id, position FROM leaderboard_entries ORDER BY board, position")).all()
+        assert [tuple(b) for b in boards] == [("most_favorited", 1, 1), ("top_rated", 2, 1), ("top_rated", 1, 2)]
+        leaders = dict(connection.execute(text("SELECT name, value FROM site_counters WHERE name LIKE 'leader_%'")).all())
+        assert leaders == {"leader_top_rated": 2, "leader_most_favorited": 1}
+
+
+def test_random_key_migration_fills_missing_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'random_key.db'}")
+    _upgrade(engine, "0007")
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, email, password) VALUES (1, 'u', 'u@example.com', 'x')"))
+        connection.execute(text("INSERT INTO recipes (id, title, prep_time, user_id) VALUES (1, 't', '5', 1)"))
+        assert connection.execute(text("SELECT random_key FROM recipes")).scalar() is None
+
+    _upgrade(engine)
+    with engine.connect() as connection:
+        assert 0 <= connection.execute(text("SELECT random_key FROM recipes")).scalar() < 1
+    assert not {c["name"]: c for c in inspect(engine).get_columns("recipes")}["random_key"]["nullable"]
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app.db.pool import InstrumentedQueuePool, engine_options, instrument, pool_metrics, pool_settings, pool_status
+from app.models import User
+from app.services import users_services
+
+
+def test_pool_settings_use_profile_with_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_POOL_PROFILE", "production")
+    monkeypatch.setenv("DB_POOL_SIZE", "30")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    settings = pool_settings()
+    assert settings["pool_size"] == 30
+    assert settings["max_overflow"] == 20
+    assert settings["pool_pre_ping"] is False
+
+    monkeypatch.delenv("DB_POOL_SIZE")
+    options = engine_options("postgresql://user:pass@db/recipes", "test")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 2
+    assert engine_options("sqlite://") == {}
+    with pytest.raises(ValueError):
+        pool_settings("staging")
+
+
+def test_instrumented_pool_counts_checkouts_and_timeouts(tmp_path):
+    pool_metrics.reset()
+    engine = instrument(create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05))
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    status = pool_status(engine)
+    assert (status["checkedout"], status["in_use"], status["peak_in_use"]) == (1, 1, 1)
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    status = pool_status(engine)
+    assert status["timeouts"] == 1
+    assert (status["checkouts"], status["checkins"], status["in_use"], status["waiting"]) == (2, 2, 0, 0)
+    assert status["wait_ms"]["max"] >= 50
+    engine.dispose()
+
+
+def test_pool_metrics_endpoint_requires_admin(client, db):
+    admin = User(username="admin", email="admin@example.com", password="x", is_admin=True)
+    db.add(admin)
+    db.commit()
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(admin.id)})}"}
+
+    assert client.get("/metrics/pool").status_code == 401
+    res = client.get("/metrics/pool", headers=headers)
+    assert res.status_code == 200
+    assert {"pool_class", "in_use", "timeouts", "wait_ms"} <= set(res.json())
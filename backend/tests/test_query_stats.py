@@ -0,0 +1,71 @@
+from uuid import uuid4
+from sqlalchemy import select
+from app.db import query_stats
+from app.db.query_stats import track_queries, query_metrics
+from app.models import User, Recipe
+from app.services import users_services
+
+
+def create_admin_with_recipe(db):
+    admin = User(username="admin", email="admin@example.com", password="x", is_admin=True)
+    db.add(admin)
+    db.commit()
+    recipe = Recipe(title="שקשוקה", ingredients="ביצים", user_id=admin.id, is_public=True,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(admin.id)})}"}
+    return recipe.id, headers
+
+
+def test_debug_headers_report_queries_per_request(client, db, count_queries, monkeypatch):
+    recipe_id, _ = create_admin_with_recipe(db)
+    assert query_stats.COUNT_HEADER not in client.get(f"/recipes/public/{recipe_id}").headers
+
+    monkeypatch.setattr(query_stats, "DEBUG_HEADERS", True)
+    with count_queries() as counter:
+        res = client.get("/recipes/sorted/recent?seed=1")
+    assert int(res.headers[query_stats.COUNT_HEADER]) == counter.count > 0
+    assert float(res.headers[query_stats.TIME_HEADER]) >= 0
+
+
+def test_query_metrics_per_route(client, db):
+    recipe_id, headers = create_admin_with_recipe(db)
+    client.get(f"/recipes/public/{recipe_id}")
+    client.get(f"/recipes/public/{recipe_id + 1}")
+
+    metrics = client.get("/metrics/queries", headers=headers).json()
+    route = metrics["GET /recipes/public/{recipe_id}"]
+    assert route["requests"] == 2
+    assert route["max_queries"] >= 1
+    assert route["n_plus_one"] == 0
+    assert client.get("/metrics/queries").status_code == 401
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(db, monkeypatch):
+    recipe_id, _ = create_admin_with_recipe(db)
+    monkeypatch.setattr(query_stats, "N_PLUS_ONE_THRESHOLD", 3)
+
+    # טעינה בלולאה – אותה שאילתה לכל איבר
+    with track_queries() as stats:
+        for _ in range(3):
+            db.execute(select(Recipe.title).where(Recipe.id == recipe_id)).all()
+        db.execute(select(User.username)).all()
+    assert stats.count == 4
+    [(statement, times)] = stats.repeated()
+    assert times == 3 and "recipes.title" in statement
+
+    query_metrics.record("GET /loop", stats)
+    assert query_metrics.stats()["GET /loop"]["n_plus_one"] == 1
+
+
+def test_unmatched_paths_share_one_metrics_entry(client, db):
+    _, headers = create_admin_with_recipe(db)
+    before = len(query_metrics.stats())
+    for _ in range(3):
+        assert client.get(f"/no-such-page-{uuid4()}").status_code == 404
+
+    metrics = client.get("/metrics/queries", headers=headers).json()
+    assert not any("no-such-page" in name for name in metrics)
+    assert query_stats.UNMATCHED_ROUTE in metrics
+    assert len(metrics) <= before + 2
@@ -0,0 +1,78 @@
+import time
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.db import database, async_database
+from app.db.routing import sticky_writes
+from app.models import Base, User, Recipe
+from app.services import users_services
+
+
+# שני קבצי SQLite: primary ו-"replica" עם אותם נתוני בסיס. כתיבה נכנסת רק ל-primary – כמו replica שעוד לא השלים אותה
+def _database(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([
+            User(id=1, username="chef", email="chef@example.com", password="x"),
+            User(id=2, username="guest", email="guest@example.com", password="x"),
+        ])
+        db.add(Recipe(id=1, title="שקשוקה", ingredients="ביצים", user_id=1, is_public=True,
+            prep_time="10", difficulty="קל", share_token=str(uuid4())))
+        db.commit()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    return (
+        sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False),
+    )
+
+
+# ה-routes האמיתיים (בלי ה-overrides של conftest), כשה-sessionmakers מצביעים על שני הקבצים
+@pytest.fixture()
+def routed_client(tmp_path, monkeypatch):
+    primary, async_primary = _database(tmp_path / "primary.db")
+    replica, async_replica = _database(tmp_path / "replica.db")
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    for module in (database, async_database):
+        monkeypatch.setattr(module, "REPLICA_DATABASE_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "SessionLocal", primary)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", replica)
+    monkeypatch.setattr(async_database, "AsyncSessionLocal", async_primary)
+    monkeypatch.setattr(async_database, "AsyncReplicaSessionLocal", async_replica)
+    return TestClient(app)
+
+
+def _headers(user_id):
+    return {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user_id)})}"}
+
+
+def test_reads_go_to_replica_except_right_after_a_write(routed_client, monkeypatch):
+    client = routed_client
+    assert client.post("/favorites/1", headers=_headers(1)).status_code == 200
+
+    # מי שכתב רואה את הכתיבה שלו (primary); משתמש אחר ואנונימי קוראים מה-replica
+    assert [r["id"] for r in client.get("/favorites/", headers=_headers(1)).json()] == [1]
+    assert client.get("/favorites/", headers=_headers(2)).json() == []
+    assert client.get("/recipes/search", params={"q": "שקשוקה"}).status_code == 200
+    assert client.get("/recipes/sorted/favorited").json()["recipes"] == []
+    stats = sticky_writes.stats()
+    assert stats["sticky_users"] == 1
+    assert (stats["primary_reads"], stats["replica_reads"]) == (1, 3)
+
+    # אחרי החלון גם הכותב חוזר ל-replica
+    monkeypatch.setattr(sticky_writes, "_clock", lambda: time.monotonic() + sticky_writes.seconds + 1)
+    assert client.get("/favorites/", headers=_headers(1)).json() == []
+    assert sticky_writes.stats()["sticky_users"] == 0
+
+
+def test_sticky_reads_skip_the_shared_response_cache(routed_client):
+    client = routed_client
+    assert client.post("/favorites/1", headers=_headers(1)).status_code == 200
+    # קורא אחר ממלא את המטמון מה-replica (עוד בלי המועדף); הכותב עדיין מקבל את הפיד מה-primary
+    assert client.get("/recipes/sorted/favorited").json()["recipes"] == []
+    assert [r["id"] for r in client.get("/recipes/sorted/favorited", headers=_headers(1)).json()["recipes"]] == [1]
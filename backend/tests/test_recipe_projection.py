@@ -0,0 +1,100 @@
+from uuid import uuid4
+from app.models import User, Recipe, Favorite
+from app.services import users_services, leaderboard_service
+from app.services.recipe_projection import recipe_rows, to_recipe_response
+from app.services.cache import response_cache
+
+
+# תקציב השאילתות של כל רשימה – לא תלוי בגודל העמוד.
+# פיד: גרסת פיד (1) + ספירה (1) + עמוד (1); רשימות של המשתמש: עמוד (1) – המשתמש המחובר מגיע מ-principal_cache
+LIST_ENDPOINTS = {
+    "/recipes/": 3,
+    "/recipes/public-random?seed=999999": 3,
+    "/recipes/sorted/recent": 3,
+    "/recipes/sorted/top-rated": 3,
+    "/recipes/sorted/favorited": 3,
+    "/recipes/sorted/random?seed=999999": 3,
+    "/recipes/search?title=מתכון": 1,
+    "/recipes/me": 1,
+    "/favorites/": 1,
+    "/recipes/admin/recipes": 1,
+    "/recipes/admin/recipes/page": 1,
+    "/auth/admin/users/page": 1,
+}
+
+
+def add_recipes(db, user, count):
+    for _ in range(count):
+        recipe = Recipe(
+            title="מתכון",
+            ingredients="מלח",
+            user_id=user.id,
+            prep_time="10",
+            difficulty="קל",
+            share_token=str(uuid4()),
+            rating_count=1,
+            rating_sum=4,
+            average_rating=4.0,
+            favorite_count=1,
+        )
+        db.add(recipe)
+        db.flush()
+        db.add(Favorite(user_id=user.id, recipe_id=recipe.id))
+    leaderboard_service.rebuild(db)
+    db.commit()
+
+
+def statements_per_endpoint(client, headers, query_budget):
+    client.get("/recipes/me", headers=headers)  # המשתמש המחובר כבר במטמון, כמו בכל בקשה שאחרי הראשונה
+    response_cache.clear()  # סופרים שאילתות, לא פגיעות במטמון
+    counts = {}
+    for url, budget in LIST_ENDPOINTS.items():
+        with query_budget(budget) as counter:
+            res = client.get(url, headers=headers)
+        assert res.status_code == 200, url
+        counts[url] = counter.count
+    return counts
+
+
+def test_list_endpoints_issue_constant_number_of_statements(client, db, query_budget):
+    admin = User(username="admin", email="admin@example.com", password="x", is_admin=True)
+    db.add(admin)
+    db.commit()
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(admin.id)})}"}
+
+    add_recipes(db, admin, 2)
+    small = statements_per_endpoint(client, headers, query_budget)
+
+    add_recipes(db, admin, 10)
+    large = statements_per_endpoint(client, headers, query_budget)
+
+    assert large == small
+
+
+def test_to_recipe_response_reads_creator_and_rating_from_row(db):
+    user = User(username="chef", email="chef@example.com", password="x")
+    db.add(user)
+    db.commit()
+    add_recipes(db, user, 1)
+
+    row = db.execute(recipe_rows()).first()
+    response = to_recipe_response(row)
+    assert response.creator_name == "chef"
+    assert response.average_rating == 4.0
+
+
+def test_card_view_skips_text_columns(client, db, count_queries):
+    user = User(username="chef", email="chef@example.com", password="x")
+    db.add(user)
+    db.commit()
+    add_recipes(db, user, 2)
+
+    with count_queries() as counter:
+        cards = client.get("/recipes/sorted/recent").json()["recipes"]
+    full = client.get("/recipes/sorted/recent?view=full").json()["recipes"]
+
+    assert "ingredients" not in cards[0] and "instructions" not in cards[0]
+    assert full[0]["ingredients"] == "מלח"
+    page_query = counter.statements[-1]
+    assert "recipes.title" in page_query
+    assert "recipes.ingredients" not in page_query and "recipes.description" not in page_query
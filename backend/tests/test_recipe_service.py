@@ -1,5 +1,7 @@
 from uuid import uuid4
-from app.services import recipe_services
+from datetime import datetime
+from app.services import recipe_services, leaderboard_service, search_service
+from app.services.pagination import encode_cursor
 from app.models import User, Recipe, Rating
 from app.schemas.recipe_schema import DifficultyLevel, RecipeUpdate, ratingRequest
 from sqlalchemy.orm import Session      
@@ -78,7 +80,7 @@ def test_search_recipes_by_title(db: Session):
     db.add(recipe)
     db.commit()
 
-    results = recipe_services.search_recipes(title="שוקולד", ingredient=None, creator_name=None, db=db)
+    results, _ = search_service.search_page(db, title="שוקולד")
     assert len(results) == 1
     assert results[0].title == "עוגת שוקולד"
 
@@ -245,4 +247,150 @@ def test_get_random_public_recipes(db: Session):
     for i in range(5):
         create_sample_recipe(db, user, title=f"recipe {i}")
     res = recipe_services.get_random_public_recipes(db, limit=3)
-    assert len(res) <= 3
\ No newline at end of file
+    assert len(res) <= 3
+
+def test_rate_recipe_maintains_rating_aggregates(db: Session):
+    creator = User(username="owner", email="owner@example.com", password="pass", wants_emails=False)
+    first = create_sample_user(db, username="first", email="first@example.com")
+    second = create_sample_user(db, username="second", email="second@example.com")
+    db.add(creator)
+    db.commit()
+    recipe = create_sample_recipe(db, creator)
+
+    recipe_services.rate_recipe(recipe.id, ratingRequest(rating=5), db, first)
+    recipe_services.rate_recipe(recipe.id, ratingRequest(rating=3), db, second)
+    recipe_services.rate_recipe(recipe.id, ratingRequest(rating=1), db, first)  # עדכון דירוג קיים
+
+    db.refresh(recipe)
+    assert db.query(Rating).filter(Rating.recipe_id == recipe.id).count() == 2
+    assert recipe.rating_count == 2
+    assert recipe.rating_sum == 4
+    assert recipe.average_rating == 2.0
+    assert recipe_services.get_recipe_by_id(recipe.id, db, first).average_rating == 2.0
+
+
+def test_rate_recipe_statement_budget(db: Session, query_budget):
+    creator = User(username="owner", email="owner@example.com", password="pass", wants_emails=False)
+    rater = create_sample_user(db, username="rater", email="rater@example.com")
+    db.add(creator)
+    db.commit()
+    recipe = create_sample_recipe(db, creator)
+    recipe_id = recipe.id
+    db.refresh(rater)
+
+    # קריאה נועלת (הדירוג הקודם + פרטי היוצר), upsert, הסיכומים, ואז טבלאות הדירוג וגרסת הפיד (ראו test_add_favorite_success)
+    with query_budget(8):
+        recipe_services.rate_recipe(recipe_id, ratingRequest(rating=5), db, rater)
+    db.refresh(rater)
+    # דירוג מחדש של המתכון שכבר במקום הראשון: בלי הזזות ובלי כתיבה למצביע המקום הראשון
+    with query_budget(6):
+        recipe_services.rate_recipe(recipe_id, ratingRequest(rating=4), db, rater)
+
+
+def test_refresh_rating_aggregates_repairs_drift(db: Session):
+    user = create_sample_user(db)
+    other = create_sample_user(db, username="other", email="other@example.com")
+    rated = create_sample_recipe(db, user, title="rated")
+    unrated = create_sample_recipe(db, user, title="unrated")
+    db.add_all([
+        Rating(user_id=user.id, recipe_id=rated.id, rating=4),
+        Rating(user_id=other.id, recipe_id=rated.id, rating=5),
+    ])
+    unrated.rating_count = 3  # סטייה שצריך לתקן
+    db.commit()
+
+    recipe_services.refresh_rating_aggregates(db)
+    db.commit()
+
+    db.refresh(rated)
+    db.refresh(unrated)
+    assert (rated.rating_count, rated.rating_sum, rated.average_rating) == (2, 9, 4.5)
+    assert (unrated.rating_count, unrated.rating_sum, unrated.average_rating) == (0, 0, None)
+
+
+def test_recent_recipes_cursor_pagination(db: Session):
+    user = create_sample_user(db)
+    recipes = [create_sample_recipe(db, user, title=f"recipe {i}") for i in range(5)]
+    for i, recipe in enumerate(recipes):
+        recipe.created_at = datetime(2024, 1, 1 + i)
+    db.commit()
+
+    first = recipe_services.get_recent_recipes(db, page=1, limit=2)
+    assert [r.title for r in first["recipes"]] == ["recipe 4", "recipe 3"]
+    assert first["total_pages"] == 3
+
+    seen = [r.title for r in first["recipes"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = recipe_services.get_recent_recipes(db, cursor=cursor, limit=2)
+        seen += [r.title for r in page["recipes"]]
+        cursor = page["next_cursor"]
+
+    assert seen == ["recipe 4", "recipe 3", "recipe 2", "recipe 1", "recipe 0"]
+
+
+def test_top_rated_recipes_pages_past_first(db: Session):
+    user = create_sample_user(db)
+    for i in range(10):
+        recipe = create_sample_recipe(db, user, title=f"recipe {i}")
+        recipe.rating_count, recipe.rating_sum, recipe.average_rating = 1, 1 + i % 5, 1 + i % 5
+    db.flush()
+    leaderboard_service.rebuild(db)
+    db.commit()
+
+    second = recipe_services.get_top_rated_recipes(db, page=2)
+    assert second["total_pages"] == 2
+    assert len(second["recipes"]) == 2
+    assert all(r.average_rating == 1.0 for r in second["recipes"])
+
+
+def test_feed_invalid_cursor(db: Session):
+    with pytest.raises(HTTPException) as exc:
+        recipe_services.get_recent_recipes(db, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+
+    # מבנה תקין אבל סוגים שזויפו – עדיין 400, לפני שהערכים מגיעים להשוואה ב-DB
+    for values in (["2024-01-01T00:00:00", "abc"], [1, 2], ["2024-01-01T00:00:00", True]):
+        with pytest.raises(HTTPException) as exc:
+            recipe_services.get_recent_recipes(db, cursor=encode_cursor(values))
+        assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        recipe_services.get_top_rated_recipes(db, cursor=encode_cursor(["1"]))
+    assert exc.value.status_code == 400
+
+
+def test_random_recipes_stable_per_seed(db: Session):
+    user = create_sample_user(db)
+    for i in range(7):
+        create_sample_recipe(db, user, title=f"recipe {i}")
+
+    seed = 500_000
+    walked = []
+    page = recipe_services.get_random_recipes(db, seed=seed, limit=3)
+    assert page["seed"] == seed
+    walked += [r.id for r in page["recipes"]]
+    while page["next_cursor"]:
+        page = recipe_services.get_random_recipes(db, seed=seed, cursor=page["next_cursor"], limit=3)
+        walked += [r.id for r in page["recipes"]]
+
+    by_page = []
+    for n in (1, 2, 3):
+        by_page += [r.id for r in recipe_services.get_random_recipes(db, page=n, seed=seed, limit=3)["recipes"]]
+
+    assert len(walked) == 7 and len(set(walked)) == 7
+    assert walked == by_page
+
+
+def test_random_pages_read_both_rotation_ranges_by_index(db: Session, count_queries):
+    user = create_sample_user(db)
+    recipes = [create_sample_recipe(db, user, title=f"recipe {i}") for i in range(5)]
+    for recipe, key in zip(recipes, (0.1, 0.2, 0.3, 0.6, 0.7)):
+        recipe.random_key = key
+    db.commit()
+    expected = [r.id for r in recipes[3:] + recipes[:3]]
+
+    with count_queries() as counter:
+        pages = [recipe_services.get_random_recipes(db, page=n, seed=500_000, limit=2) for n in (1, 2, 3)]
+    assert [r.id for page in pages for r in page["recipes"]] == expected
+    assert [page["next_cursor"] is not None for page in pages] == [True, True, False]
+    assert not any("CASE" in statement for statement in counter.statements)
@@ -0,0 +1,164 @@
+from uuid import uuid4
+from sqlalchemy import update
+from app.models import User, Recipe
+from app.services import search_service, recipe_services
+from app.schemas.recipe_schema import RecipeUpdate
+from app.utils.hebrew import normalize, index_terms, variants
+
+
+def create_user(db):
+    user = User(username="chef", email="chef@example.com", password="pass")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def create_recipe(db, user, title, ingredients, public=True):
+    recipe = Recipe(title=title, ingredients=ingredients, user_id=user.id, is_public=public,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    return recipe
+
+
+def titles(recipes):
+    return [r.title for r in recipes]
+
+
+def test_normalize_strips_niqqud_and_folds_final_letters():
+    assert normalize("עַגְבָנִיּוֹת") == "עגבניות"
+    assert normalize("שמן־זית") == "שמנ זית"
+    assert normalize("צ׳יפס") == "ציפס"
+
+
+def test_variants_strip_prefix_letters_but_keep_short_stems():
+    assert variants("והעגבניות") == ["והעגבניות", "העגבניות", "עגבניות"]
+    assert variants("מלח") == ["מלח"]
+    assert "בצל" in index_terms("ובצל קצוץ").split()
+
+
+def test_search_matches_prefixed_words_and_ranks_title_first(db):
+    user = create_user(db)
+    create_recipe(db, user, "סלט ירקות", "מלפפון והעגבניות")
+    create_recipe(db, user, "רוטב עגבניות", "שום, שמן זית")
+    create_recipe(db, user, "עוגת שוקולד", "קמח, סוכר")
+
+    recipes, next_cursor = search_service.search_page(db, q="עַגְבָנִיּוֹת")
+    assert titles(recipes) == ["רוטב עגבניות", "סלט ירקות"]
+    assert next_cursor is None
+
+    recipes, _ = search_service.search_page(db, ingredient="בעגבניות")
+    assert titles(recipes) == ["סלט ירקות"]
+    recipes, _ = search_service.search_page(db, title="עוגת שוקו")
+    assert titles(recipes) == ["עוגת שוקולד"]
+
+
+def test_search_reads_ingredient_names_from_json(db):
+    user = create_user(db)
+    create_recipe(db, user, "מרק", '[{"name": "בצל", "amount": "1"}]')
+
+    assert titles(search_service.search_page(db, ingredient="בצל")[0]) == ["מרק"]
+    assert search_service.search_page(db, ingredient="amount")[0] == []
+
+
+def test_search_cursor_walks_all_matches_once(db):
+    user = create_user(db)
+    for i in range(7):
+        create_recipe(db, user, f"פסטה {i}", "פסטה " * (i % 3 + 1))
+    create_recipe(db, user, "פסטה פרטית", "פסטה", public=False)
+
+    seen, cursor = [], None
+    while True:
+        recipes, cursor = search_service.search_page(db, q="פסטה", cursor=cursor, limit=3)
+        seen += [r.id for r in recipes]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 7
+
+
+def test_search_index_follows_updates_and_deletes(db):
+    user = create_user(db)
+    recipe = create_recipe(db, user, "חביתה", "ביצים")
+
+    recipe_services.update_recipe(recipe.id, RecipeUpdate(title="פשטידה"), db, user)
+    assert titles(search_service.search_page(db, q="פשטידה")[0]) == ["פשטידה"]
+    assert search_service.search_page(db, q="חביתה")[0] == []
+
+    recipe_services.delete_recipe(recipe.id, db, user)
+    assert search_service.search_page(db, q="ביצים")[0] == []
+
+
+def test_refresh_search_columns_backfills_existing_rows(db):
+    user = create_user(db)
+    create_recipe(db, user, "שקשוקה", "ביצים, עגבניות")
+    db.execute(update(Recipe).values(search_title=None, search_ingredients=None))
+    db.commit()
+    assert search_service.search_page(db, q="שקשוקה")[0] == []
+
+    assert search_service.refresh_search_columns(db, batch_size=1) == 1
+    db.commit()
+    assert titles(search_service.search_page(db, q="שקשוקה")[0]) == ["שקשוקה"]
+
+
+def test_search_route_returns_next_cursor_header(client, db):
+    user = create_user(db)
+    for i in range(3):
+        create_recipe(db, user, f"קציצות {i}", "בשר")
+
+    res = client.get("/recipes/search", params={"q": "קציצות", "limit": 2})
+    assert res.status_code == 200
+    assert len(res.json()) == 2
+    res = client.get("/recipes/search", params={"q": "קציצות", "limit": 2, "cursor": res.headers["X-Next-Cursor"]})
+    assert len(res.json()) == 1
+    assert "X-Next-Cursor" not in res.headers
+
+
+def test_fuzzy_search_tolerates_typos_and_ranks_by_similarity(db):
+    user = create_user(db)
+    create_recipe(db, user, "עגבנית ממולאת", "אורז")
+    create_recipe(db, user, "רוטב עגבניות", "שום")
+    create_recipe(db, user, "עוגת שוקולד", "קמח")
+    create_recipe(db, user, "עגבניות פרטיות", "מלח", public=False)
+
+    assert titles(search_service.search_page(db, q="עגבנית")[0]) == ["עגבנית ממולאת"]
+    recipes, _ = search_service.search_page(db, q="עגבנית", fuzzy=True)
+    assert titles(recipes) == ["עגבנית ממולאת", "רוטב עגבניות"]
+    assert titles(search_service.search_page(db, q="עגבנית", fuzzy=True, threshold=0.9)[0]) == ["עגבנית ממולאת"]
+    assert titles(search_service.search_page(db, title="שוקלד", fuzzy=True)[0]) == ["עוגת שוקולד"]
+    assert search_service.search_page(db, ingredient="שוקלד", fuzzy=True)[0] == []
+
+
+def test_fuzzy_index_follows_writes_and_pages_with_cursor(db):
+    user = create_user(db)
+    recipes = [create_recipe(db, user, f"פשטידת {name}", "ביצים") for name in ("תרד", "ברוקולי", "כרובית")]
+    assert len(search_service.search_page(db, q="פשטדת", fuzzy=True)[0]) == 3
+
+    recipe_services.update_recipe(recipes[0].id, RecipeUpdate(title="מרק תרד"), db, user)
+    recipe_services.delete_recipe(recipes[1].id, db, user)
+    create_recipe(db, user, "פשטידת בצל", "בצל")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = search_service.search_page(db, q="פשטדת", fuzzy=True, cursor=cursor, limit=1)
+        seen += titles(page)
+        if cursor is None:
+            break
+    assert sorted(seen) == ["פשטידת בצל", "פשטידת כרובית"]
+
+
+def test_fuzzy_search_route_validates_threshold(client, db):
+    user = create_user(db)
+    create_recipe(db, user, "שקשוקה", "ביצים")
+
+    res = client.get("/recipes/search", params={"q": "שקשוקע", "fuzzy": "true"})
+    assert [r["title"] for r in res.json()] == ["שקשוקה"]
+    assert client.get("/recipes/search", params={"q": "שקשוקע", "fuzzy": "true", "threshold": 0}).status_code == 422
+
+
+def test_title_only_update_keeps_ingredients_in_the_fuzzy_index(db):
+    user = create_user(db)
+    recipe = create_recipe(db, user, "פשטידה", "ברוקולי")
+    assert titles(search_service.search_page(db, ingredient="ברוקלי", fuzzy=True)[0]) == ["פשטידה"]
+
+    recipe_services.update_recipe(recipe.id, RecipeUpdate(title="פשטידת ירקות"), db, user)
+    assert titles(search_service.search_page(db, ingredient="ברוקלי", fuzzy=True)[0]) == ["פשטידת ירקות"]
@@ -0,0 +1,41 @@
+from uuid import uuid4
+from app.db.slow_queries import slow_queries, normalize, fingerprint, parameter_shape
+from app.models import User, Recipe
+from app.services import users_services
+
+
+def test_fingerprint_ignores_values_and_in_list_length():
+    assert normalize("SELECT *  FROM recipes\n WHERE id IN (?, ?, ?) AND title = 'x'") == \
+        "SELECT * FROM recipes WHERE id IN (?) AND title = ?"
+    assert fingerprint("SELECT * FROM recipes WHERE id IN (%(id_1)s, %(id_2)s)") == \
+        fingerprint("SELECT * FROM recipes WHERE id IN (%(id_1)s)")
+    assert parameter_shape({"id": 1, "title": "סוד"}) == {"id": "int", "title": "str"}
+    assert parameter_shape([(1,), (2,)], executemany=True) == {"rows": 2, "row": ["int"]}
+
+
+def test_slow_queries_recorded_with_route_and_one_plan_per_fingerprint(client, db, monkeypatch):
+    admin = User(username="admin", email="admin@example.com", password="x", is_admin=True)
+    db.add(admin)
+    db.commit()
+    recipe = Recipe(title="שקשוקה", ingredients="ביצים", user_id=admin.id, is_public=True,
+        prep_time="10", difficulty="קל", share_token=str(uuid4()))
+    db.add(recipe)
+    db.commit()
+    recipe_id = recipe.id
+    headers = {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(admin.id)})}"}
+
+    monkeypatch.setattr(slow_queries, "threshold_ms", 0)  # כל שאילתה "איטית"
+    client.get(f"/recipes/public/{recipe_id}")
+    client.get(f"/recipes/public/{recipe_id + 1}")
+    monkeypatch.setattr(slow_queries, "threshold_ms", -1)
+
+    log = client.get("/recipes/admin/slow-queries", headers=headers).json()
+    lookups = [q for q in log["queries"] if q["route"] == "GET /recipes/public/{recipe_id}"]
+    assert len(lookups) == 2
+    assert lookups[0]["fingerprint"] == lookups[1]["fingerprint"]
+    assert "int" in str(lookups[0]["parameters"])
+    assert str(recipe_id) not in str(lookups[0]["parameters"])
+    assert "recipes" in log["plans"][lookups[0]["fingerprint"]]
+    assert len(log["plans"]) < len(log["queries"])
+
+    assert client.get("/recipes/admin/slow-queries").status_code == 401
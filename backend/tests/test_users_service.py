@@ -1,8 +1,13 @@
+import time
 import pytest
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from fastapi import HTTPException
-from app.models import User
-from app.services import users_services
+from fastapi import HTTPException, BackgroundTasks
+from app.models import User, Recipe, Rating, Favorite, Comment, RecipeIngredient, LeaderboardEntry
+from app.services.recipe_projection import public_recipe_rows
+from app.services.cache import principal_cache
+from app.services import users_services, recipe_services, favorites_services, leaderboard_service, site_counters
+from app.schemas.recipe_schema import ratingRequest
 from app.schemas.user_schema import UserCreate, UserLogin, UserUpdate, ForgotPasswordRequest, ResetPasswordRequest
 from jose import jwt
 import re
@@ -115,3 +120,189 @@ def test_delete_user_self_forbidden(db: Session):
     with pytest.raises(HTTPException) as exc:
         users_services.delete_user(admin.id, admin, db)
     assert exc.value.status_code == 400
+
+
+def test_delete_user_updates_rating_aggregates(db: Session):
+    admin = create_test_user(db, is_admin=True, email="admin4@example.com")
+    owner = create_test_user(db, username="owner", email="owner@example.com", wants_emails=False)
+    rater = create_test_user(db, username="rater", email="rater@example.com")
+    recipe = Recipe(title="מרק", ingredients="מים", user_id=owner.id, prep_time="10", difficulty="קל", share_token="tok-1")
+    db.add(recipe)
+    db.commit()
+    recipe_services.rate_recipe(recipe.id, ratingRequest(rating=2), db, rater)
+    recipe_services.rate_recipe(recipe.id, ratingRequest(rating=4), db, admin)
+
+    users_services.delete_user(rater.id, admin, db)
+
+    db.refresh(recipe)
+    assert recipe.rating_count == 1
+    assert recipe.average_rating == 4.0
+
+
+def _recipe_for(db: Session, owner: User, token: str) -> Recipe:
+    recipe = Recipe(title="מרק", ingredients="מים, מלח", user_id=owner.id, prep_time="10", difficulty="קל", share_token=token)
+    db.add(recipe)
+    db.commit()
+    return recipe
+
+
+def _count(db: Session, model, **filters) -> int:
+    return db.scalar(select(func.count()).select_from(model).filter_by(**filters))
+
+
+def test_delete_user_cascades_in_the_database(db: Session, count_queries):
+    admin = create_test_user(db, is_admin=True, email="admin5@example.com")
+    owner = create_test_user(db, username="owner", email="owner@example.com", wants_emails=False)
+    recipe = _recipe_for(db, owner, "tok-2")
+    db.add_all([Rating(user_id=admin.id, recipe_id=recipe.id, rating=5), Favorite(user_id=admin.id, recipe_id=recipe.id),
+                Comment(user_id=admin.id, recipe_id=recipe.id, content="טעים")])
+    db.commit()
+    owner_id, recipe_id = owner.id, recipe.id
+    db.expire_all()
+
+    with count_queries() as counter:
+        users_services.delete_user(owner_id, admin, db)
+
+    # הילדים לא נטענים לזיכרון – ON DELETE CASCADE מוחק אותם
+    assert not any("comments.content" in statement or "recipes.title" in statement for statement in counter.statements)
+    assert _count(db, Recipe, user_id=owner_id) == 0
+    for model in (Rating, Favorite, Comment, RecipeIngredient):
+        assert _count(db, model, recipe_id=recipe_id) == 0
+
+
+def _leaderboards(db: Session) -> list:
+    rows = db.execute(
+        select(LeaderboardEntry.board, LeaderboardEntry.position, LeaderboardEntry.recipe_id, LeaderboardEntry.score)
+        .order_by(LeaderboardEntry.board, LeaderboardEntry.position)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def _assert_leaderboards_match_rebuild(db: Session):
+    incremental = _leaderboards(db)
+    leaderboard_service.rebuild(db)
+    db.commit()
+    assert incremental == _leaderboards(db)
+
+
+def test_delete_user_updates_only_the_affected_leaderboard_rows(db: Session, count_queries):
+    admin = create_test_user(db, is_admin=True, email="admin8@example.com")
+    owner = create_test_user(db, username="owner", email="owner@example.com", wants_emails=False)
+    leaving = create_test_user(db, username="leaving", email="leaving@example.com", wants_emails=False)
+    kept = [_recipe_for(db, owner, f"tok-k{i}") for i in range(3)]
+    gone = _recipe_for(db, leaving, "tok-g")
+    for recipe, stars in zip([*kept, gone], [3, 4, 2, 5]):
+        recipe_services.rate_recipe(recipe.id, ratingRequest(rating=stars), db, admin)
+    recipe_services.rate_recipe(kept[0].id, ratingRequest(rating=1), db, leaving)
+    favorites_services.add_favorite(kept[1].id, db, leaving)
+    favorites_services.add_favorite(gone.id, db, admin)
+    gone_id = gone.id
+
+    with count_queries() as counter:
+        users_services.delete_user(leaving.id, admin, db)
+
+    # בלי בנייה מלאה של הלוחות (INSERT ... SELECT עם row_number) – רק השורות של המתכונים שנגעו בהם
+    assert not any("row_number()" in statement for statement in counter.statements)
+    assert gone_id not in {row[2] for row in _leaderboards(db)}
+    _assert_leaderboards_match_rebuild(db)
+
+
+def test_delete_large_user_hides_then_purges_in_background(db: Session, monkeypatch):
+    monkeypatch.setattr(users_services, "PURGE_THRESHOLD", 3)
+    admin = create_test_user(db, is_admin=True, email="admin6@example.com")
+    owner = create_test_user(db, username="owner", email="owner@example.com", wants_emails=False)
+    heavy = create_test_user(db, username="heavy", email="heavy@example.com", password="pw")
+    other_recipe = _recipe_for(db, owner, "tok-3")
+    heavy_recipes = [_recipe_for(db, heavy, token) for token in ("tok-4", "tok-5")]
+    recipe_services.rate_recipe(other_recipe.id, ratingRequest(rating=1), db, heavy)
+    recipe_services.rate_recipe(heavy_recipes[0].id, ratingRequest(rating=5), db, admin)
+    heavy_id, other_id = heavy.id, other_recipe.id
+    leader = site_counters.leader(leaderboard_service.TOP_RATED)
+    assert site_counters.read(db, leader).value == heavy_recipes[0].id
+
+    tasks = BackgroundTasks()
+    res = users_services.delete_user(heavy_id, admin, db, tasks)
+
+    assert "scheduled" in res["message"]
+    assert len(tasks.tasks) == 1
+    with pytest.raises(HTTPException) as exc:
+        users_services.login(UserLogin(email="heavy@example.com", password="pw"), db)
+    assert exc.value.status_code == 401
+    assert heavy_id not in [user.id for user in users_services.get_all_users(admin, db)]
+    assert [row.id for row in db.execute(public_recipe_rows())] == [other_recipe.id]
+    # המתכונים המוסתרים יצאו מטבלאות הדירוג כבר בסימון, והמקום הראשון עבר למתכון שנשאר
+    assert {row[2] for row in _leaderboards(db)} == {other_id}
+    assert site_counters.read(db, leader).value == other_id
+    _assert_leaderboards_match_rebuild(db)
+
+    users_services.purge_user(heavy_id, db, batch_size=1)
+
+    assert db.get(User, heavy_id) is None
+    assert _count(db, Recipe, user_id=heavy_id) == 0
+    db.refresh(other_recipe)
+    assert other_recipe.rating_count == 0
+    _assert_leaderboards_match_rebuild(db)
+
+
+def _bearer(user: User, minutes: int = 60) -> dict:
+    return {"Authorization": f"Bearer {users_services.create_access_token({'sub': str(user.id)}, minutes)}"}
+
+
+def test_current_user_comes_from_the_principal_cache(client, db: Session, count_queries):
+    user = create_test_user(db)
+    headers = _bearer(user)
+    client.get("/recipes/me", headers=headers)
+
+    with count_queries() as counter:
+        assert client.get("/recipes/me", headers=headers).status_code == 200
+    assert not any("FROM users" in statement for statement in counter.statements)
+
+    # עדכון פרופיל פוסל את הרשומה – הבקשה הבאה רואה את השם החדש
+    assert client.put("/auth/profile", json={"username": "renamed"}, headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).json()["username"] == "renamed"
+
+
+def test_full_user_is_loaded_only_when_needed(db: Session, count_queries):
+    user = create_test_user(db)
+    token = users_services.create_access_token({"sub": str(user.id)})
+    db.expunge_all()
+
+    current = users_services.get_current_user(token, db)
+    with count_queries() as counter:
+        assert (current.id, current.username, current.is_admin) == (user.id, "testuser", False)
+    assert counter.count == 0
+    with count_queries() as counter:
+        assert current.email == "test@example.com"
+    assert counter.count == 1
+
+
+def test_principal_cache_honors_token_expiry(db: Session, monkeypatch):
+    monkeypatch.setattr(principal_cache, "ttl_seconds", 3600)
+    user = create_test_user(db)
+    users_services.get_current_user(users_services.create_access_token({"sub": str(user.id)}, 1), db)
+    expires_at = principal_cache._entries[user.id][0]
+    assert expires_at <= time.monotonic() + 60
+
+
+def test_unknown_user_is_not_cached(db: Session):
+    token = users_services.create_access_token({"sub": "4242"})
+    with pytest.raises(HTTPException) as exc:
+        users_services.get_current_user(token, db)
+    assert exc.value.status_code == 401
+    assert 4242 not in principal_cache._entries
+
+    # משתמש שנוצר אחרי הניסוי הכושל מתחבר מיד, בלי לחכות שתשובה שלילית תפוג
+    db.add(User(id=4242, username="late", email="late@example.com", password="x"))
+    db.commit()
+    assert users_services.get_current_user(token, db).username == "late"
+
+
+def test_deleted_user_is_rejected_right_away(client, db: Session):
+    admin = create_test_user(db, is_admin=True, email="admin7@example.com", username="admin7")
+    user = create_test_user(db)
+    headers = _bearer(user)
+    assert client.get("/recipes/me", headers=headers).status_code == 200
+
+    users_services.delete_user(user.id, admin, db)
+
+    assert client.get("/recipes/me", headers=headers).status_code == 401